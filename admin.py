@@ -1,13 +1,22 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, date
-import io
-import string
-import random
 import re
 import csv
-import time
-from sp_connector import SPConnector
+import logging
+from concurrent.futures import TimeoutError as FutureTimeout
+import bulk_upsert
+import changeset
+import excel_writers
+import schemas
+from sp_connector import SPConnector, column_letter, etag_key
+from delta_poller import DeltaPoller
+from workbook_snapshots import WorkbookSnapshots
+from audit_journal import AuditJournal
+from log_archive import LogArchive, filter_log
+from log_builder import LogBuilder
+from id_allocator import IdAllocator
+from write_behind import WriteBehindQueue
 
 # import do módulo de autenticação
 from auth_microsoft import (
@@ -17,6 +26,8 @@ from auth_microsoft import (
     create_user_header,
 )
 
+logger = logging.getLogger(__name__)
+
 # aqui pq quebra o codigo mais pra baixo
 st.set_page_config(layout="wide")
 
@@ -31,6 +42,36 @@ LIBRARY   = st.secrets["graph"]["library_name"]
 COLABS_FILE = st.secrets["files"]["colaboradores"]   
 APONT_FILE  = st.secrets["files"]["apontamentos"]    
 
+# Cache em disco dos downloads (opcional); sem a seção [cache] fica só em memória
+CACHE_DIR = st.secrets.get("cache", {}).get("dir")
+CACHE_MAX_MB = int(st.secrets.get("cache", {}).get("max_mb", 512))
+# Intervalo (s) do detector de mudanças via /delta
+DELTA_INTERVAL = float(st.secrets.get("cache", {}).get("delta_interval", 30))
+# Snapshot Parquet das abas por eTag (leitura sem parsear o Excel); default <cache.dir>/sidecar
+SIDECAR_DIR = st.secrets.get("cache", {}).get("sidecar_dir") or (f"{CACHE_DIR}/sidecar" if CACHE_DIR else None)
+# Edições pontuais via API de workbook do Excel (desligar com graph.workbook_api = false)
+USE_WORKBOOK_API = bool(st.secrets["graph"].get("workbook_api", True))
+# Cache do token app-only (MSAL) persistido em disco; sem valor fica só em memória
+TOKEN_CACHE = st.secrets.get("cache", {}).get("token_cache")
+# IDs de site/drive/driveItem persistidos; sem valor usa <cache.dir>/graph_ids.json
+ID_CACHE = st.secrets.get("cache", {}).get("id_cache")
+# Engine de leitura dos .xlsx: auto | calamine | streaming | openpyxl (ver excel_readers)
+EXCEL_ENGINE = st.secrets.get("excel", {}).get("engine")
+# Journal de auditoria append-only na biblioteca (substitui a aba 'log'); sem valor, log no workbook
+AUDIT_JOURNAL_DIR = st.secrets.get("audit", {}).get("journal_dir")
+# Arquivo gerado pela exportação de compatibilidade (aba 'log' remontada do journal)
+AUDIT_EXPORT_FILE = st.secrets.get("audit", {}).get("export_file") or APONT_FILE.rsplit(".", 1)[0] + "_log.xlsx"
+# Rollover da aba 'log': entradas além da janela (dias) vão para arquivos mensais; sem valor, desligado
+LOG_WINDOW_DAYS = st.secrets.get("audit", {}).get("log_window_days")
+LOG_ARCHIVE_DIR = st.secrets.get("audit", {}).get("archive_dir") or (
+    (APONT_FILE.rsplit("/", 1)[0] + "/" if "/" in APONT_FILE else "") + "log_arquivo")
+# Engine de gravação: auto | xlsxwriter | streaming | openpyxl (ver excel_writers)
+EXCEL_WRITER = st.secrets.get("excel", {}).get("writer")
+# Write-behind: submissões dentro da janela (s) viram uma só gravação; 0/sem valor = desligado
+WRITE_BEHIND_WINDOW = float(st.secrets["graph"].get("write_behind_window", 0))
+# Quanto a sessão espera pela gravação na fila antes de seguir e mostrar o status depois
+WRITE_BEHIND_TIMEOUT = float(st.secrets["graph"].get("write_behind_timeout", 120))
+
 
 
 # Instância única do conector (cacheada)
@@ -38,10 +79,38 @@ APONT_FILE  = st.secrets["files"]["apontamentos"]
 def _sp():
     return SPConnector(
         TENANT_ID, CLIENT_ID, CLIENT_SECRET,
-        hostname=HOSTNAME, site_path=SITE_PATH, library_name=LIBRARY
+        hostname=HOSTNAME, site_path=SITE_PATH, library_name=LIBRARY,
+        cache_dir=CACHE_DIR, cache_max_bytes=CACHE_MAX_MB * 1024 * 1024,
+        token_cache_path=TOKEN_CACHE, id_cache_path=ID_CACHE, excel_engine=EXCEL_ENGINE,
     )
 
 
+# Snapshots (arquivo, eTag) -> abas já parseadas, compartilhados entre sessões
+@st.cache_resource
+def _snapshots():
+    return WorkbookSnapshots(_sp(), sidecar_dir=SIDECAR_DIR)
+
+
+# Journal de auditoria (None = log continua na aba 'log' do workbook)
+@st.cache_resource
+def _journal():
+    return AuditJournal(_sp(), AUDIT_JOURNAL_DIR, LOG_COLUMNS) if AUDIT_JOURNAL_DIR else None
+
+
+# Bitset dos IDs de apontamento já usados (alocação sem laço de rejeição), por processo
+@st.cache_resource
+def _id_allocator():
+    return IdAllocator()
+
+
+# Arquivo mensal do log (None = aba 'log' guarda todo o histórico)
+@st.cache_resource
+def _log_archive():
+    if not LOG_WINDOW_DAYS:
+        return None
+    return LogArchive(_sp(), LOG_ARCHIVE_DIR, int(LOG_WINDOW_DAYS), LOG_COLUMNS, writer_engine=EXCEL_WRITER)
+
+
 # --------------------------------------------------------------------
 # Funções de Migração
 # --------------------------------------------------------------------
@@ -171,10 +240,32 @@ def check_migration_notice():
 # --------------------------------------------------------------------
 # Helpers
 # --------------------------------------------------------------------
-def _is_locked_error(e: Exception) -> bool:
-    msg = str(e).lower()
-    code = getattr(getattr(e, "response", None), "status_code", None)
-    return (code == 423) or (" 423" in msg) or ("-2147018894" in msg) or ("lock" in msg)
+# Colunas da aba 'log' e nome da tabela do Excel usada para acrescentar entradas
+LOG_COLUMNS = ["Data", "ID", "Estudo", "Operação", "Campo", "Valor Anterior", "Valor Depois", "Responsável", "Responsável Indicado"]
+LOG_TABLE = "LogApontamentos"
+
+# Colunas preenchidas automaticamente junto com qualquer edição de uma linha
+COLUNAS_AUTOMATICAS = ("Data Atualização", "Responsável Atualização", "Disponibilizado para Verificação")
+
+
+def _edit_set(alteracoes_detalhadas: list | None) -> dict[str, set[str]] | None:
+    """
+    IDs -> colunas efetivamente editadas pelo usuário. Usado para mesclar só
+    essas células na versão mais recente (inclusive depois de um 412).
+    """
+    if not alteracoes_detalhadas:
+        return None
+    edit_set: dict[str, set[str]] = {}
+    for alt in alteracoes_detalhadas:
+        if alt.get("campo") == "REGISTRO":
+            continue
+        edit_set.setdefault(str(alt.get("id", "")), set()).add(alt.get("campo", ""))
+    return edit_set
+
+
+def _warn_retry(e: Exception, delay: float):
+    """Aviso na UI antes de cada nova tentativa do RetryPolicy."""
+    st.warning(f"Arquivo em uso ou limite de chamadas. Tentando novamente em {delay:.0f} segundos...")
 
 
 # --------------------------------------------------------------------
@@ -184,11 +275,10 @@ def _is_locked_error(e: Exception) -> bool:
 def read_excel_sheets_from_sharepoint():
     """Lê as abas 'Staff Operações Clínica' e 'Colaboradores' do arquivo COLABS_FILE."""
     try:
-        # baixa bytes e abre o Excel inteiro (preserva ambas as abas)
-        raw = _sp().download(COLABS_FILE)
-        xls = pd.ExcelFile(io.BytesIO(raw))
-        staff_df         = pd.read_excel(xls, sheet_name="Staff Operações Clínica")
-        colaboradores_df = pd.read_excel(xls, sheet_name="Colaboradores")
+        # só as partes das duas abas (sem docProps, tema etc.), uma vez por versão
+        snap = _snapshots().get(COLABS_FILE, ["Staff Operações Clínica", "Colaboradores"])
+        staff_df         = snap.sheet("Staff Operações Clínica")
+        colaboradores_df = schemas.REGISTRY["colaboradores"].apply(snap.sheet("Colaboradores"))
         return staff_df, colaboradores_df
     except Exception as e:
         st.error(f"Erro ao acessar o arquivo ou ler as planilhas (MSAL/Graph): {e}")
@@ -197,60 +287,40 @@ def read_excel_sheets_from_sharepoint():
 
 def update_staff_sheet(staff_df: pd.DataFrame):
     """Atualiza somente a aba 'Staff Operações Clínica' preservando 'Colaboradores'."""
-    while True:
-        try:
-            raw = _sp().download(COLABS_FILE)
-            xls = pd.ExcelFile(io.BytesIO(raw))
-            colaboradores_df = pd.read_excel(xls, sheet_name="Colaboradores")
+    def _save():
+        snap = _snapshots().get(COLABS_FILE, ["Colaboradores"])
+        colaboradores_df, etag = snap.sheet("Colaboradores"), snap.etag
 
-            out = io.BytesIO()
-            with pd.ExcelWriter(out, engine="openpyxl") as w:
-                staff_df.to_excel(w, sheet_name="Staff Operações Clínica", index=False)
-                colaboradores_df.to_excel(w, sheet_name="Colaboradores", index=False)
-            out.seek(0)
+        content = excel_writers.write_excel(
+            {"Staff Operações Clínica": staff_df, "Colaboradores": colaboradores_df}, engine=EXCEL_WRITER)
 
-            _sp().upload_small(COLABS_FILE, out.getvalue(), overwrite=True)
+        _sp().upload(COLABS_FILE, content, overwrite=True, if_match=etag)
 
-            st.cache_data.clear()
-            st.success("Alterações submetidas com sucesso!")
-            break
-
-        except Exception as e:
-            if _is_locked_error(e):
-                st.warning("Arquivo em uso. Tentando novamente em 5 segundos...")
-                time.sleep(5)
-                continue
-            st.error(f"Erro ao atualizar a planilha de Staff (MSAL/Graph): {e}")
-            break
+    try:
+        _sp().run_with_retry(_save, on_retry=_warn_retry)
+        st.cache_data.clear()
+        st.success("Alterações submetidas com sucesso!")
+    except Exception as e:
+        st.error(f"Erro ao atualizar a planilha de Staff (MSAL/Graph): {e}")
 
 
 def update_colaboradores_sheet(colaboradores_df: pd.DataFrame):
     """Atualiza somente a aba 'Colaboradores' preservando 'Staff Operações Clínica'."""
-    while True:
-        try:
-            raw = _sp().download(COLABS_FILE)
-            xls = pd.ExcelFile(io.BytesIO(raw))
-            staff_df = pd.read_excel(xls, sheet_name="Staff Operações Clínica")
+    def _save():
+        snap = _snapshots().get(COLABS_FILE, ["Staff Operações Clínica"])
+        staff_df, etag = snap.sheet("Staff Operações Clínica"), snap.etag
 
-            out = io.BytesIO()
-            with pd.ExcelWriter(out, engine="openpyxl") as w:
-                staff_df.to_excel(w, sheet_name="Staff Operações Clínica", index=False)
-                colaboradores_df.to_excel(w, sheet_name="Colaboradores", index=False)
-            out.seek(0)
+        content = excel_writers.write_excel(
+            {"Staff Operações Clínica": staff_df, "Colaboradores": colaboradores_df}, engine=EXCEL_WRITER)
 
-            _sp().upload_small(COLABS_FILE, out.getvalue(), overwrite=True)
-
-            st.success("Alterações submetidas com sucesso!")
-            st.cache_data.clear()
-            break
+        _sp().upload(COLABS_FILE, content, overwrite=True, if_match=etag)
 
-        except Exception as e:
-            if _is_locked_error(e):
-                st.warning("Arquivo em uso. Tentando novamente em 5 segundos...")
-                time.sleep(5)
-                continue
-            st.error(f"Erro ao atualizar a planilha de Colaboradores (MSAL/Graph): {e}")
-            break
+    try:
+        _sp().run_with_retry(_save, on_retry=_warn_retry)
+        st.success("Alterações submetidas com sucesso!")
+        st.cache_data.clear()
+    except Exception as e:
+        st.error(f"Erro ao atualizar a planilha de Colaboradores (MSAL/Graph): {e}")
 
 
 @st.cache_data
@@ -261,24 +331,508 @@ def get_sharepoint_file(sheet_name: str = "apontamentos"):
     - 'log': histórico de operações
     """
     try:
-        data = _sp().download(APONT_FILE)
-        xls = pd.ExcelFile(io.BytesIO(data))
-
+        # só a aba pedida (e o fallback 'Sheet1'); a aba 'log' não é baixada
+        snap = _snapshots().get(APONT_FILE, [sheet_name, "Sheet1"])
         # Tenta a sheet solicitada, senão tenta 'Sheet1' como fallback
-        if sheet_name in xls.sheet_names:
-            return pd.read_excel(xls, sheet_name=sheet_name)
-        elif sheet_name == "apontamentos" and "Sheet1" in xls.sheet_names:
-            return pd.read_excel(xls, sheet_name="Sheet1")
+        if snap.has(sheet_name):
+            df = snap.sheet(sheet_name)
+        elif sheet_name == "apontamentos" and snap.has("Sheet1"):
+            df = snap.sheet("Sheet1")
         else:
             # Se a sheet não existir, retorna DataFrame vazio
             return pd.DataFrame()
+        if sheet_name == "apontamentos" and "ID" in df.columns:
+            _id_allocator().mark(df["ID"], versao=etag_key(snap.etag))
+        # dtypes declarados (categorias, strings Arrow, datas) aplicados uma vez aqui
+        schema = schemas.REGISTRY.get("apontamentos") if sheet_name == "apontamentos" else None
+        return schema.apply(df) if schema else df
     except Exception as e:
         st.error(f"Erro ao ler o arquivo de apontamentos (MSAL/Graph): {e}")
         return pd.DataFrame()
 
 
+def _log_rows(alteracoes_detalhadas: list, operacao: str, usuario: str, responsavel_indicado: str,
+              log: LogBuilder | None = None) -> LogBuilder:
+    """Entradas da aba 'log' para as alterações detalhadas do Painel ADM (acrescentadas a `log`, se dado)."""
+    log = log if log is not None else LogBuilder(LOG_COLUMNS)
+    log.add_columns({
+        "Data": datetime.now(),
+        "ID": [alt.get("id", "") for alt in alteracoes_detalhadas],
+        "Estudo": [alt.get("estudo", "") for alt in alteracoes_detalhadas],
+        "Operação": operacao,
+        "Campo": [alt.get("campo", "") for alt in alteracoes_detalhadas],
+        "Valor Anterior": [alt.get("valor_anterior", "") for alt in alteracoes_detalhadas],
+        "Valor Depois": [alt.get("valor_depois", "") for alt in alteracoes_detalhadas],
+        "Responsável": usuario if usuario else "Sistema",
+        "Responsável Indicado": [alt.get("resp_indicado", responsavel_indicado) for alt in alteracoes_detalhadas],
+    }, len(alteracoes_detalhadas))
+    return log
+
+
+def _log_status(log: LogBuilder, df_to_save: pd.DataFrame, base_df: pd.DataFrame,
+                ids_novos: list, ids_atualizados: list, operacao: str, usuario: str, responsavel_indicado: str):
+    """
+    Entradas padrão (Forms-OP-clinica): Status de cada ID criado e dos IDs
+    atualizados cujo Status mudou. Estudo/Status/Responsável vêm de uma junção
+    pelo ID (primeira linha de cada ID), não de uma varredura por ID.
+    """
+    agora = datetime.now()
+    responsavel = usuario if usuario else "Sistema"
+    lote = df_to_save.drop_duplicates("ID").set_index("ID")
+
+    def _col(df, ids, col, padrao):
+        return df[col].reindex(ids) if col in df.columns else pd.Series(padrao, index=ids, dtype=object)
+
+    if ids_novos:
+        ids = pd.Index(ids_novos)
+        resp = _col(lote, ids, "Responsável Pela Correção", "")
+        log.add_columns({
+            "Data": agora, "ID": ids, "Estudo": _col(lote, ids, "Código do Estudo", ""),
+            "Operação": operacao, "Campo": "Status", "Valor Anterior": "",
+            "Valor Depois": _col(lote, ids, "Status", "PENDENTE"), "Responsável": responsavel,
+            "Responsável Indicado": responsavel_indicado if responsavel_indicado else resp,
+        }, len(ids))
+
+    if ids_atualizados:
+        ids = pd.Index(ids_atualizados)
+        base = base_df.drop_duplicates("ID").set_index("ID")
+        antes = _col(base, ids, "Status", "")
+        depois = _col(lote, ids, "Status", "")
+        # só registra se houver mudança
+        mudou = (antes.to_numpy() != depois.to_numpy())
+        ids = ids[mudou]
+        resp = _col(lote, ids, "Responsável Pela Correção", "")
+        log.add_columns({
+            "Data": agora, "ID": ids, "Estudo": _col(lote, ids, "Código do Estudo", ""),
+            "Operação": operacao, "Campo": "Status", "Valor Anterior": antes[mudou],
+            "Valor Depois": depois[mudou], "Responsável": responsavel,
+            "Responsável Indicado": responsavel_indicado if responsavel_indicado else resp,
+        }, len(ids))
+
+
+def _excel_value(v):
+    """Converte um valor do DataFrame para JSON aceito pela API de workbook."""
+    if v is None or (not isinstance(v, (list, tuple)) and pd.isna(v)):
+        return ""
+    if isinstance(v, datetime):
+        return v.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(v, date):
+        return v.strftime("%Y-%m-%d")
+    if hasattr(v, "item"):   # escalares numpy
+        return v.item()
+    return v
+
+
+def _mesmas_linhas(lidas: list[list], enviadas: list[list], header: list[str]) -> bool:
+    """Linhas do log iguais às enviadas, sem olhar 'Data' (o Excel guarda o texto como data serial)."""
+    cols = [i for i, c in enumerate(header) if c != "Data"]
+    def _norm(rows):
+        return [[str(r[i]).strip() for i in cols] for r in rows]
+    return len(lidas) == len(enviadas) and _norm(lidas) == _norm(enviadas)
+
+
+def _save_incremental(df_to_save: pd.DataFrame, edit_set: dict[str, set[str]], log_rows: list[dict],
+                      ids_criados: set[str] | None = None, envio: dict | None = None,
+                      sp: SPConnector | None = None) -> bool:
+    """
+    Aplica a edição direto no workbook (sem regravar o arquivo):
+    - linhas existentes: um PATCH por linha cobrindo as colunas editadas
+    - IDs novos: PATCH de uma linha inteira após a última usada
+    - log: rows/add na tabela LOG_TABLE da aba 'log' (criada na 1ª vez)
+    Retorna False se o arquivo não tem o formato esperado ou se um ID criado
+    nesta submissão já existe no arquivo (o ciclo completo troca o ID).
+
+    A aba de dados e a tabela do log são resolvidas antes de qualquer PATCH,
+    para que o ciclo completo, se necessário, parta do arquivo intocado.
+    rows/add não é repetido pelo conector; `envio` é compartilhado entre as
+    tentativas de run_with_retry e, se uma delas já mandou o log, o fim da
+    tabela é conferido antes de acrescentar de novo.
+    """
+    with (sp or _sp()).workbook(APONT_FILE) as wb:
+        # mesma regra da leitura: 'apontamentos' ou, na falta dela, 'Sheet1'
+        abas = wb.worksheets()
+        sheet = next((nome for nome in ("apontamentos", "Sheet1") if nome in abas), None)
+        if sheet is None or (log_rows and "log" not in abas):
+            return False
+        if log_rows:
+            table = wb.ensure_table("log", LOG_TABLE)
+            log_header = wb.table_header(table)
+
+        used = wb.used_range(sheet)
+        nrows, ncols = used["rowCount"], used["columnCount"]
+        last_col = column_letter(ncols - 1)
+        header = [str(h) for h in wb.range_values(sheet, f"A1:{last_col}1")[0]]
+        if "ID" not in header:
+            return False
+        pos = {c: i for i, c in enumerate(header)}
+        id_col = column_letter(pos["ID"])
+        ids = wb.range_values(sheet, f"{id_col}2:{id_col}{nrows}") if nrows > 1 else []
+        row_of = {str(r[0]): i + 2 for i, r in enumerate(ids)}
+        if ids_criados and any(rid in row_of for rid in ids_criados):
+            return False
+
+        linhas = df_to_save[df_to_save["ID"].isin(edit_set)].drop_duplicates("ID").set_index("ID", drop=False)
+        next_row = nrows + 1
+        for rid, cols in edit_set.items():
+            if rid not in linhas.index:
+                continue
+            linha = linhas.loc[rid]
+            if rid in row_of:
+                # um PATCH por linha, da primeira à última coluna tocada; as colunas
+                # não editadas no meio vão como null, que o Graph deixa como estão
+                tocadas = {pos[c]: c for c in cols | set(COLUNAS_AUTOMATICAS) if c in pos and c in linha.index}
+                if not tocadas:
+                    continue
+                ini, fim = min(tocadas), max(tocadas)
+                values = [_excel_value(linha[tocadas[i]]) if i in tocadas else None for i in range(ini, fim + 1)]
+                r = row_of[rid]
+                wb.patch_range(sheet, f"{column_letter(ini)}{r}:{column_letter(fim)}{r}", [values])
+            else:
+                values = [_excel_value(linha[c]) if c in linha.index else "" for c in header]
+                wb.patch_range(sheet, f"A{next_row}:{last_col}{next_row}", [values])
+                row_of[rid] = next_row
+                next_row += 1
+
+        if log_rows:
+            values = [[_excel_value(e.get(c, "")) for c in log_header] for e in log_rows]
+            if envio is not None and envio.get("log_enviado") and \
+                    _mesmas_linhas(wb.table_tail(table, len(values)), values, log_header):
+                return True
+            if envio is not None:
+                envio["log_enviado"] = True
+            wb.add_table_rows(table, values)
+    return True
+
+
+def _legacy_log(snap):
+    """Aba 'log' do snapshot (ou vazia), para a importação única do log antigo no journal."""
+    return snap.sheet("log") if snap.has("log") else pd.DataFrame(columns=LOG_COLUMNS)
+
+
+def export_log_sheet():
+    """Exportação de compatibilidade: remonta a aba 'log' a partir do journal em AUDIT_EXPORT_FILE."""
+    try:
+        journal = _journal()
+        journal.ensure_legacy(lambda: _legacy_log(_snapshots().get(APONT_FILE, ["log"])))
+        log_df = journal.read()
+        content = excel_writers.write_excel({"log": log_df}, engine=EXCEL_WRITER)
+        _sp().upload(AUDIT_EXPORT_FILE, content, overwrite=True)
+        st.success(f"Log exportado ({len(log_df)} entradas) para {AUDIT_EXPORT_FILE}")
+    except Exception as e:
+        st.error(f"Erro ao exportar o log de auditoria: {e}")
+
+
+def read_log(ids=None, start=None, end=None) -> pd.DataFrame:
+    """
+    Consulta o log de auditoria por ID(s) e/ou intervalo de datas, seja qual
+    for o armazenamento: journal, ou aba 'log' viva + arquivos mensais.
+    """
+    journal = _journal()
+    if journal is not None:
+        return filter_log(journal.read(), ids, start, end)
+    snap = _snapshots().get(APONT_FILE, ["log"])
+    live = snap.sheet("log") if snap.has("log") else pd.DataFrame(columns=LOG_COLUMNS)
+    archive = _log_archive()
+    if archive is not None:
+        return archive.query(live, ids=ids, start=start, end=end)
+    return filter_log(live, ids, start, end)
+
+
+def show_log_viewer():
+    """Consulta do log por ID e intervalo de datas (inclui os meses já arquivados)."""
+    with st.expander("📜  Histórico de alterações"):
+        col_ids, col_periodo = st.columns(2)
+        with col_ids:
+            ids_txt = st.text_input("ID(s)", key="log_ids", placeholder="separados por vírgula")
+        with col_periodo:
+            periodo = st.date_input("Período", value=(), format="DD/MM/YYYY", key="log_periodo")
+        if not st.button("Consultar", key="btn_log_consultar"):
+            return
+        ids = [i.strip() for i in ids_txt.split(",") if i.strip()] or None
+        inicio = periodo[0] if len(periodo) > 0 else None
+        fim = periodo[1] if len(periodo) > 1 else inicio
+        try:
+            resultado = read_log(ids, inicio, fim)
+        except Exception as e:
+            st.error(f"Erro ao consultar o log: {e}")
+            return
+        st.caption(f"{len(resultado)} entradas")
+        st.dataframe(resultado, hide_index=True, use_container_width=True)
+
+
+# Dia da última verificação de rollover neste processo (caminho incremental)
+@st.cache_resource
+def _rollover_check():
+    return {"dia": None}
+
+
+def _recursos() -> dict:
+    """
+    Recursos do processo usados na gravação, resolvidos na thread do script.
+    A thread do write-behind recebe este dict pronto na criação da fila: as
+    fábricas @st.cache_resource não são chamadas fora do contexto do Streamlit.
+    """
+    return {
+        "sp": _sp(),
+        "snapshots": _snapshots(),
+        "journal": _journal(),
+        "ids": _id_allocator(),
+        "archive": _log_archive(),
+        "rollover": _rollover_check(),
+    }
+
+
+def _rollover_incremental(on_retry=None, rec: dict | None = None) -> None:
+    """
+    O caminho incremental só acrescenta linhas à tabela do log, sem passar pelo
+    rollover do ciclo completo. Uma vez por dia por processo confere a aba viva
+    e, se há entradas além da janela, roda um ciclo completo sem pedidos (que
+    arquiva e regrava a aba). Falhas ficam no log: a edição já foi gravada.
+    """
+    rec = rec or _recursos()
+    archive = rec["archive"]
+    if archive is None or rec["journal"] is not None:
+        return
+    estado = rec["rollover"]
+    hoje = date.today()
+    if estado["dia"] == hoje:
+        return
+    estado["dia"] = hoje
+    try:
+        snap = rec["snapshots"].get(APONT_FILE, ["log"])
+        if snap.has("log") and archive.needs_rollover(snap.sheet("log")):
+            _gravar_completo([], on_retry=on_retry, rec=rec)
+    except Exception as e:
+        estado["dia"] = None
+        logger.warning(f"Rollover do log após gravação incremental falhou: {e}")
+
+
 # Função para atualizar o arquivo Excel (Apontamentos) no SharePoint
-def update_sharepoint_file(df: pd.DataFrame, usuario: str = "", operacao: str = "ATUALIZAÇÃO", responsavel_indicado: str = "", alteracoes_detalhadas: list = None) -> pd.DataFrame | None:
+def _pedido_gravacao(df: pd.DataFrame, usuario: str, operacao: str, responsavel_indicado: str,
+                     alteracoes_detalhadas: list | None, ids_criados: set[str] | None) -> dict:
+    """Tudo o que uma submissão precisa para ser mesclada (sozinha ou num lote do write-behind)."""
+    df = df.copy()
+    df["ID"] = df["ID"].astype(str)
+    return {
+        "df": df,
+        "usuario": usuario,
+        "operacao": operacao,
+        "responsavel_indicado": responsavel_indicado,
+        "alteracoes": alteracoes_detalhadas,
+        "edit_set": _edit_set(alteracoes_detalhadas),
+        "ids_criados": ids_criados,
+    }
+
+
+def _aplicar_pedido(base_df: pd.DataFrame, pedido: dict, log: LogBuilder,
+                    versao: str | None = None, ids: IdAllocator | None = None) -> tuple[pd.DataFrame, dict[str, str]]:
+    """
+    Mescla um pedido sobre base_df e acrescenta suas entradas em `log`.
+    Devolve (base_df mesclado, IDs trocados por colisão {antigo: novo}).
+    versao: eTag da versão de onde veio base_df (os IDs dela são marcados uma vez só).
+    ids: alocador de IDs (default: o do processo).
+    """
+    ids = ids or _id_allocator()
+    df_to_save = pedido["df"].copy()
+    edits, alteracoes = pedido["edit_set"], pedido["alteracoes"]
+    operacao, usuario, responsavel_indicado = pedido["operacao"], pedido["usuario"], pedido["responsavel_indicado"]
+
+    # Só as linhas editadas entram na mescla (não sobrescreve o resto com dados velhos)
+    if edits is not None:
+        df_to_save = df_to_save[df_to_save["ID"].isin(edits)]
+
+    # Colisão de IDs: um ID "novo" desta submissão já está na versão atual
+    trocados: dict[str, str] = {}
+    ids_criados = pedido["ids_criados"]
+    if ids_criados and not base_df.empty:
+        base_ids = base_df["ID"]
+        ids.mark(base_ids, versao=versao)
+        colisoes = sorted(set(base_ids[base_ids.isin(ids_criados)]))
+        if colisoes:
+            trocados.update(zip(colisoes, ids.reserve(len(colisoes))))
+            df_to_save["ID"] = df_to_save["ID"].replace(trocados)
+            if edits is not None:
+                edits = {trocados.get(k, k): v for k, v in edits.items()}
+            alteracoes = [{**a, "id": trocados.get(str(a.get("id", "")), a.get("id", ""))} for a in alteracoes or []]
+
+    if not base_df.empty:
+        # Novos IDs vão para o fim; os existentes são atualizados só nas colunas
+        # presentes nos dois (e, se conhecidas, nas editadas), coluna a coluna em lote
+        base_df, ids_novos, ids_atualizados = bulk_upsert.upsert(
+            base_df, df_to_save, key="ID", columns_by_id=edits, extra_columns=COLUNAS_AUTOMATICAS,
+        )
+    else:
+        # Se o arquivo está vazio, salva tudo
+        base_df = df_to_save.copy()
+        ids_novos, ids_atualizados = df_to_save["ID"].tolist(), []
+
+    # === ADICIONA ENTRADAS NO LOG ===
+    # Se alteracoes_detalhadas foi fornecido (vem do Painel ADM), usa ele
+    if alteracoes:
+        _log_rows(alteracoes, operacao, usuario, responsavel_indicado, log)
+    else:
+        # Lógica padrão para compatibilidade com Forms-OP-clinica
+        _log_status(log, df_to_save, base_df, ids_novos, ids_atualizados,
+                    operacao, usuario, responsavel_indicado)
+    return base_df, trocados
+
+
+def _gravar_completo(pedidos: list[dict], on_retry=None,
+                     rec: dict | None = None) -> tuple[pd.DataFrame, list[dict[str, str]]]:
+    """
+    Ciclo completo para um ou mais pedidos: baixa a versão atual, mescla os
+    pedidos em ordem, grava apontamentos (+ log) num único upload.
+    """
+    rec = rec or _recursos()
+    sp, snapshots, journal = rec["sp"], rec["snapshots"], rec["journal"]
+    trocados_por_pedido: list[dict[str, str]] = []
+    # segmento do journal fixo entre as tentativas: repetir sobrescreve, não duplica
+    segmento = journal.segment_path() if journal is not None else None
+
+    def _save():
+        # Carrega versão mais recente do arquivo (eTag p/ upload condicional)
+        # (snapshot da versão atual: não baixa/parseia de novo se já foi lida)
+        # com journal, a aba 'log' só é lida na importação única do log antigo
+        if journal is None or not journal.legacy_done:
+            snap = snapshots.get(APONT_FILE, ["apontamentos", "Sheet1", "log"])
+        else:
+            snap = snapshots.get(APONT_FILE, ["apontamentos", "Sheet1"])
+        if journal is not None:
+            journal.ensure_legacy(lambda: _legacy_log(snap))
+        etag = snap.etag
+        # Carrega sheet de apontamentos (tenta 'apontamentos' ou 'Sheet1')
+        if snap.has("apontamentos"):
+            base_df = snap.sheet("apontamentos")
+        elif snap.has("Sheet1"):
+            base_df = snap.sheet("Sheet1")
+        else:
+            base_df = pd.DataFrame()
+        if not base_df.empty:
+            base_df["ID"] = base_df["ID"].astype(str)
+
+        # Carrega sheet de log (ou cria vazio); com journal a aba não é mais regravada
+        if journal is not None:
+            log_df = None
+        elif snap.has("log"):
+            log_df = snap.sheet("log")
+            # Adiciona coluna "Responsável Indicado" se não existir
+            if "Responsável Indicado" not in log_df.columns:
+                log_df["Responsável Indicado"] = ""
+        else:
+            log_df = pd.DataFrame(columns=LOG_COLUMNS)
+
+        # Pedidos em ordem de chegada: edições posteriores prevalecem
+        novas_entradas = LogBuilder(LOG_COLUMNS)
+        trocados_por_pedido.clear()
+        for pedido in pedidos:
+            base_df, trocados = _aplicar_pedido(base_df, pedido, novas_entradas, versao=etag_key(etag),
+                                                ids=rec["ids"])
+            trocados_por_pedido.append(trocados)
+
+        # === SALVA O ARQUIVO COM MÚLTIPLAS SHEETS ===
+        # (escrita em streaming: o log grande não vira um modelo de células em memória)
+        if journal is not None:
+            sheets = {"apontamentos": base_df}
+        else:
+            # uma única concatenação com todas as entradas novas
+            if len(novas_entradas):
+                log_df = pd.concat([log_df, novas_entradas.frame()], ignore_index=True)
+            # rollover: o que passou da janela vai para os arquivos mensais antes de gravar
+            archive = rec["archive"]
+            if archive is not None:
+                log_df, _ = archive.rollover(log_df)
+            sheets = {"apontamentos": base_df, "log": log_df}
+        content = excel_writers.write_excel(sheets, engine=EXCEL_WRITER)
+
+        # If-Match: se alguém salvou depois do download, o Graph responde 412 e
+        # run_with_retry repete o ciclo mesclando só edit_set sobre a versão nova
+        sp.upload(APONT_FILE, content, overwrite=True, if_match=etag)
+
+        # journal: O(entradas novas), só depois do upload aceito
+        if journal is not None:
+            journal.append(novas_entradas.records(), path=segmento)
+
+        return base_df
+
+    # 409/412 = conflito de versão | 423 = bloqueado | 429 = throttling -> RetryPolicy
+    base_df = sp.run_with_retry(_save, on_retry=on_retry)
+    return base_df, list(trocados_por_pedido)
+
+
+def _gravar(pedidos: list[dict], on_retry=None, rec: dict | None = None) -> list[dict]:
+    """
+    Grava os pedidos e devolve um resultado por pedido: {"df", "trocados"}.
+    Um pedido sozinho do Painel ADM tenta antes a API de workbook; um lote
+    (write-behind) vai direto para o ciclo completo, com um único upload.
+    Não usa st.* nem as fábricas cacheadas quando recebe `rec` (_recursos):
+    roda também na thread do write-behind.
+    """
+    rec = rec or _recursos()
+    sp = rec["sp"]
+    if len(pedidos) == 1 and USE_WORKBOOK_API and pedidos[0]["edit_set"] is not None:
+        # Edições do Painel ADM: grava só as células/linhas editadas e acrescenta o log
+        # pela API de workbook; se não der, cai no ciclo completo abaixo
+        pedido = pedidos[0]
+        log_rows = _log_rows(pedido["alteracoes"], pedido["operacao"], pedido["usuario"],
+                             pedido["responsavel_indicado"]).records()
+        journal = rec["journal"]
+        # com journal o log vai para ele, não para a tabela da aba 'log'
+        table_rows = log_rows if journal is None else []
+        try:
+            envio = {}
+            if sp.run_with_retry(lambda: _save_incremental(pedido["df"], pedido["edit_set"], table_rows,
+                                                           pedido["ids_criados"], envio, sp=sp), on_retry=on_retry):
+                if journal is not None:
+                    segmento = journal.segment_path()
+                    sp.run_with_retry(lambda: journal.append(log_rows, path=segmento), on_retry=on_retry)
+                else:
+                    _rollover_incremental(on_retry=on_retry, rec=rec)
+                return [{"df": pedido["df"], "trocados": {}}]
+        except Exception as e:
+            if sp.retry_policy.is_retryable(e):
+                raise
+            # API de workbook indisponível/recusada: segue com a regravação completa
+
+    base_df, trocados = _gravar_completo(pedidos, on_retry=on_retry, rec=rec)
+    return [{"df": base_df, "trocados": t} for t in trocados]
+
+
+# Fila write-behind (None = cada submissão grava sozinha, na própria sessão)
+@st.cache_resource
+def _write_behind():
+    if WRITE_BEHIND_WINDOW <= 0:
+        return None
+    # recursos resolvidos aqui, na thread do script; a thread da fila só os usa
+    rec = _recursos()
+    return WriteBehindQueue(lambda pedidos: _gravar(pedidos, rec=rec), window=WRITE_BEHIND_WINDOW).start()
+
+
+def _resultado_gravacao(resultado: dict) -> pd.DataFrame:
+    if resultado["trocados"]:
+        st.warning("IDs já usados por outra sessão foram trocados: "
+                   + ", ".join(f"{antigo} → {novo}" for antigo, novo in resultado["trocados"].items()))
+    st.success("Mudanças submetidas com sucesso! Recarregue a página para ver as mudanças")
+    return resultado["df"]
+
+
+def show_pending_save_status():
+    """Status da gravação que ficou na fila do write-behind numa execução anterior desta sessão."""
+    pedido = st.session_state.get("gravacao_pendente")
+    if pedido is None:
+        return
+    if not pedido.future.done():
+        st.info(f"Gravação na fila ({pedido.status}). Atualize em instantes para ver o resultado.")
+        return
+    del st.session_state["gravacao_pendente"]
+    try:
+        _resultado_gravacao(pedido.future.result())
+        st.cache_data.clear()
+    except Exception as e:
+        st.error(f"Erro ao salvar no SharePoint (Graph): {e}")
+
+
+def update_sharepoint_file(df: pd.DataFrame, usuario: str = "", operacao: str = "ATUALIZAÇÃO", responsavel_indicado: str = "", alteracoes_detalhadas: list = None,
+                           ids_criados: set[str] | None = None) -> pd.DataFrame | None:
     """
     Atualiza o arquivo Excel no SharePoint de forma segura, com logging e monitoramento.
 
@@ -288,190 +842,65 @@ def update_sharepoint_file(df: pd.DataFrame, usuario: str = "", operacao: str =
     3. Para linhas novas: adiciona ao final
     4. Registra operação no log
     5. Salva arquivo com ambas as sheets
-    6. Tenta novamente em caso de conflito de versão
+    6. Tenta novamente em caso de conflito de versão, bloqueio ou throttling (RetryPolicy)
+
+    Com o write-behind ligado ([graph] write_behind_window), a submissão entra
+    na fila do processo e é gravada junto com as que chegarem na mesma janela.
 
     Parâmetros:
         alteracoes_detalhadas: Lista de dicts com alterações específicas para log detalhado.
             Cada dict deve ter: {"id": str, "estudo": str, "campo": str, "valor_anterior": str, "valor_depois": str, "resp_indicado": str}
+        ids_criados: IDs gerados nesta submissão (linhas novas). Se algum já existir na
+            versão atual do arquivo (outra sessão usou o mesmo ID), é trocado por um ID livre
+            em vez de sobrescrever a linha existente.
     """
-    attempts = 0
-    while True:
-        try:
-            # Carrega versão mais recente do arquivo
-            data = _sp().download(APONT_FILE)
-            xls = pd.ExcelFile(io.BytesIO(data))
-
-            # Carrega sheet de apontamentos (tenta 'apontamentos' ou 'Sheet1')
-            if "apontamentos" in xls.sheet_names:
-                base_df = pd.read_excel(xls, sheet_name="apontamentos")
-            elif "Sheet1" in xls.sheet_names:
-                base_df = pd.read_excel(xls, sheet_name="Sheet1")
-            else:
-                base_df = pd.DataFrame()
-
-            # Carrega sheet de log (ou cria vazio)
-            if "log" in xls.sheet_names:
-                log_df = pd.read_excel(xls, sheet_name="log")
-                # Adiciona coluna "Responsável Indicado" se não existir
-                if "Responsável Indicado" not in log_df.columns:
-                    log_df["Responsável Indicado"] = ""
-            else:
-                log_df = pd.DataFrame(columns=["Data", "ID", "Estudo", "Operação", "Campo", "Valor Anterior", "Valor Depois", "Responsável", "Responsável Indicado"])
+    if "ID" not in df.columns:
+        st.error("DataFrame sem coluna ID!")
+        return None
 
-            df_to_save = df.copy()
-            if "ID" not in df_to_save.columns:
-                st.error("DataFrame sem coluna ID!")
+    pedido = _pedido_gravacao(df, usuario, operacao, responsavel_indicado, alteracoes_detalhadas, ids_criados)
+    fila = _write_behind()
+    try:
+        if fila is None:
+            resultado = _gravar([pedido], on_retry=_warn_retry)[0]
+        else:
+            na_fila = fila.submit(usuario, pedido)
+            try:
+                with st.spinner("Gravando no SharePoint..."):
+                    resultado = na_fila.future.result(timeout=WRITE_BEHIND_TIMEOUT)
+            except FutureTimeout:
+                # segue na fila; o status aparece nas próximas execuções da sessão
+                st.session_state["gravacao_pendente"] = na_fila
+                st.info("Gravação na fila. Atualize em instantes para ver o resultado.")
                 return None
+    except Exception as e:
+        st.error(f"Erro ao salvar no SharePoint (Graph): {e}")
+        return None
 
-            df_to_save["ID"] = df_to_save["ID"].astype(str)
-
-            # Variáveis para logging
-            ids_novos = []
-            ids_atualizados = []
-
-            if not base_df.empty:
-                base_df["ID"] = base_df["ID"].astype(str)
-
-                # Separa registros novos dos existentes
-                ids_to_save = set(df_to_save["ID"].tolist())
-                existing_ids = set(base_df["ID"].tolist())
-
-                new_ids = ids_to_save - existing_ids
-                update_ids = ids_to_save & existing_ids
-
-                # Adiciona registros completamente novos
-                if new_ids:
-                    new_rows = df_to_save[df_to_save["ID"].isin(new_ids)]
-                    base_df = pd.concat([base_df, new_rows], ignore_index=True)
-                    ids_novos = list(new_ids)
-
-                # Atualiza registros existentes coluna por coluna
-                for id_val in update_ids:
-                    idx_base = base_df.index[base_df["ID"] == id_val].tolist()
-                    idx_update = df_to_save.index[df_to_save["ID"] == id_val].tolist()
-
-                    if idx_base and idx_update:
-                        idx_b = idx_base[0]
-                        idx_u = idx_update[0]
+    return _resultado_gravacao(resultado)
 
-                        # Atualiza apenas as colunas que existem em ambos
-                        for col in df_to_save.columns:
-                            if col in base_df.columns:
-                                base_df.at[idx_b, col] = df_to_save.at[idx_u, col]
-                        ids_atualizados.append(id_val)
-            else:
-                # Se o arquivo está vazio, salva tudo
-                base_df = df_to_save.copy()
-                ids_novos = df_to_save["ID"].tolist()
-
-            # === ADICIONA ENTRADAS NO LOG ===
-            # Se alteracoes_detalhadas foi fornecido (vem do Painel ADM), usa ele
-            if alteracoes_detalhadas:
-                for alt in alteracoes_detalhadas:
-                    nova_log_entry = pd.DataFrame([{
-                        "Data": datetime.now(),
-                        "ID": alt.get("id", ""),
-                        "Estudo": alt.get("estudo", ""),
-                        "Operação": operacao,
-                        "Campo": alt.get("campo", ""),
-                        "Valor Anterior": alt.get("valor_anterior", ""),
-                        "Valor Depois": alt.get("valor_depois", ""),
-                        "Responsável": usuario if usuario else "Sistema",
-                        "Responsável Indicado": alt.get("resp_indicado", responsavel_indicado)
-                    }])
-                    log_df = pd.concat([log_df, nova_log_entry], ignore_index=True)
-            else:
-                # Lógica padrão para compatibilidade com Forms-OP-clinica
-                # Para cada ID criado, adiciona uma entrada no log
-                for id_val in ids_novos:
-                    # Pega o estudo do apontamento
-                    estudo = df_to_save.loc[df_to_save["ID"] == id_val, "Código do Estudo"].iloc[0] if "Código do Estudo" in df_to_save.columns else ""
-                    status_novo = df_to_save.loc[df_to_save["ID"] == id_val, "Status"].iloc[0] if "Status" in df_to_save.columns else "PENDENTE"
-
-                    # Pega o responsável pela correção do apontamento
-                    resp_correcao = df_to_save.loc[df_to_save["ID"] == id_val, "Responsável Pela Correção"].iloc[0] if "Responsável Pela Correção" in df_to_save.columns else ""
-
-                    nova_log_entry = pd.DataFrame([{
-                        "Data": datetime.now(),
-                        "ID": id_val,
-                        "Estudo": estudo,
-                        "Operação": operacao,
-                        "Campo": "Status",
-                        "Valor Anterior": "",
-                        "Valor Depois": status_novo,
-                        "Responsável": usuario if usuario else "Sistema",
-                        "Responsável Indicado": responsavel_indicado if responsavel_indicado else resp_correcao
-                    }])
-                    log_df = pd.concat([log_df, nova_log_entry], ignore_index=True)
-
-                # Para cada ID atualizado, adiciona uma entrada no log
-                for id_val in ids_atualizados:
-                    # Pega valores antigos e novos
-                    valor_anterior = base_df.loc[base_df["ID"] == id_val, "Status"].iloc[0] if "Status" in base_df.columns else ""
-                    valor_depois = df_to_save.loc[df_to_save["ID"] == id_val, "Status"].iloc[0] if "Status" in df_to_save.columns else ""
-                    estudo = df_to_save.loc[df_to_save["ID"] == id_val, "Código do Estudo"].iloc[0] if "Código do Estudo" in df_to_save.columns else ""
-
-                    # Só registra se houver mudança
-                    if valor_anterior != valor_depois:
-                        # Pega o responsável pela correção do apontamento
-                        resp_correcao = df_to_save.loc[df_to_save["ID"] == id_val, "Responsável Pela Correção"].iloc[0] if "Responsável Pela Correção" in df_to_save.columns else ""
-
-                        nova_log_entry = pd.DataFrame([{
-                            "Data": datetime.now(),
-                            "ID": id_val,
-                            "Estudo": estudo,
-                            "Operação": operacao,
-                            "Campo": "Status",
-                            "Valor Anterior": valor_anterior,
-                            "Valor Depois": valor_depois,
-                            "Responsável": usuario if usuario else "Sistema",
-                            "Responsável Indicado": responsavel_indicado if responsavel_indicado else resp_correcao
-                        }])
-                        log_df = pd.concat([log_df, nova_log_entry], ignore_index=True)
-
-            # === SALVA O ARQUIVO COM MÚLTIPLAS SHEETS ===
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                base_df.to_excel(writer, sheet_name='apontamentos', index=False)
-                log_df.to_excel(writer, sheet_name='log', index=False)
-            output.seek(0)
-
-            _sp().upload_small(APONT_FILE, output.getvalue(), overwrite=True)
-
-            st.success("Mudanças submetidas com sucesso! Recarregue a página para ver as mudanças")
-            return base_df
 
-        except Exception as e:
-            attempts += 1
-            msg = str(e)
 
-            # Adiciona log de erro
-            try:
-                log_erro = pd.DataFrame([{
-                    "Data": datetime.now(),
-                    "ID": "",
-                    "Estudo": "",
-                    "Operação": operacao,
-                    "Campo": "ERRO",
-                    "Valor Anterior": "",
-                    "Valor Depois": msg[:100],
-                    "Responsável": usuario if usuario else "Sistema",
-                    "Responsável Indicado": ""
-                }])
-                if 'log_df' in locals():
-                    log_df = pd.concat([log_erro, log_df], ignore_index=True)
-            except:
-                pass
-
-            # 409/412 = conflito de versão | 429 = throttling
-            if any(x in msg for x in ["409", "412", "429"]) and attempts < 5:
-                st.warning("Outra pessoa está salvando ou limite de chamadas. Tentando novamente em 5 segundos...")
-                time.sleep(5)
-                continue
-            st.error(f"Erro ao salvar no SharePoint (Graph): {msg}")
-            return None
+# --------------------------------------------------------------------
+# Detector de mudanças (delta) -> invalida só o cache do arquivo alterado
+# --------------------------------------------------------------------
+def _invalidate_file_cache(name: str):
+    if name == "colaboradores":
+        _snapshots().invalidate(COLABS_FILE)
+        read_excel_sheets_from_sharepoint.clear()
+    elif name == "apontamentos":
+        _snapshots().invalidate(APONT_FILE)
+        get_sharepoint_file.clear()
 
 
+@st.cache_resource
+def _delta_poller():
+    return DeltaPoller(
+        _sp(),
+        {"colaboradores": COLABS_FILE, "apontamentos": APONT_FILE},
+        on_change=_invalidate_file_cache,
+        interval=DELTA_INTERVAL,
+    ).start()
 
 
 def get_deslig_state(colab_key: str, default_date: date | None, default_reason: str):
@@ -493,16 +922,10 @@ def so_digitos(v):
 def clear_cache_and_reload():
     st.cache_data.clear()
 
-def generate_custom_id(existing_ids: set[str]) -> str:
-    while True:
-        digits = random.choices(string.digits, k=3)
-        letters = random.choices(string.ascii_uppercase, k=2)
-        chars = digits + letters
-        random.shuffle(chars)
-        new_id = "".join(chars)
-        if new_id not in existing_ids:
-            return new_id
-        
+def generate_custom_id() -> str:
+    """ID livre (3 dígitos + 2 letras embaralhados), reservado no alocador do processo."""
+    return _id_allocator().allocate()
+
 
 
 # -------------------------------------------------
@@ -539,6 +962,9 @@ st.session_state["user_email"] = user_email
 
 
 def main():
+    # thread única por processo; mantém os caches em dia sem re-downloads periódicos
+    _delta_poller()
+
     st.title("📋 Painel ADM")
     tabs = st.tabs(["Apontamentos", "Posições", "Atualizar Colaborador", "Novo Colaborador"])
 
@@ -863,27 +1289,28 @@ def main():
 
 
         # 2) Converte colunas de data ------------------------------------------------
-        colunas_data = [
-            "Data do Apontamento", "Prazo Para Resolução", "Data de Verificação",
-            "Data Resolução", "Data Atualização", "Disponibilizado para Verificação",
-            "Data Início Verificação"
-        ]
+        # (já chegam como datetime64 pelo schema; o editor trabalha com date)
+        colunas_data = list(schemas.APONTAMENTOS_DATAS)
         for col in colunas_data:
             if col in df.columns:
-                df[col] = (
-                    pd.to_datetime(df[col], format="%d/%m/%Y", errors="coerce")
-                      .dt.date
-                )
+                df[col] = pd.to_datetime(df[col], errors="coerce").dt.date
 
         # 3) Cópia para filtros ------------------------------------------------------
         df_filtrado = df.copy()
 
 
+        # resultado de uma gravação que ficou na fila do write-behind
+        show_pending_save_status()
+
         col_btn1, col_btn2, col_btn3, *_ = st.columns(6)
 
 
         with col_btn1:
             st.button("🔄  Atualizar", key="btn_clear_cache", on_click=clear_cache_and_reload)
+        if _journal() is not None:
+            with col_btn2:
+                st.button("📜  Exportar log", key="btn_export_log", on_click=export_log_sheet)
+        show_log_viewer()
 
         # 4) Filtro por Código do Estudo --------------------------------------------
         columns_to_display = [
@@ -934,21 +1361,13 @@ def main():
         plant = sorted(df["Plantão"].dropna().unique())
 
 
+        # domínios fixos vêm do schema (mesmas categorias aplicadas na carga)
         selectbox_columns_opcoes = {
-            "Status": [
-                "REALIZADO DURANTE A CONDUÇÃO", "REALIZADO", "VERIFICANDO", "PENDENTE", "NÃO APLICÁVEL"
-            ],
-            "Origem Do Apontamento": [
-                "Documentação Clínica", "Excelência Operacional", "Operações Clínicas",
-                "Patrocinador / Monitor", "Garantia Da Qualidade"
-            ],
-            "Participante": [
-                'N/A', 'Outros', 'PP01', 'PP02', 'PP03', 'PP04', 'PP05', 'PP06', 'PP07', 'PP08', 'PP09', 'PP10', 'PP11', 'PP12', 'PP13', 'PP14', 'PP15', 'PP16', 'PP17', 'PP18', 'PP19', 'PP20', 'PP21', 'PP22', 'PP23', 'PP24', 'PP25', 'PP26', 'PP27', 'PP28', 'PP29', 'PP30', 'PP31', 'PP32', 'PP33', 'PP34', 'PP35', 'PP36', 'PP37', 'PP38', 'PP39', 'PP40', 'PP41', 'PP42', 'PP43', 'PP44', 'PP45', 'PP46', 'PP47', 'PP48', 'PP49', 'PP50', 'PP51', 'PP52', 'PP53', 'PP54', 'PP55', 'PP56', 'PP57', 'PP58', 'PP59', 'PP60', 'PP61', 'PP62', 'PP63', 'PP64', 'PP65', 'PP66', 'PP67', 'PP68', 'PP69', 'PP70', 'PP71', 'PP72', 'PP73', 'PP74', 'PP75', 'PP76', 'PP77', 'PP78', 'PP79', 'PP80', 'PP81', 'PP82', 'PP83', 'PP84', 'PP85', 'PP86', 'PP87', 'PP88', 'PP89', 'PP90', 'PP91', 'PP92', 'PP93', 'PP94', 'PP95', 'PP96', 'PP97', 'PP98', 'PP99', 'PP100', 'PP101', 'PP102', 'PP103', 'PP104', 'PP105', 'PP106', 'PP107', 'PP108', 'PP109', 'PP110', 'PP111', 'PP112', 'PP113', 'PP114', 'PP115', 'PP116', 'PP117', 'PP118', 'PP119', 'PP120', 'PP121', 'PP122', 'PP123', 'PP124', 'PP125', 'PP126', 'PP127', 'PP128', 'PP129', 'PP130', 'PP131', 'PP132', 'PP133', 'PP134', 'PP135', 'PP136', 'PP137', 'PP138', 'PP139', 'PP140', 'PP141', 'PP142', 'PP143', 'PP144', 'PP145', 'PP146', 'PP147', 'PP148', 'PP149', 'PP150', 'PP151', 'PP152', 'PP153', 'PP154', 'PP155', 'PP156', 'PP157', 'PP158', 'PP159', 'PP160', 'PP161', 'PP162', 'PP163', 'PP164', 'PP165', 'PP166', 'PP167', 'PP168', 'PP169', 'PP170', 'PP171', 'PP172', 'PP173', 'PP174', 'PP175', 'PP176', 'PP177', 'PP178', 'PP179', 'PP180', 'PP181', 'PP182', 'PP183', 'PP184', 'PP185', 'PP186', 'PP187', 'PP188', 'PP189', 'PP190', 'PP191', 'PP192', 'PP193', 'PP194', 'PP195', 'PP196', 'PP197', 'PP198', 'PP199', 'PP200', 'PP201', 'PP202', 'PP203', 'PP204', 'PP205', 'PP206', 'PP207', 'PP208', 'PP209', 'PP210', 'PP211', 'PP212', 'PP213', 'PP214', 'PP215', 'PP216', 'PP217', 'PP218', 'PP219', 'PP220', 'PP221', 'PP222', 'PP223', 'PP224', 'PP225', 'PP226', 'PP227', 'PP228', 'PP229', 'PP230', 'PP231', 'PP232', 'PP233', 'PP234', 'PP235', 'PP236', 'PP237', 'PP238', 'PP239', 'PP240', 'PP241', 'PP242', 'PP243', 'PP244', 'PP245', 'PP246', 'PP247', 'PP248', 'PP249', 'PP250', 'PP251', 'PP252', 'PP253', 'PP254', 'PP255', 'PP256', 'PP257', 'PP258', 'PP259', 'PP260', 'PP261', 'PP262', 'PP263', 'PP264', 'PP265', 'PP266', 'PP267', 'PP268', 'PP269', 'PP270', 'PP271', 'PP272', 'PP273', 'PP274', 'PP275', 'PP276', 'PP277', 'PP278', 'PP279', 'PP280', 'PP281', 'PP282', 'PP283', 'PP284', 'PP285', 'PP286', 'PP287', 'PP288', 'PP289', 'PP290', 'PP291', 'PP292', 'PP293', 'PP294', 'PP295', 'PP296', 'PP297', 'PP298', 'PP299', 'PP300', 'PP301', 'PP302', 'PP303', 'PP304', 'PP305', 'PP306', 'PP307', 'PP308', 'PP309', 'PP310', 'PP311', 'PP312', 'PP313', 'PP314', 'PP315', 'PP316', 'PP317', 'PP318', 'PP319', 'PP320', 'PP321', 'PP322', 'PP323', 'PP324', 'PP325', 'PP326', 'PP327', 'PP328', 'PP329', 'PP330', 'PP331', 'PP332', 'PP333', 'PP334', 'PP335', 'PP336', 'PP337', 'PP338', 'PP339', 'PP340', 'PP341', 'PP342', 'PP343', 'PP344', 'PP345', 'PP346', 'PP347', 'PP348', 'PP349', 'PP350', 'PP351', 'PP352', 'PP353', 'PP354', 'PP355', 'PP356', 'PP357', 'PP358', 'PP359', 'PP360', 'PP361', 'PP362', 'PP363', 'PP364', 'PP365', 'PP366', 'PP367', 'PP368', 'PP369', 'PP370', 'PP371', 'PP372', 'PP373', 'PP374', 'PP375', 'PP376', 'PP377', 'PP378', 'PP379', 'PP380', 'PP381', 'PP382', 'PP383', 'PP384', 'PP385', 'PP386', 'PP387', 'PP388', 'PP389', 'PP390', 'PP391', 'PP392', 'PP393', 'PP394', 'PP395', 'PP396', 'PP397', 'PP398', 'PP399', 'PP400', 'PP401', 'PP402', 'PP403', 'PP404', 'PP405', 'PP406', 'PP407', 'PP408', 'PP409', 'PP410', 'PP411', 'PP412', 'PP413', 'PP414', 'PP415', 'PP416', 'PP417', 'PP418', 'PP419', 'PP420', 'PP421', 'PP422', 'PP423', 'PP424', 'PP425', 'PP426', 'PP427', 'PP428', 'PP429', 'PP430', 'PP431', 'PP432', 'PP433', 'PP434', 'PP435', 'PP436', 'PP437', 'PP438', 'PP439', 'PP440', 'PP441', 'PP442', 'PP443', 'PP444', 'PP445', 'PP446', 'PP447', 'PP448', 'PP449', 'PP450', 'PP451', 'PP452', 'PP453', 'PP454', 'PP455', 'PP456', 'PP457', 'PP458', 'PP459', 'PP460', 'PP461', 'PP462', 'PP463', 'PP464', 'PP465', 'PP466', 'PP467', 'PP468', 'PP469', 'PP470', 'PP471', 'PP472', 'PP473', 'PP474', 'PP475', 'PP476', 'PP477', 'PP478', 'PP479', 'PP480', 'PP481', 'PP482', 'PP483', 'PP484', 'PP485', 'PP486', 'PP487', 'PP488', 'PP489', 'PP490', 'PP491', 'PP492', 'PP493', 'PP494', 'PP495', 'PP496', 'PP497', 'PP498', 'PP499', 'PP500', 'PP501', 'PP502', 'PP503', 'PP504', 'PP505', 'PP506', 'PP507', 'PP508', 'PP509', 'PP510', 'PP511', 'PP512', 'PP513', 'PP514', 'PP515', 'PP516', 'PP517', 'PP518', 'PP519', 'PP520', 'PP521', 'PP522', 'PP523', 'PP524', 'PP525', 'PP526', 'PP527', 'PP528', 'PP529', 'PP530', 'PP531', 'PP532', 'PP533', 'PP534', 'PP535', 'PP536', 'PP537', 'PP538', 'PP539', 'PP540', 'PP541', 'PP542', 'PP543', 'PP544', 'PP545', 'PP546', 'PP547', 'PP548', 'PP549', 'PP550', 'PP551', 'PP552', 'PP553', 'PP554', 'PP555', 'PP556', 'PP557', 'PP558', 'PP559', 'PP560', 'PP561', 'PP562', 'PP563', 'PP564', 'PP565', 'PP566', 'PP567', 'PP568', 'PP569', 'PP570', 'PP571', 'PP572', 'PP573', 'PP574', 'PP575', 'PP576', 'PP577', 'PP578', 'PP579', 'PP580', 'PP581', 'PP582', 'PP583', 'PP584', 'PP585', 'PP586', 'PP587', 'PP588', 'PP589', 'PP590', 'PP591', 'PP592', 'PP593', 'PP594', 'PP595', 'PP596', 'PP597', 'PP598', 'PP599', 'PP600', 'PP601', 'PP602', 'PP603', 'PP604', 'PP605', 'PP606', 'PP607', 'PP608', 'PP609', 'PP610', 'PP611', 'PP612', 'PP613', 'PP614', 'PP615', 'PP616', 'PP617', 'PP618', 'PP619', 'PP620', 'PP621', 'PP622', 'PP623', 'PP624', 'PP625', 'PP626', 'PP627', 'PP628', 'PP629', 'PP630', 'PP631', 'PP632', 'PP633', 'PP634', 'PP635', 'PP636', 'PP637', 'PP638', 'PP639', 'PP640', 'PP641', 'PP642', 'PP643', 'PP644', 'PP645', 'PP646', 'PP647', 'PP648', 'PP649', 'PP650', 'PP651', 'PP652', 'PP653', 'PP654', 'PP655', 'PP656', 'PP657', 'PP658', 'PP659', 'PP660', 'PP661', 'PP662', 'PP663', 'PP664', 'PP665', 'PP666', 'PP667', 'PP668', 'PP669', 'PP670', 'PP671', 'PP672', 'PP673', 'PP674', 'PP675', 'PP676', 'PP677', 'PP678', 'PP679', 'PP680', 'PP681', 'PP682', 'PP683', 'PP684', 'PP685', 'PP686', 'PP687', 'PP688', 'PP689', 'PP690', 'PP691', 'PP692', 'PP693', 'PP694', 'PP695', 'PP696', 'PP697', 'PP698', 'PP699', 'PP700', 'PP701', 'PP702', 'PP703', 'PP704', 'PP705', 'PP706', 'PP707', 'PP708', 'PP709', 'PP710', 'PP711', 'PP712', 'PP713', 'PP714', 'PP715', 'PP716', 'PP717', 'PP718', 'PP719', 'PP720', 'PP721', 'PP722', 'PP723', 'PP724', 'PP725', 'PP726', 'PP727', 'PP728', 'PP729', 'PP730', 'PP731', 'PP732', 'PP733', 'PP734', 'PP735', 'PP736', 'PP737', 'PP738', 'PP739', 'PP740', 'PP741', 'PP742', 'PP743', 'PP744', 'PP745', 'PP746', 'PP747', 'PP748', 'PP749', 'PP750', 'PP751', 'PP752', 'PP753', 'PP754', 'PP755', 'PP756', 'PP757', 'PP758', 'PP759', 'PP760', 'PP761', 'PP762', 'PP763', 'PP764', 'PP765', 'PP766', 'PP767', 'PP768', 'PP769', 'PP770', 'PP771', 'PP772', 'PP773', 'PP774', 'PP775', 'PP776', 'PP777', 'PP778', 'PP779', 'PP780', 'PP781', 'PP782', 'PP783', 'PP784', 'PP785', 'PP786', 'PP787', 'PP788', 'PP789', 'PP790', 'PP791', 'PP792', 'PP793', 'PP794', 'PP795', 'PP796', 'PP797', 'PP798', 'PP799', 'PP800', 'PP801', 'PP802', 'PP803', 'PP804', 'PP805', 'PP806', 'PP807', 'PP808', 'PP809', 'PP810', 'PP811', 'PP812', 'PP813', 'PP814', 'PP815', 'PP816', 'PP817', 'PP818', 'PP819', 'PP820', 'PP821', 'PP822', 'PP823', 'PP824', 'PP825', 'PP826', 'PP827', 'PP828', 'PP829', 'PP830', 'PP831', 'PP832', 'PP833', 'PP834', 'PP835', 'PP836', 'PP837', 'PP838', 'PP839', 'PP840', 'PP841', 'PP842', 'PP843', 'PP844', 'PP845', 'PP846', 'PP847', 'PP848', 'PP849', 'PP850', 'PP851', 'PP852', 'PP853', 'PP854', 'PP855', 'PP856', 'PP857', 'PP858', 'PP859', 'PP860', 'PP861', 'PP862', 'PP863', 'PP864', 'PP865', 'PP866', 'PP867', 'PP868', 'PP869', 'PP870', 'PP871', 'PP872', 'PP873', 'PP874', 'PP875', 'PP876', 'PP877', 'PP878', 'PP879', 'PP880', 'PP881', 'PP882', 'PP883', 'PP884', 'PP885', 'PP886', 'PP887', 'PP888', 'PP889', 'PP890', 'PP891', 'PP892', 'PP893', 'PP894', 'PP895', 'PP896', 'PP897', 'PP898', 'PP899', 'PP900', 'PP901', 'PP902', 'PP903', 'PP904', 'PP905', 'PP906', 'PP907', 'PP908', 'PP909', 'PP910', 'PP911', 'PP912', 'PP913', 'PP914', 'PP915', 'PP916', 'PP917', 'PP918', 'PP919', 'PP920', 'PP921', 'PP922', 'PP923', 'PP924', 'PP925', 'PP926', 'PP927', 'PP928', 'PP929', 'PP930', 'PP931', 'PP932', 'PP933', 'PP934', 'PP935', 'PP936', 'PP937', 'PP938', 'PP939', 'PP940', 'PP941', 'PP942', 'PP943', 'PP944', 'PP945', 'PP946', 'PP947', 'PP948', 'PP949', 'PP950', 'PP951', 'PP952', 'PP953', 'PP954', 'PP955', 'PP956', 'PP957', 'PP958', 'PP959', 'PP960', 'PP961', 'PP962', 'PP963', 'PP964', 'PP965', 'PP966', 'PP967', 'PP968', 'PP969', 'PP970', 'PP971', 'PP972', 'PP973', 'PP974', 'PP975', 'PP976', 'PP977', 'PP978', 'PP979', 'PP980', 'PP981', 'PP982', 'PP983', 'PP984', 'PP985', 'PP986', 'PP987', 'PP988', 'PP989', 'PP990', 'PP991', 'PP992', 'PP993', 'PP994', 'PP995', 'PP996', 'PP997', 'PP998', 'PP999'],
-            "Período": [
-                'N/a', 'Pós','1° Período', '2° Período', '3° Período', '4° Período', '5° Período',
-                '6° Período', '7° Período', '8° Período', '9° Período', '10° Período'
-            ],
-            "Grau De Criticidade Do Apontamento": ["Baixo", "Médio", "Alto"],
+            "Status": schemas.STATUS,
+            "Origem Do Apontamento": schemas.ORIGEM,
+            "Participante": schemas.PARTICIPANTE,
+            "Período": schemas.PERIODO,
+            "Grau De Criticidade Do Apontamento": schemas.CRITICIDADE,
 
             "Código do Estudo": opcoes_estudos,
 
@@ -973,7 +1392,7 @@ def main():
             elif col == "ID":
                 columns_config[col] = st.column_config.TextColumn("ID", disabled=True)
             else:
-                df_view[col] = df_view[col].astype(str).replace("nan", "")
+                df_view[col] = df_view[col].astype(str).replace({"nan": "", "<NA>": ""})
                 columns_config[col] = st.column_config.TextColumn(col)
 
         columns_config["Data Atualização"] = st.column_config.DateColumn(
@@ -987,7 +1406,8 @@ def main():
             "Data Início Verificação", format="DD/MM/YYYY", disabled=False
         )
 
-        snapshot = df_view.copy(deep=True)
+        # o editor recebe object (categorias/strings Arrow só na carga e nos filtros)
+        snapshot = schemas.as_object(df_view)
         # Colunas excluídas da comparação (campos automáticos)
         cols_excluir_cmp = ("ID", "Data Atualização", "Responsável Atualização")
         cols_cmp = [c for c in snapshot.columns if c not in cols_excluir_cmp]
@@ -1012,131 +1432,82 @@ def main():
                 st.warning("Escolha quem é o responsável antes de submeter.")
                 st.stop()
 
-            existing_ids = set(df["ID"].astype(str))
-            linhas_sem_id = df_editado["ID"].isna() | (df_editado["ID"].astype(str).str.strip() == "")
-            for idx in df_editado[linhas_sem_id].index:
-                new_id = generate_custom_id(existing_ids)
-                df_editado.at[idx, "ID"] = new_id
-                existing_ids.add(new_id)
-
-            df_editado["ID"] = df_editado["ID"].astype(str)
-
-            # 3) Função de normalização --------------------------------------------
-            def _norm(df_like: pd.DataFrame) -> pd.DataFrame:
-                return (
-                    df_like[cols_cmp]
-                    .astype(str)
-                    .apply(lambda s: s.str.strip().replace("nan", ""))
-                )
-
-            # 4) Detecção de alterações ---------------------------------------------
-            # Verifica se há novas linhas pelo número de linhas
-            if len(df_editado) <= len(snapshot) and _norm(snapshot).equals(_norm(df_editado)):
-                st.toast("Nenhuma alteração detectada. Nada foi salvo!")
-                st.stop()
+            def _gerar_ids(frame: pd.DataFrame) -> pd.DataFrame:
+                """Preenche o ID das linhas que chegaram sem (linhas novas do editor), reservando em lote."""
+                sem_id = frame["ID"].isna() | (frame["ID"].astype(str).str.strip() == "")
+                if sem_id.any():
+                    frame.loc[sem_id, "ID"] = _id_allocator().reserve(int(sem_id.sum()))
+                frame["ID"] = frame["ID"].astype(str)
+                return frame
 
+            # 3) Detecção de alterações ---------------------------------------------
+            # changeset (id, campo, antes, depois) -> alimenta a atualização do df e o log
             data_atual = datetime.now()
+            contexto = {"estudo": "Código do Estudo", "resp_indicado": "Responsável Indicado"}
+            df["ID"] = df["ID"].astype(str)
+
+            estado = st.session_state.get("apontamentos")
+            if isinstance(estado, dict) and "edited_rows" in estado:
+                # Estado do editor (edited_rows/added_rows/deleted_rows): só as
+                # células tocadas são lidas, sem comparar a grade inteira
+                antes, depois, novas, removidos = changeset.from_editor_state(
+                    estado, snapshot, date_columns=colunas_data)
+
+                # Linhas esvaziadas → será considerado exclusão; novas vazias são ignoradas
+                linhas_vazias = changeset.empty_rows(depois, cols_cmp)
+                depois = depois.drop(linhas_vazias)
+                removidos = pd.Index(removidos).union(linhas_vazias)
+                novas = novas.drop(changeset.empty_rows(novas, cols_cmp))
+                novas = _gerar_ids(novas).set_index("ID")
+                novas = novas[~novas.index.duplicated()]
+
+                alteradas = changeset.diff(antes, depois, cols_cmp, contexto)
+                edit_idx = pd.concat([depois, novas])
+            else:
+                # Sem estado do editor: diff vetorizado da grade inteira
+                df_editado = _gerar_ids(df_editado)
+                snap_idx = snapshot.set_index("ID")
+                edit_idx = df_editado.set_index("ID")
+                edit_idx = edit_idx[~edit_idx.index.duplicated()]
+
+                # Linhas marcadas como vazias → será considerado exclusão ----------------
+                linhas_vazias = changeset.empty_rows(edit_idx, cols_cmp)
+                if len(linhas_vazias) > 0:
+                    edit_idx = edit_idx.drop(linhas_vazias)
+
+                removidos = snap_idx.index.difference(edit_idx.index).union(linhas_vazias)
+                novas = edit_idx.loc[edit_idx.index.difference(snap_idx.index)]
+
+                # Linhas em comum: compara direto com o df carregado (a versão que é mesclada)
+                alteradas = changeset.diff(df.set_index("ID"), edit_idx.drop(novas.index), cols_cmp, contexto)
+
+            # Linhas novas: cada campo preenchido entra como "criação"
+            novas_linhas = novas.index
+            criadas = changeset.created(novas, cols_cmp, contexto)
+            cs = pd.concat([criadas, alteradas], ignore_index=True)
 
-            # Reindexação para comparação
-            snap_idx = snapshot.set_index("ID")
-            edit_idx = df_editado.set_index("ID")
-
-            # Linhas marcadas como vazias → será considerado exclusão ----------------
-            linhas_vazias = edit_idx.index[
-                _norm(edit_idx)[cols_cmp].replace("", pd.NA).isna().all(axis=1)
-            ]
-            if len(linhas_vazias) > 0:
-                edit_idx = edit_idx.drop(linhas_vazias)
-
-            removidos = snap_idx.index.difference(edit_idx.index).union(linhas_vazias)
-
-            # Linhas em comum alteradas ---------------------------------------------
-            comuns = snap_idx.index.intersection(edit_idx.index)
-            snap_cmp = _norm(snap_idx.loc[comuns].reset_index())
-            edit_cmp = _norm(edit_idx.loc[comuns].reset_index())
-            diff_mask = snap_cmp.ne(edit_cmp).any(axis=1)
-            linhas_alt = edit_idx.loc[comuns].reset_index().loc[diff_mask]
-
-            idx_modificados = []
-            df[cols_cmp] = df[cols_cmp].astype(object)
-
-            # Lista para armazenar todas as alterações detalhadas para o log
-            alteracoes_detalhadas = []
-
-            # Função auxiliar para normalizar valor para comparação e log
-            def _normalizar_valor(val):
-                if pd.isna(val) or val is None:
-                    return ""
-                return str(val).strip()
-
-            # Processa novas linhas
-            novas_linhas = edit_idx.index.difference(snap_idx.index)
-            if len(novas_linhas) > 0:
-                novas = edit_idx.loc[novas_linhas].reset_index()
-                for _, row in novas.iterrows():
-                    df = pd.concat([df, row.to_frame().T], ignore_index=True)
-                    rid = str(row["ID"])
-                    idx_modificados.append(rid)
-
-                    # Pega estudo e responsável indicado para o log
-                    estudo = _normalizar_valor(row.get("Código do Estudo", ""))
-                    resp_indicado = _normalizar_valor(row.get("Responsável Indicado", ""))
-
-                    # Para novas linhas, registra cada campo preenchido como "criação"
-                    for col in cols_cmp:
-                        valor_novo = _normalizar_valor(row.get(col, ""))
-                        if valor_novo:  # Só registra se tiver valor
-                            alteracoes_detalhadas.append({
-                                "id": rid,
-                                "estudo": estudo,
-                                "campo": col,
-                                "valor_anterior": "",
-                                "valor_depois": valor_novo,
-                                "resp_indicado": resp_indicado
-                            })
-
-            # Processa linhas alteradas
-            for _, row in linhas_alt.iterrows():
-                rid = str(row["ID"])
-                if not _norm(df.loc[df["ID"] == rid]).equals(_norm(row.to_frame().T)):
-                    # Pega linha original para comparação campo a campo
-                    linha_original = df.loc[df["ID"] == rid].iloc[0]
-
-                    status_ant = str(linha_original.get("Status", "")).strip().upper()
-
-                    # Pega estudo e responsável indicado para o log
-                    estudo = _normalizar_valor(row.get("Código do Estudo", ""))
-                    resp_indicado = _normalizar_valor(row.get("Responsável Indicado", ""))
-
-                    # Compara cada campo e registra alterações
-                    for col in cols_cmp:
-                        valor_anterior = _normalizar_valor(linha_original.get(col, ""))
-                        valor_depois = _normalizar_valor(row.get(col, ""))
-
-                        # Só registra se o valor realmente mudou
-                        if valor_anterior != valor_depois:
-                            alteracoes_detalhadas.append({
-                                "id": rid,
-                                "estudo": estudo,
-                                "campo": col,
-                                "valor_anterior": valor_anterior,
-                                "valor_depois": valor_depois,
-                                "resp_indicado": resp_indicado
-                            })
-
-                    # Atualiza o DataFrame
-                    df.loc[df["ID"] == rid, cols_cmp] = row[cols_cmp].values
-
-                    novo_status = str(row.get("Status", "")).strip().upper()
-                    if novo_status == "VERIFICANDO" and status_ant != "VERIFICANDO":
-                        df.loc[df["ID"] == rid, "Disponibilizado para Verificação"] = data_atual
-
-                    idx_modificados.append(rid)
+            # Lista com todas as alterações detalhadas para o log
+            alteracoes_detalhadas = changeset.records(cs)
 
             mudou = False
-            if idx_modificados:
-                df.loc[df["ID"].isin(idx_modificados), "Data Atualização"] = data_atual
-                df.loc[df["ID"].isin(idx_modificados), "Responsável Atualização"] = responsavel_att.strip()
+            if len(cs) > 0:
+                # Atualiza o DataFrame: só as células alteradas + linhas novas no fim
+                df[cols_cmp] = df[cols_cmp].astype(object)
+                editados = changeset.edit_set(alteradas)
+                lote = edit_idx.loc[list(editados) + list(novas_linhas)].reset_index()
+                df, _, _ = bulk_upsert.upsert(df, lote, key="ID", columns_by_id=editados)
+
+                # Status passou a VERIFICANDO: marca quando foi disponibilizado
+                status = alteradas[alteradas["campo"] == "Status"]
+                verificando = status.loc[
+                    (status["valor_depois"].str.upper() == "VERIFICANDO")
+                    & (status["valor_anterior"].str.upper() != "VERIFICANDO"), "id"]
+                if len(verificando) > 0:
+                    df.loc[df["ID"].isin(verificando), "Disponibilizado para Verificação"] = data_atual
+
+                modificados = df["ID"].isin(cs["id"])
+                df.loc[modificados, "Data Atualização"] = data_atual
+                df.loc[modificados, "Responsável Atualização"] = responsavel_att.strip()
                 mudou = True
 
             if len(removidos) > 0:
@@ -1159,7 +1530,8 @@ def main():
                     df.reset_index(drop=True),
                     usuario=responsavel_att.strip(),
                     operacao="EDIÇÃO_ADMIN",
-                    alteracoes_detalhadas=alteracoes_detalhadas
+                    alteracoes_detalhadas=alteracoes_detalhadas,
+                    ids_criados=set(novas_linhas),
                 )
                 st.cache_data.clear()
             else:
@@ -0,0 +1,120 @@
+# audit_journal.py
+"""
+Journal de auditoria append-only, fora do workbook de apontamentos.
+
+Cada gravação acrescenta um segmento JSONL novo e imutável na biblioteca:
+
+    <pasta>/<AAAA-MM>/<AAAAMMDDTHHMMSSffffff>-<uuid>.jsonl
+
+então o custo de registrar é proporcional às entradas novas, não ao
+histórico. Segmentos nunca são reescritos; por isso são baixados uma vez e
+depois servidos pelo cache de conteúdo (304).
+
+O log antigo (aba 'log' do workbook) é importado uma única vez como
+<pasta>/legacy.jsonl. A exportação de compatibilidade remonta a aba 'log'
+(mesmas colunas) a partir do journal inteiro, sob demanda.
+"""
+import json
+import uuid
+from datetime import date, datetime
+
+import pandas as pd
+
+from sp_connector import RetryPolicy, SPConnector
+
+LEGACY_SEGMENT = "legacy.jsonl"
+
+
+def _json_value(v):
+    if v is None or (not isinstance(v, (list, tuple, dict)) and pd.isna(v)):
+        return None
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if hasattr(v, "item"):      # escalares numpy
+        return v.item()
+    return v
+
+
+class AuditJournal:
+    def __init__(self, sp: SPConnector, folder: str, columns: list[str], date_column: str = "Data"):
+        self.sp = sp
+        self.folder = folder.rstrip("/")
+        self.columns = list(columns)
+        self.date_column = date_column
+        self.legacy_done = False    # log antigo já importado (verificado neste processo)
+
+    # -------- Escrita --------
+    def _encode(self, entries: list[dict]) -> bytes:
+        lines = (json.dumps({c: _json_value(e.get(c)) for c in self.columns}, ensure_ascii=False)
+                 for e in entries)
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def segment_path(self) -> str:
+        """Caminho único para um segmento novo."""
+        agora = datetime.now()
+        return f"{self.folder}/{agora:%Y-%m}/{agora:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}.jsonl"
+
+    def append(self, entries: list[dict], path: str | None = None) -> str | None:
+        """
+        Grava as entradas num segmento novo; devolve o caminho (None se não havia entradas).
+        Sob retentativa, gere o caminho uma vez (segment_path) e passe-o em todas as
+        tentativas: um upload que expirou mas foi aceito é sobrescrito com o mesmo
+        conteúdo em vez de virar um segmento duplicado.
+        """
+        if not entries:
+            return None
+        path = path or self.segment_path()
+        # nome único por gravação: sobrescrever só acontece na repetição da mesma
+        self.sp.upload(path, self._encode(entries), overwrite=True)
+        return path
+
+    def has_legacy(self) -> bool:
+        return any(i.get("name") == LEGACY_SEGMENT for i in self.sp.list_children(self.folder))
+
+    def import_legacy(self, log_df: pd.DataFrame) -> bool:
+        """
+        Importa o log antigo como segmento 'legacy.jsonl' (uma vez só).
+        Se outro processo já importou, o upload sem sobrescrita falha com 409
+        e nada é feito. Devolve True se importou agora.
+        """
+        entries = log_df.reindex(columns=self.columns).to_dict("records")
+        try:
+            self.sp.upload(f"{self.folder}/{LEGACY_SEGMENT}", self._encode(entries), overwrite=False)
+        except Exception as e:
+            if RetryPolicy.status_of(e) == 409:
+                return False
+            raise
+        return True
+
+    def ensure_legacy(self, load_log) -> None:
+        """Na primeira chamada do processo, importa o log antigo se ainda não houver legacy.jsonl."""
+        if self.legacy_done:
+            return
+        if not self.has_legacy():
+            self.import_legacy(load_log())
+        self.legacy_done = True
+
+    # -------- Leitura --------
+    def segments(self) -> list[str]:
+        """Caminhos dos segmentos em ordem cronológica (legacy primeiro)."""
+        out = []
+        root = self.sp.list_children(self.folder)
+        if any(i.get("name") == LEGACY_SEGMENT for i in root):
+            out.append(f"{self.folder}/{LEGACY_SEGMENT}")
+        for month in sorted(i["name"] for i in root if "folder" in i):
+            names = sorted(i["name"] for i in self.sp.list_children(f"{self.folder}/{month}")
+                           if i.get("name", "").endswith(".jsonl"))
+            out.extend(f"{self.folder}/{month}/{n}" for n in names)
+        return out
+
+    def read(self) -> pd.DataFrame:
+        """Journal inteiro como DataFrame com as colunas do log."""
+        rows = []
+        for path in self.segments():
+            for line in self.sp.download(path).decode("utf-8").splitlines():
+                if line.strip():
+                    rows.append(json.loads(line))
+        df = pd.DataFrame(rows, columns=self.columns)
+        if self.date_column in df.columns:
+            df[self.date_column] = pd.to_datetime(df[self.date_column], errors="coerce")
+        return df
@@ -15,6 +15,8 @@ import requests
 import streamlit as st
 import logging
 
+import graph_http
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -402,7 +404,7 @@ class MicrosoftAuth:
                 "Content-Type": "application/json"
             }
 
-            response = requests.get(
+            response = graph_http.session().get(
                 "https://graph.microsoft.com/v1.0/me",
                 headers=headers,
                 timeout=10
@@ -428,7 +430,7 @@ class MicrosoftAuth:
         """Valida se o token ainda é válido"""
         try:
             headers = {"Authorization": f"Bearer {token}"}
-            response = requests.get(
+            response = graph_http.session().get(
                 "https://graph.microsoft.com/v1.0/me",
                 headers=headers,
                 timeout=5
@@ -0,0 +1,148 @@
+# benchmarks/bench_bulk_upsert.py
+"""
+Mescla de update_sharepoint_file: laço original (varredura booleana da base
+e .at célula a célula por ID) x bulk_upsert.upsert (índice chave -> posição
+e uma atribuição por coluna).
+
+Cenários por tamanho de base (10k e 100k linhas por padrão):
+  - lote: df inteiro reenviado (Forms), 10% dos IDs novos, sem edit_set
+  - painel: N linhas editadas pelo Painel ADM, com edit_set por ID
+
+O laço original é O(IDs atualizados x linhas da base); com 100k linhas o
+cenário 'lote' dele é limitado por --max-legacy (extrapolado acima disso).
+Os dois resultados são comparados célula a célula (e coluna a coluna pelo
+dtype) antes de medir; as datas do lote vêm em datetime64[us] e as da base em
+datetime64[ns], como acontece com datetime.now() no pandas 2.x.
+
+Uso:
+    python benchmarks/bench_bulk_upsert.py [--rows 10000 100000] [--edits 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import bulk_upsert  # noqa: E402
+
+STATUS = ["REALIZADO", "VERIFICANDO", "PENDENTE", "NÃO APLICÁVEL"]
+COLUNAS_AUTOMATICAS = ("Data Atualização", "Responsável Atualização", "Disponibilizado para Verificação")
+
+
+def make_base(rows: int) -> pd.DataFrame:
+    rnd = random.Random(7)
+    inicio = datetime(2025, 1, 1)
+    return pd.DataFrame({
+        "ID": [f"{i:06d}A" for i in range(rows)],
+        "Status": [rnd.choice(STATUS) for _ in range(rows)],
+        "Código do Estudo": [f"EST-{rnd.randint(1, 40):03d}" for _ in range(rows)],
+        "Apontamento": ["texto " * rnd.randint(2, 8) for _ in range(rows)],
+        "Responsável Pela Correção": [f"Pessoa {rnd.randint(1, 60)}" for _ in range(rows)],
+        "Data Atualização": pd.Series([inicio + timedelta(days=rnd.randint(0, 600))
+                                       for _ in range(rows)]).astype("datetime64[ns]"),
+        "Responsável Atualização": [""] * rows,
+        "Disponibilizado para Verificação": [None] * rows,
+    })
+
+
+def make_updates(base: pd.DataFrame, n: int, novos: int, seed: int) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    upd = base.sample(n=n, random_state=seed).copy()
+    upd["Status"] = [rnd.choice(STATUS) for _ in range(n)]
+    # datetime do Python vira datetime64[us] no pandas 2.x: resolução diferente da base (ns)
+    upd["Data Atualização"] = pd.Series(datetime(2026, 6, 1), index=upd.index).astype("datetime64[us]")
+    upd["Responsável Atualização"] = "Bench"
+    extra = upd.head(novos).copy()
+    extra["ID"] = [f"N{i:06d}" for i in range(novos)]
+    return pd.concat([upd, extra], ignore_index=True)
+
+
+def legacy_merge(base_df: pd.DataFrame, df_to_save: pd.DataFrame, edit_set: dict | None):
+    """O laço de update_sharepoint_file antes do bulk_upsert (referência)."""
+    base_df = base_df.copy()
+    ids_novos, ids_atualizados = [], []
+    ids_to_save = set(df_to_save["ID"].tolist())
+    existing_ids = set(base_df["ID"].tolist())
+    new_ids = ids_to_save - existing_ids
+    update_ids = ids_to_save & existing_ids
+    if new_ids:
+        new_rows = df_to_save[df_to_save["ID"].isin(new_ids)]
+        base_df = pd.concat([base_df, new_rows], ignore_index=True)
+        ids_novos = list(new_ids)
+    for id_val in update_ids:
+        idx_base = base_df.index[base_df["ID"] == id_val].tolist()
+        idx_update = df_to_save.index[df_to_save["ID"] == id_val].tolist()
+        if idx_base and idx_update:
+            idx_b, idx_u = idx_base[0], idx_update[0]
+            cols_editadas = edit_set[id_val] | set(COLUNAS_AUTOMATICAS) if edit_set is not None else None
+            for col in df_to_save.columns:
+                if col in base_df.columns and (cols_editadas is None or col in cols_editadas):
+                    base_df.at[idx_b, col] = df_to_save.at[idx_u, col]
+            ids_atualizados.append(id_val)
+    return base_df, ids_novos, ids_atualizados
+
+
+def _same(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    # a ordem das linhas novas é a mesma (concat); valores comparados como texto,
+    # mas o dtype de cada coluna tem de bater (datas continuam datas)
+    return a.shape == b.shape and a.dtypes.equals(b.dtypes) and a.astype(str).equals(b.astype(str))
+
+
+def _time(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(rows: int, edits: int, max_legacy: int) -> None:
+    base = make_base(rows)
+
+    # lote: reenvio do df inteiro + 10% novos
+    lote = make_updates(base, rows, rows // 10, seed=1)
+    # painel: poucas linhas, cada uma com 1-2 colunas editadas
+    painel = make_updates(base, edits, 0, seed=2)
+    rnd = random.Random(3)
+    edit_set = {rid: set(rnd.sample(["Status", "Apontamento", "Responsável Pela Correção"], rnd.randint(1, 2)))
+                for rid in painel["ID"]}
+
+    for nome, upd, es in (("lote", lote, None), ("painel", painel, edit_set)):
+        novo = _time(lambda: bulk_upsert.upsert(base, upd, key="ID", columns_by_id=es,
+                                               extra_columns=COLUNAS_AUTOMATICAS))
+        n_upd = int(upd["ID"].isin(base["ID"]).sum())
+        if n_upd <= max_legacy:
+            ref = legacy_merge(base, upd, es)
+            got = bulk_upsert.upsert(base, upd, key="ID", columns_by_id=es, extra_columns=COLUNAS_AUTOMATICAS)
+            assert _same(ref[0], got[0]), f"{nome}: resultado diferente do laço original"
+            assert sorted(ref[1]) == sorted(got[1]) and sorted(ref[2]) == sorted(got[2])
+            antigo = _time(lambda: legacy_merge(base, upd, es), repeat=1)
+            rotulo = f"{antigo:9.3f}s"
+        else:
+            # mede uma amostra de IDs e extrapola (o custo por ID é linear nas linhas da base)
+            amostra = upd[upd["ID"].isin(base["ID"])].head(max_legacy)
+            antigo = _time(lambda: legacy_merge(base, amostra, es), repeat=1) * n_upd / len(amostra)
+            rotulo = f"~{antigo:8.1f}s"
+        print(f"{rows:>8} linhas  {nome:<7} {len(upd):>7} no lote   "
+              f"laço {rotulo}   upsert {novo:7.3f}s   x{antigo / max(novo, 1e-9):,.0f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--edits", type=int, default=200, help="linhas editadas no cenário 'painel'")
+    ap.add_argument("--max-legacy", type=int, default=2_000,
+                    help="acima disso o laço original é medido numa amostra e extrapolado")
+    args = ap.parse_args()
+    for rows in args.rows:
+        run(rows, args.edits, args.max_legacy)
+
+
+if __name__ == "__main__":
+    main()
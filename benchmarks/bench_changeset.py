@@ -0,0 +1,128 @@
+# benchmarks/bench_changeset.py
+"""
+Detecção de alterações do "Submeter Edições": comparação original
+(_norm da grade + iterrows nas linhas alteradas, com busca e renormalização
+da linha original por ID e laço coluna a coluna) x changeset.diff (uma
+comparação alinhada da grade inteira, changeset em formato longo) x
+changeset.from_editor_state (só as células do edited_rows do st.data_editor).
+
+O número de células editadas é fixo (--edits); o que cresce é a grade, para
+mostrar que a latência do changeset fica estável e que a do estado do
+editor não depende da grade.
+
+Uso:
+    python benchmarks/bench_changeset.py [--rows 1000 10000 50000] [--edits 50]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import changeset  # noqa: E402
+
+STATUS = ["REALIZADO", "VERIFICANDO", "PENDENTE", "NÃO APLICÁVEL"]
+CONTEXTO = {"estudo": "Código do Estudo", "resp_indicado": "Responsável Indicado"}
+
+
+def make_grid(rows: int) -> pd.DataFrame:
+    rnd = random.Random(9)
+    inicio = date(2025, 1, 1)
+    return pd.DataFrame({
+        "ID": [f"{i:05d}A" for i in range(rows)],
+        "Status": [rnd.choice(STATUS) for _ in range(rows)],
+        "Código do Estudo": [f"EST-{rnd.randint(1, 40):03d}" for _ in range(rows)],
+        "Justificativa": [rnd.choice(["", "ok", "ver doc"]) for _ in range(rows)],
+        "Apontamento": ["texto " * rnd.randint(2, 8) for _ in range(rows)],
+        "Responsável Indicado": [f"Pessoa {rnd.randint(1, 60)}" for _ in range(rows)],
+        "Prazo Para Resolução": [inicio + timedelta(days=rnd.randint(0, 300)) for _ in range(rows)],
+    })
+
+
+def edit(grid: pd.DataFrame, edits: int) -> tuple[pd.DataFrame, dict]:
+    """Grade editada + o estado equivalente do st.data_editor (edited_rows)."""
+    rnd = random.Random(10)
+    out = grid.copy()
+    state = {"edited_rows": {}, "added_rows": [], "deleted_rows": []}
+    cols = ["Status", "Justificativa", "Apontamento"]
+    for _ in range(edits):
+        pos, col, val = rnd.randrange(len(out)), rnd.choice(cols), f"editado {rnd.random():.4f}"
+        out.iat[pos, out.columns.get_loc(col)] = val
+        state["edited_rows"].setdefault(pos, {})[col] = val
+    return out, state
+
+
+def legacy(df: pd.DataFrame, snapshot: pd.DataFrame, df_editado: pd.DataFrame, cols_cmp: list[str]) -> list[dict]:
+    """Laço do submit antes do changeset (só a parte de detecção/log)."""
+    def _norm(df_like):
+        return df_like[cols_cmp].astype(str).apply(lambda s: s.str.strip().replace("nan", ""))
+
+    def _normalizar_valor(val):
+        if pd.isna(val) or val is None:
+            return ""
+        return str(val).strip()
+
+    snap_idx = snapshot.set_index("ID")
+    edit_idx = df_editado.set_index("ID")
+    comuns = snap_idx.index.intersection(edit_idx.index)
+    diff_mask = _norm(snap_idx.loc[comuns].reset_index()).ne(_norm(edit_idx.loc[comuns].reset_index())).any(axis=1)
+    linhas_alt = edit_idx.loc[comuns].reset_index().loc[diff_mask]
+    out = []
+    for _, row in linhas_alt.iterrows():
+        rid = str(row["ID"])
+        if not _norm(df.loc[df["ID"] == rid]).equals(_norm(row.to_frame().T)):
+            original = df.loc[df["ID"] == rid].iloc[0]
+            for col in cols_cmp:
+                antes, depois = _normalizar_valor(original.get(col, "")), _normalizar_valor(row.get(col, ""))
+                if antes != depois:
+                    out.append({"id": rid, "campo": col, "valor_anterior": antes, "valor_depois": depois,
+                                "estudo": _normalizar_valor(row.get("Código do Estudo", "")),
+                                "resp_indicado": _normalizar_valor(row.get("Responsável Indicado", ""))})
+    return out
+
+
+def vectorized(df: pd.DataFrame, df_editado: pd.DataFrame, cols_cmp: list[str]) -> list[dict]:
+    cs = changeset.diff(df.set_index("ID"), df_editado.set_index("ID"), cols_cmp, CONTEXTO)
+    return changeset.records(cs)
+
+
+def from_state(snapshot: pd.DataFrame, state: dict, cols_cmp: list[str]) -> list[dict]:
+    antes, depois, _, _ = changeset.from_editor_state(state, snapshot, date_columns=["Prazo Para Resolução"])
+    return changeset.records(changeset.diff(antes, depois, cols_cmp, CONTEXTO))
+
+
+def _time(fn, repeat: int = 3):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    ap.add_argument("--edits", type=int, default=50)
+    args = ap.parse_args()
+
+    for rows in args.rows:
+        df = make_grid(rows)
+        editado, state = edit(df, args.edits)
+        cols_cmp = [c for c in df.columns if c != "ID"]
+        t_old, ref = _time(lambda: legacy(df, df.copy(), editado, cols_cmp), repeat=1)
+        t_new, got = _time(lambda: vectorized(df, editado, cols_cmp))
+        t_state, via_state = _time(lambda: from_state(df, state, cols_cmp))
+        chave = lambda alts: sorted((a["id"], a["campo"], a["valor_anterior"], a["valor_depois"]) for a in alts)
+        assert chave(ref) == chave(got) == chave(via_state), "changeset diferente do laço original"
+        print(f"{rows:>7} linhas  {len(got):>4} células alteradas   "
+              f"laço {t_old:7.3f}s   diff da grade {t_new:7.3f}s   estado do editor {t_state:7.4f}s")
+
+
+if __name__ == "__main__":
+    main()
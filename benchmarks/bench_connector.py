@@ -0,0 +1,229 @@
+# benchmarks/bench_connector.py
+"""
+Benchmark do SPConnector contra o stand-in local do Graph (graph_standin.py).
+
+Mede p50/p95 de latência e vazão (ops/s) para:
+  - download       : SPConnector.download (sem cache -> sempre 200)
+  - download_304   : SPConnector.download com cache de eTag (-> 304)
+  - upload         : SPConnector.upload
+  - aba            : SPConnector.download_sheets só com 'apontamentos' (HTTP Range),
+                     comparando bytes trafegados com o download completo; usa um
+                     conector sem cache, e só lê por partes se o workbook tem ao
+                     menos SPConnector.RANGED_MIN_SIZE (1 MiB), senão baixa inteiro
+  - ciclo_ref      : ciclo de referência baixar -> mesclar -> subir
+                     (download c/ eTag -> lê apontamentos+log com pd.read_excel ->
+                      altera Status -> grava as duas abas com pd.ExcelWriter ->
+                      upload com If-Match, repetindo via RetryPolicy).
+                     NÃO é o caminho de gravação do app: não passa por
+                     WorkbookSnapshots, excel_writers, rollover do log nem pela
+                     API de workbook (_save_incremental); mede só o custo do
+                     conector (rede, 412/429/423 e retentativas) nesse padrão
+
+Uso:
+    python benchmarks/bench_connector.py --rows 5000 --log-rows 50000 \
+        --iterations 30 --threads 4 --latency-ms 30 --p429 0.02 --p423 0.02
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import string
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import graph_http  # noqa: E402
+from benchmarks.graph_standin import GraphStandIn  # noqa: E402
+from sp_connector import RetryPolicy, SPConnector  # noqa: E402
+
+APONT_PATH = "Bench/apontamentos.xlsx"
+LOG_COLUMNS = ["Data", "ID", "Estudo", "Operação", "Campo", "Valor Anterior",
+               "Valor Depois", "Responsável", "Responsável Indicado"]
+STATUS = ["REALIZADO", "VERIFICANDO", "PENDENTE", "NÃO APLICÁVEL"]
+
+
+class StandInTokenProvider:
+    """Busca um token no endpoint do stand-in uma única vez."""
+
+    def __init__(self, base_url: str):
+        self.url = f"{base_url}/standin-tenant/oauth2/v2.0/token"
+        self._tok = None
+        self._lock = threading.Lock()
+
+    def get(self) -> str:
+        if self._tok is None:
+            with self._lock:
+                if self._tok is None:
+                    r = graph_http.session().post(self.url, data={"grant_type": "client_credentials"}, timeout=10)
+                    r.raise_for_status()
+                    self._tok = r.json()["access_token"]
+        return self._tok
+
+
+def _ids(n: int) -> list[str]:
+    rnd = random.Random(42)
+    out, seen = [], set()
+    while len(out) < n:
+        chars = rnd.choices(string.digits, k=3) + rnd.choices(string.ascii_uppercase, k=2)
+        rnd.shuffle(chars)
+        v = "".join(chars)
+        if v not in seen:
+            seen.add(v)
+            out.append(v)
+    return out
+
+
+def make_workbook(rows: int, log_rows: int) -> bytes:
+    rnd = random.Random(7)
+    ids = _ids(rows)
+    apont = pd.DataFrame({
+        "ID": ids,
+        "Status": [rnd.choice(STATUS) for _ in ids],
+        "Código do Estudo": [f"EST-{rnd.randint(1, 40):03d}" for _ in ids],
+        "Responsável Pela Correção": [f"Pessoa {rnd.randint(1, 60)}" for _ in ids],
+        "Apontamento": ["texto " * rnd.randint(2, 20) for _ in ids],
+        "Data Atualização": [datetime(2025, 1, 1)] * rows,
+    })
+    log = pd.DataFrame({
+        "Data": [datetime(2025, 1, 1)] * log_rows,
+        "ID": [rnd.choice(ids) for _ in range(log_rows)],
+        "Estudo": [f"EST-{rnd.randint(1, 40):03d}" for _ in range(log_rows)],
+        "Operação": ["EDIÇÃO_ADMIN"] * log_rows,
+        "Campo": ["Status"] * log_rows,
+        "Valor Anterior": [rnd.choice(STATUS) for _ in range(log_rows)],
+        "Valor Depois": [rnd.choice(STATUS) for _ in range(log_rows)],
+        "Responsável": ["Bench"] * log_rows,
+        "Responsável Indicado": [""] * log_rows,
+    })
+    out = io.BytesIO()
+    with pd.ExcelWriter(out, engine="openpyxl") as w:
+        apont.to_excel(w, sheet_name="apontamentos", index=False)
+        log.to_excel(w, sheet_name="log", index=False)
+    return out.getvalue()
+
+
+def save_cycle(sp: SPConnector, edits: int, rnd: random.Random) -> None:
+    """Ciclo de referência (ver docstring do módulo): não reproduz o update_sharepoint_file."""
+    def _save():
+        fh, etag = sp.download_stream(APONT_PATH, with_etag=True)
+        with fh, pd.ExcelFile(fh) as xls:
+            base_df = pd.read_excel(xls, sheet_name="apontamentos")
+            log_df = pd.read_excel(xls, sheet_name="log")
+        base_df["ID"] = base_df["ID"].astype(str)
+        alvo = rnd.sample(range(len(base_df)), min(edits, len(base_df)))
+        novos = [rnd.choice(STATUS) for _ in alvo]
+        entradas = []
+        for pos, status in zip(alvo, novos):
+            entradas.append({"Data": datetime.now(), "ID": base_df.at[pos, "ID"], "Estudo": "",
+                             "Operação": "BENCH", "Campo": "Status",
+                             "Valor Anterior": base_df.at[pos, "Status"], "Valor Depois": status,
+                             "Responsável": "Bench", "Responsável Indicado": ""})
+            base_df.at[pos, "Status"] = status
+        log_df = pd.concat([log_df, pd.DataFrame(entradas, columns=LOG_COLUMNS)], ignore_index=True)
+        out = io.BytesIO()
+        with pd.ExcelWriter(out, engine="openpyxl") as w:
+            base_df.to_excel(w, sheet_name="apontamentos", index=False)
+            log_df.to_excel(w, sheet_name="log", index=False)
+        sp.upload(APONT_PATH, out.getvalue(), overwrite=True, if_match=etag)
+    sp.run_with_retry(_save)
+
+
+def run(name: str, fn, iterations: int, threads: int) -> None:
+    samples = []
+    lock = threading.Lock()
+    errors = 0
+
+    def one(i):
+        nonlocal errors
+        t0 = time.perf_counter()
+        try:
+            fn(i)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        with lock:
+            samples.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        list(ex.map(one, range(iterations)))
+    wall = time.perf_counter() - t0
+    if not samples:
+        print(f"{name:<14} todas as {iterations} execuções falharam")
+        return
+    s = sorted(samples)
+    p95 = s[max(int(len(s) * 0.95) - 1, 0)]
+    print(f"{name:<14} p50 {statistics.median(s):9.1f} ms | p95 {p95:9.1f} ms | "
+          f"{len(s) / wall:7.2f} ops/s | erros {errors}")
+
+
+def _connector(standin: GraphStandIn) -> SPConnector:
+    return SPConnector("standin-tenant", "bench", "bench",
+                       hostname="localhost", site_path="sites/bench", library_name="Documentos",
+                       graph_url=standin.graph_url, token_provider=StandInTokenProvider(standin.url),
+                       retry_policy=RetryPolicy(base=0.05, cap=1.0, deadline=30.0))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--log-rows", type=int, default=50000)
+    ap.add_argument("--edits", type=int, default=5, help="células editadas por ciclo")
+    ap.add_argument("--iterations", type=int, default=30)
+    ap.add_argument("--threads", type=int, default=1)
+    ap.add_argument("--latency-ms", type=float, default=30.0)
+    ap.add_argument("--jitter-ms", type=float, default=10.0)
+    ap.add_argument("--p423", type=float, default=0.0)
+    ap.add_argument("--p429", type=float, default=0.0)
+    ap.add_argument("--p412", type=float, default=0.0)
+    ap.add_argument("--only", choices=["download", "download_304", "aba", "upload", "ciclo_ref"], action="append")
+    args = ap.parse_args()
+
+    standin = GraphStandIn(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           p423=args.p423, p429=args.p429, p412=args.p412, seed=1).start()
+    wb = make_workbook(args.rows, args.log_rows)
+    standin.put_file(APONT_PATH, wb)
+    print(f"workbook: {args.rows} linhas + log {args.log_rows} linhas = {len(wb) / 1024:.0f} KiB; "
+          f"latência {args.latency_ms}±{args.jitter_ms} ms; {args.threads} thread(s)")
+
+    sp = _connector(standin)
+    rnd = random.Random(3)
+    only = set(args.only or ["download", "download_304", "aba", "upload", "ciclo_ref"])
+
+    if "download" in only:
+        run("download", lambda i: sp.download(APONT_PATH, use_cache=False), args.iterations, args.threads)
+    if "download_304" in only:
+        sp.download(APONT_PATH)
+        run("download_304", lambda i: sp.download(APONT_PATH), args.iterations, args.threads)
+    if "aba" in only:
+        if len(wb) < SPConnector.RANGED_MIN_SIZE:
+            print(f"{'':<14} workbook abaixo de {SPConnector.RANGED_MIN_SIZE // 1024} KiB: "
+                  "download_sheets baixa o arquivo inteiro (aumente --rows/--log-rows)")
+        # conector sem nada em cache: com a versão já cacheada a leitura por partes é pulada
+        sp_aba = _connector(standin)
+        sp_aba.item_meta(APONT_PATH)
+        antes = standin.stats["bytes_out"]
+        run("aba", lambda i: sp_aba.download_sheets(APONT_PATH, ["apontamentos"]).close(),
+            args.iterations, args.threads)
+        por_leitura = (standin.stats["bytes_out"] - antes) / args.iterations
+        print(f"{'':<14} {por_leitura / 1024:.0f} KiB por leitura vs {len(wb) / 1024:.0f} KiB do arquivo inteiro "
+              f"({1 - por_leitura / len(wb):.0%} a menos)")
+    if "upload" in only:
+        run("upload", lambda i: sp.upload(APONT_PATH, wb, overwrite=True), args.iterations, args.threads)
+    if "ciclo_ref" in only:
+        run("ciclo_ref", lambda i: save_cycle(sp, args.edits, rnd), args.iterations, args.threads)
+
+    print(f"stand-in: {standin.stats}")
+    standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_excel_readers.py
+"""
+Compara os engines de leitura de excel_readers (openpyxl, streaming, calamine)
+em workbooks sintéticos no formato da aba 'apontamentos', de 1k a 200k linhas.
+
+Para cada tamanho mede o tempo de leitura (melhor de N repetições) e confere
+que todos os engines devolvem o mesmo shape.
+
+Uso:
+    python benchmarks/bench_excel_readers.py [--rows 1000 10000 50000 200000] [--repeat 3]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook  # noqa: E402
+
+import excel_readers  # noqa: E402
+
+STATUS = ["REALIZADO", "VERIFICANDO", "PENDENTE", "NÃO APLICÁVEL"]
+HEADER = ["ID", "Status", "Código do Estudo", "Responsável Pela Correção", "Apontamento",
+          "Quantidade", "Data do Apontamento", "Data Atualização"]
+
+
+def make_workbook(rows: int) -> bytes:
+    """Gera o .xlsx com openpyxl write-only (rápido mesmo para 200k linhas)."""
+    rnd = random.Random(rows)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("apontamentos")
+    ws.append(HEADER)
+    base = datetime(2025, 1, 1)
+    for i in range(rows):
+        ws.append([
+            f"{i:05d}A",
+            rnd.choice(STATUS),
+            f"EST-{rnd.randint(1, 40):03d}",
+            f"Pessoa {rnd.randint(1, 60)}",
+            "texto " * rnd.randint(2, 12),
+            rnd.randint(0, 500),
+            base + timedelta(days=rnd.randint(0, 700)),
+            base + timedelta(days=rnd.randint(0, 700), minutes=rnd.randint(0, 1440)) if i % 7 else None,
+        ])
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def time_engine(data: bytes, engine: str, repeat: int):
+    best, df = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        df = excel_readers.read_excel(io.BytesIO(data), sheet_name="apontamentos", engine=engine)
+        best = min(best, time.perf_counter() - t0)
+    return best, df
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000, 200000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--engines", nargs="+", default=["openpyxl", "streaming", "calamine"])
+    args = ap.parse_args()
+
+    engines = [e for e in args.engines if e != "calamine" or excel_readers._has_calamine()]
+    if len(engines) < len(args.engines):
+        print("python-calamine não instalado: engine 'calamine' ignorado")
+
+    print(f"{'linhas':>8} {'KiB':>8} " + " ".join(f"{e:>12}" for e in engines) + "   (segundos, melhor de "
+          f"{args.repeat})")
+    for rows in args.rows:
+        data = make_workbook(rows)
+        results, shapes = [], set()
+        for engine in engines:
+            t, df = time_engine(data, engine, args.repeat)
+            results.append(t)
+            shapes.add(df.shape)
+        line = f"{rows:>8} {len(data) / 1024:>8.0f} " + " ".join(f"{t:>12.3f}" for t in results)
+        if "openpyxl" in engines:
+            ref = results[engines.index("openpyxl")]
+            line += "   ganho: " + ", ".join(f"{e} {ref / t:.1f}x" for e, t in zip(engines, results) if e != "openpyxl")
+        if len(shapes) > 1:
+            line += f"   ATENÇÃO: shapes diferentes {shapes}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# benchmarks/bench_excel_writers.py
+"""
+Pico de memória e tempo de gravação dos engines de excel_writers
+(openpyxl, streaming, xlsxwriter) para o par de abas salvo por
+update_sharepoint_file: 'apontamentos' + 'log' (100k linhas por padrão).
+
+O pico é medido com tracemalloc (alocações Python durante a gravação, sem
+contar os DataFrames de entrada). Cada engine roda num subprocesso próprio
+para que um não influencie o pico do outro; o RSS máximo do subprocesso
+também é mostrado.
+
+Com --check, grava e relê em cada engine uma aba com date, datetime, NaT e
+None e confere que datas voltam como células de data (não texto) e vazios
+como células vazias.
+
+Uso:
+    python benchmarks/bench_excel_writers.py [--rows 5000] [--log-rows 100000]
+    python benchmarks/bench_excel_writers.py --check
+"""
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import excel_writers  # noqa: E402
+
+STATUS = ["REALIZADO", "VERIFICANDO", "PENDENTE", "NÃO APLICÁVEL"]
+
+
+def make_frames(rows: int, log_rows: int) -> dict[str, pd.DataFrame]:
+    rnd = random.Random(11)
+    base = datetime(2025, 1, 1)
+    ids = [f"{i:05d}A" for i in range(rows)]
+    apont = pd.DataFrame({
+        "ID": ids,
+        "Status": [rnd.choice(STATUS) for _ in ids],
+        "Código do Estudo": [f"EST-{rnd.randint(1, 40):03d}" for _ in ids],
+        "Apontamento": ["texto " * rnd.randint(2, 12) for _ in ids],
+        "Data Atualização": [base + timedelta(days=rnd.randint(0, 700)) for _ in ids],
+    })
+    log = pd.DataFrame({
+        "Data": [base + timedelta(minutes=i) for i in range(log_rows)],
+        "ID": [rnd.choice(ids) for _ in range(log_rows)],
+        "Estudo": [f"EST-{rnd.randint(1, 40):03d}" for _ in range(log_rows)],
+        "Operação": ["EDIÇÃO_ADMIN"] * log_rows,
+        "Campo": ["Status"] * log_rows,
+        "Valor Anterior": [rnd.choice(STATUS) for _ in range(log_rows)],
+        "Valor Depois": [rnd.choice(STATUS) for _ in range(log_rows)],
+        "Responsável": ["Bench"] * log_rows,
+        "Responsável Indicado": [""] * log_rows,
+    })
+    return {"apontamentos": apont, "log": log}
+
+
+def measure(engine: str, rows: int, log_rows: int) -> dict:
+    frames = make_frames(rows, log_rows)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    content = excel_writers.write_excel(frames, engine=engine)
+    wall = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"engine": engine, "wall": wall, "peak": peak, "size": len(content),
+            "maxrss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def check(engines: list[str]) -> None:
+    """Ida e volta de date/datetime/NaT/None em cada engine."""
+    from openpyxl import load_workbook
+
+    df = pd.DataFrame({
+        "date": [date(2024, 5, 1), None, date(2024, 12, 31)],
+        "datetime": [datetime(2024, 5, 1, 13, 45), pd.NaT, pd.Timestamp("2024-12-31 08:00")],
+        "Prazo": pd.to_datetime(["2024-05-01", None, "2024-12-31"]),
+    })
+    esperado = [
+        [datetime(2024, 5, 1), datetime(2024, 5, 1, 13, 45), datetime(2024, 5, 1)],
+        [None, None, None],
+        [datetime(2024, 12, 31), datetime(2024, 12, 31, 8), datetime(2024, 12, 31)],
+    ]
+    for engine in engines:
+        content = excel_writers.write_excel({"apontamentos": df}, engine=engine)
+        ws = load_workbook(io.BytesIO(content), read_only=True)["apontamentos"]
+        # linha só com vazios volta como tupla vazia no modo write-only: completa até a largura
+        largura = len(df.columns)
+        lido = [(list(r) + [None] * largura)[:largura] for r in ws.iter_rows(min_row=2, values_only=True)]
+        assert lido == esperado, f"{engine}: {lido!r}"
+        # e o pandas lê as três colunas como datas, não texto
+        relido = pd.read_excel(io.BytesIO(content), sheet_name="apontamentos", engine="openpyxl")
+        assert all(k == "M" for k in relido.dtypes.map(lambda d: d.kind)), f"{engine}: {relido.dtypes.to_dict()}"
+        print(f"{engine:<12} ok")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--log-rows", type=int, default=100000)
+    ap.add_argument("--engines", nargs="+", default=["openpyxl", "streaming", "xlsxwriter"])
+    ap.add_argument("--check", action="store_true", help="só confere a ida e volta de datas e vazios")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.rows, args.log_rows)))
+        return
+
+    engines = [e for e in args.engines if e != "xlsxwriter" or excel_writers._has_xlsxwriter()]
+    if len(engines) < len(args.engines):
+        print("XlsxWriter não instalado: engine 'xlsxwriter' ignorado")
+    if args.check:
+        check(engines)
+        return
+    print(f"apontamentos {args.rows} linhas + log {args.log_rows} linhas")
+    print(f"{'engine':<12} {'tempo (s)':>10} {'pico py (MiB)':>14} {'maxrss (MiB)':>13} {'arquivo (KiB)':>14}")
+    for engine in engines:
+        res = subprocess.run([sys.executable, __file__, "--child", engine,
+                              "--rows", str(args.rows), "--log-rows", str(args.log_rows)],
+                             capture_output=True, text=True, check=True)
+        m = json.loads(res.stdout.strip().splitlines()[-1])
+        # ru_maxrss vem em KiB no Linux
+        print(f"{m['engine']:<12} {m['wall']:>10.2f} {m['peak'] / 2**20:>14.1f} "
+              f"{m['maxrss'] / 1024:>13.1f} {m['size'] / 1024:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_http_pool.py
+"""
+Compara a latência por chamada de requests.get "solto" (novo TCP+TLS a cada
+chamada) contra o pool keep-alive de graph_http, usando um servidor HTTPS
+local que responde um JSON pequeno (similar às chamadas de metadados).
+
+Uso:
+    python benchmarks/bench_http_pool.py [--calls 200] [--payload 512]
+
+Requer o binário `openssl` no PATH para gerar um certificado autoassinado.
+"""
+import argparse
+import os
+import ssl
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+import graph_http  # noqa: E402
+from benchmarks.graph_standin import make_cert  # noqa: E402
+
+
+def _handler(payload: bytes):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # necessário para keep-alive
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+def _serve(payload: bytes, tmpdir: str) -> ThreadingHTTPServer:
+    cert, key = make_cert(tmpdir)
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _handler(payload))
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert, key)
+    srv.socket = ctx.wrap_socket(srv.socket, server_side=True)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def _measure(fn, calls: int) -> list[float]:
+    out = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def _report(name: str, samples: list[float]) -> None:
+    s = sorted(samples)
+    p95 = s[int(len(s) * 0.95) - 1]
+    print(f"{name:<22} média {statistics.mean(s):7.2f} ms | p50 {statistics.median(s):7.2f} ms | p95 {p95:7.2f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=200)
+    ap.add_argument("--payload", type=int, default=512, help="bytes por resposta")
+    args = ap.parse_args()
+
+    warnings.filterwarnings("ignore")   # certificado autoassinado
+    payload = b'{"id":"' + b"x" * max(args.payload - 9, 0) + b'"}'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        srv = _serve(payload, tmp)
+        url = f"https://127.0.0.1:{srv.server_address[1]}/v1.0/sites/x"
+
+        bare = _measure(lambda: requests.get(url, verify=False, timeout=10).content, args.calls)
+
+        sess = graph_http.session()
+        sess.get(url, verify=False, timeout=10)   # aquece a conexão
+        pooled = _measure(lambda: sess.get(url, verify=False, timeout=10).content, args.calls)
+
+        srv.shutdown()
+
+    print(f"{args.calls} chamadas, payload {len(payload)} bytes")
+    _report("requests.get (sem pool)", bare)
+    _report("graph_http (keep-alive)", pooled)
+    print(f"ganho médio por chamada: {statistics.mean(bare) - statistics.mean(pooled):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_id_allocator.py
+"""
+Geração de IDs de apontamento: laço de rejeição original (set dos IDs
+existentes reconstruído a cada submissão + sorteio até errar o set) x
+IdAllocator (bitset sobre o espaço inteiro, reserva em lote).
+
+Para cada taxa de ocupação do espaço (6.760.000 IDs) mede:
+  - preparação: set(df["ID"]) x IdAllocator.mark(df["ID"]) (versão nova e
+    recarga da mesma versão, que o mark pula)
+  - --batch IDs novos numa submissão
+
+Uso:
+    python benchmarks/bench_id_allocator.py [--fill 0.01 0.1 0.5] [--batch 1000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import id_allocator  # noqa: E402
+from id_allocator import IdAllocator  # noqa: E402
+
+
+def generate_custom_id(existing_ids: set[str]) -> str:
+    """Versão original (referência)."""
+    while True:
+        digits = random.choices(string.digits, k=3)
+        letters = random.choices(string.ascii_uppercase, k=2)
+        chars = digits + letters
+        random.shuffle(chars)
+        new_id = "".join(chars)
+        if new_id not in existing_ids:
+            return new_id
+
+
+def existing(fill: float) -> pd.Series:
+    n = int(id_allocator.SPACE * fill)
+    nums = np.random.default_rng(1).choice(id_allocator.SPACE, size=n, replace=False)
+    return pd.Series([id_allocator.decode(int(x)) for x in nums], dtype=object)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fill", type=float, nargs="+", default=[0.01, 0.1, 0.5])
+    ap.add_argument("--batch", type=int, default=1_000)
+    args = ap.parse_args()
+
+    for fill in args.fill:
+        ids = existing(fill)
+
+        t0 = time.perf_counter()
+        usados = set(ids.astype(str))
+        t_set = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        novos_antigo = []
+        for _ in range(args.batch):
+            novo = generate_custom_id(usados)
+            usados.add(novo)
+            novos_antigo.append(novo)
+        t_loop = time.perf_counter() - t0
+
+        alloc = IdAllocator(seed=2)
+        t0 = time.perf_counter()
+        alloc.mark(ids, versao="v1")
+        t_mark = time.perf_counter() - t0
+        # recarga da mesma versão (get_sharepoint_file / ciclo de gravação): não remarca
+        t0 = time.perf_counter()
+        alloc.mark(ids, versao="v1")
+        t_remark = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        novos = alloc.reserve(args.batch)
+        t_res = time.perf_counter() - t0
+
+        assert len(set(novos)) == len(novos) and not set(novos) & set(ids), "ID repetido"
+        assert all(id_allocator.encode(i) is not None for i in novos)
+        print(f"ocupação {fill:5.0%} ({len(ids):>9} IDs)   "
+              f"set {t_set:6.3f}s + laço {t_loop:6.3f}s   |   mark {t_mark:6.3f}s "
+              f"(mesma versão {t_remark:6.4f}s) + reserve {t_res:6.3f}s")
+
+
+if __name__ == "__main__":
+    main()
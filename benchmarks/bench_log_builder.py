@@ -0,0 +1,146 @@
+# benchmarks/bench_log_builder.py
+"""
+Montagem das entradas de log de uma edição em massa de 5.000 células:
+pd.concat por entrada (como era em update_sharepoint_file) x LogBuilder
+(buffers por coluna + uma concatenação).
+
+Cenários, sobre uma aba 'log' já existente (50k linhas por padrão):
+  - detalhado: 5.000 alterações do Painel ADM (uma entrada por célula)
+  - novos: 5.000 IDs novos do Forms; Estudo/Status/Responsável buscados
+    por ID com df.loc[df["ID"] == id] (antes) x junção pelo ID (LogBuilder)
+
+Uso:
+    python benchmarks/bench_log_builder.py [--cells 5000] [--log-rows 50000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from log_builder import LogBuilder  # noqa: E402
+
+LOG_COLUMNS = ["Data", "ID", "Estudo", "Operação", "Campo", "Valor Anterior", "Valor Depois", "Responsável", "Responsável Indicado"]
+STATUS = ["REALIZADO", "VERIFICANDO", "PENDENTE", "NÃO APLICÁVEL"]
+
+
+def make_log(rows: int) -> pd.DataFrame:
+    rnd = random.Random(5)
+    inicio = datetime(2025, 1, 1)
+    return pd.DataFrame({
+        "Data": [inicio + timedelta(minutes=i) for i in range(rows)],
+        "ID": [f"{rnd.randint(0, 99999):05d}A" for _ in range(rows)],
+        "Estudo": [f"EST-{rnd.randint(1, 40):03d}" for _ in range(rows)],
+        "Operação": ["EDIÇÃO_ADMIN"] * rows,
+        "Campo": ["Status"] * rows,
+        "Valor Anterior": [rnd.choice(STATUS) for _ in range(rows)],
+        "Valor Depois": [rnd.choice(STATUS) for _ in range(rows)],
+        "Responsável": ["Bench"] * rows,
+        "Responsável Indicado": [""] * rows,
+    })
+
+
+def make_alteracoes(cells: int) -> list[dict]:
+    rnd = random.Random(6)
+    return [{"id": f"{i // 3:05d}B", "estudo": f"EST-{rnd.randint(1, 40):03d}",
+             "campo": rnd.choice(["Status", "Apontamento", "Prazo Para Resolução"]),
+             "valor_anterior": rnd.choice(STATUS), "valor_depois": rnd.choice(STATUS),
+             "resp_indicado": ""} for i in range(cells)]
+
+
+def make_novos(cells: int) -> pd.DataFrame:
+    rnd = random.Random(8)
+    return pd.DataFrame({
+        "ID": [f"{i:05d}N" for i in range(cells)],
+        "Código do Estudo": [f"EST-{rnd.randint(1, 40):03d}" for _ in range(cells)],
+        "Status": [rnd.choice(STATUS) for _ in range(cells)],
+        "Responsável Pela Correção": [f"Pessoa {rnd.randint(1, 60)}" for _ in range(cells)],
+    })
+
+
+# -------- antes --------
+def concat_detalhado(log_df, alteracoes):
+    for alt in alteracoes:
+        entry = pd.DataFrame([{
+            "Data": datetime.now(), "ID": alt["id"], "Estudo": alt["estudo"], "Operação": "EDIÇÃO_ADMIN",
+            "Campo": alt["campo"], "Valor Anterior": alt["valor_anterior"], "Valor Depois": alt["valor_depois"],
+            "Responsável": "Bench", "Responsável Indicado": alt["resp_indicado"],
+        }])
+        log_df = pd.concat([log_df, entry], ignore_index=True)
+    return log_df
+
+
+def concat_novos(log_df, df_to_save):
+    for id_val in df_to_save["ID"].tolist():
+        estudo = df_to_save.loc[df_to_save["ID"] == id_val, "Código do Estudo"].iloc[0]
+        status = df_to_save.loc[df_to_save["ID"] == id_val, "Status"].iloc[0]
+        resp = df_to_save.loc[df_to_save["ID"] == id_val, "Responsável Pela Correção"].iloc[0]
+        entry = pd.DataFrame([{
+            "Data": datetime.now(), "ID": id_val, "Estudo": estudo, "Operação": "NOVO", "Campo": "Status",
+            "Valor Anterior": "", "Valor Depois": status, "Responsável": "Bench", "Responsável Indicado": resp,
+        }])
+        log_df = pd.concat([log_df, entry], ignore_index=True)
+    return log_df
+
+
+# -------- depois --------
+def builder_detalhado(log_df, alteracoes):
+    log = LogBuilder(LOG_COLUMNS)
+    log.add_columns({
+        "Data": datetime.now(), "ID": [a["id"] for a in alteracoes], "Estudo": [a["estudo"] for a in alteracoes],
+        "Operação": "EDIÇÃO_ADMIN", "Campo": [a["campo"] for a in alteracoes],
+        "Valor Anterior": [a["valor_anterior"] for a in alteracoes],
+        "Valor Depois": [a["valor_depois"] for a in alteracoes], "Responsável": "Bench",
+        "Responsável Indicado": [a["resp_indicado"] for a in alteracoes],
+    }, len(alteracoes))
+    return pd.concat([log_df, log.frame()], ignore_index=True)
+
+
+def builder_novos(log_df, df_to_save):
+    lote = df_to_save.drop_duplicates("ID").set_index("ID")
+    ids = pd.Index(df_to_save["ID"])
+    log = LogBuilder(LOG_COLUMNS)
+    log.add_columns({
+        "Data": datetime.now(), "ID": ids, "Estudo": lote["Código do Estudo"].reindex(ids),
+        "Operação": "NOVO", "Campo": "Status", "Valor Anterior": "",
+        "Valor Depois": lote["Status"].reindex(ids), "Responsável": "Bench",
+        "Responsável Indicado": lote["Responsável Pela Correção"].reindex(ids),
+    }, len(ids))
+    return pd.concat([log_df, log.frame()], ignore_index=True)
+
+
+def _time(fn) -> tuple[float, pd.DataFrame]:
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cells", type=int, default=5_000)
+    ap.add_argument("--log-rows", type=int, default=50_000)
+    args = ap.parse_args()
+
+    log_df = make_log(args.log_rows)
+    alteracoes = make_alteracoes(args.cells)
+    novos = make_novos(args.cells)
+    cols = [c for c in LOG_COLUMNS if c != "Data"]
+
+    for nome, antes, depois, dado in (
+        ("detalhado", concat_detalhado, builder_detalhado, alteracoes),
+        ("novos", concat_novos, builder_novos, novos),
+    ):
+        t_antes, ref = _time(lambda: antes(log_df, dado))
+        t_depois, got = _time(lambda: depois(log_df, dado))
+        assert ref[cols].astype(str).equals(got[cols].astype(str)), f"{nome}: entradas diferentes"
+        print(f"{nome:<10} {args.cells} células sobre log de {args.log_rows}:  "
+              f"concat por entrada {t_antes:8.3f}s   LogBuilder {t_depois:7.3f}s   x{t_antes / max(t_depois, 1e-9):,.0f}")
+
+
+if __name__ == "__main__":
+    main()
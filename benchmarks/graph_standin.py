@@ -0,0 +1,400 @@
+# benchmarks/graph_standin.py
+"""
+Stand-in local do Microsoft Graph com os endpoints que o SPConnector usa:
+
+  POST /{tenant}/oauth2/v2.0/token                 -> token fake (client credentials)
+  GET  /v1.0/sites/{host}:/{site_path}             -> {"id": ...}
+  GET  /v1.0/sites/{site_id}/drives                -> lista com a biblioteca
+  GET  /v1.0/drives/{drive}/root:/{path}:          -> metadados do item (id, eTag, size, downloadUrl)
+  GET  /v1.0/drives/{drive}/items/{id}             -> idem, endereçado por id (item_meta)
+  GET  /download/{id}                              -> conteúdo, aceita Range (206)
+  GET  /v1.0/drives/{drive}/root:/{path}:/content  -> conteúdo + ETag (304 c/ If-None-Match)
+  PUT  /v1.0/drives/{drive}/root:/{path}:/content  -> grava (412 c/ If-Match divergente)
+  POST /v1.0/drives/{drive}/root:/{path}:/createUploadSession + PUT/GET/DELETE /upload/{id}
+
+Os endpoints de conteúdo e de upload session também respondem endereçados por
+id (/v1.0/drives/{drive}/items/{id}/...).
+
+Latência configurável (fixa + jitter) e injeção de falhas 423/429/412 por
+probabilidade. Os arquivos ficam em memória; use put_file() para semear.
+
+Uso direto:
+    python benchmarks/graph_standin.py --port 8765 --latency-ms 40 --p429 0.05
+"""
+import argparse
+import json
+import os
+import random
+import ssl
+import subprocess
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+SITE_ID = "standin-site"
+DRIVE_ID = "standin-drive"
+
+
+def make_cert(tmpdir: str) -> tuple[str, str]:
+    """Certificado autoassinado p/ localhost (requer `openssl` no PATH)."""
+    cert = os.path.join(tmpdir, "cert.pem")
+    key = os.path.join(tmpdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+         "-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=localhost"],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+class GraphStandIn:
+    def __init__(self, library_name: str = "Documentos", latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, p423: float = 0.0, p429: float = 0.0,
+                 p412: float = 0.0, retry_after: int = 1, seed: int | None = None):
+        self.library_name = library_name
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.p423 = p423
+        self.p429 = p429
+        self.p412 = p412
+        self.retry_after = retry_after
+        self._rand = random.Random(seed)
+        self._files: dict[str, dict] = {}       # caminho (minúsculo) -> item
+        self._sessions: dict[str, dict] = {}    # upload sessions em andamento
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "304": 0, "412": 0, "423": 0, "429": 0, "bytes_out": 0}
+        self._server: ThreadingHTTPServer | None = None
+
+    # -------- Estado --------
+    def put_file(self, path: str, content: bytes) -> dict:
+        key = path.strip("/").lower()
+        with self._lock:
+            item = self._files.get(key)
+            if item is None:
+                item = {"id": uuid.uuid4().hex.upper(), "name": path.rsplit("/", 1)[-1], "version": 0}
+                self._files[key] = item
+            item["version"] += 1
+            item["content"] = content
+            return self._meta(item)
+
+    def delete_file(self, path: str) -> None:
+        with self._lock:
+            self._files.pop(path.strip("/").lower(), None)
+
+    def get_file(self, path: str) -> bytes | None:
+        item = self._files.get(path.strip("/").lower())
+        return item["content"] if item else None
+
+    @staticmethod
+    def _etag(item: dict) -> str:
+        return f'"{{{item["id"]}}},{item["version"]}"'
+
+    def _meta(self, item: dict) -> dict:
+        return {
+            "id": item["id"],
+            "name": item["name"],
+            "size": len(item["content"]),
+            "eTag": self._etag(item),
+            "cTag": f'"c:{{{item["id"]}}},{item["version"]}"',
+            "@microsoft.graph.downloadUrl": f"{self.url}/download/{item['id']}" if self._server else None,
+        }
+
+    # -------- Servidor --------
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        scheme = "https" if isinstance(self._server.socket, ssl.SSLSocket) else "http"
+        return f"{scheme}://{host}:{port}"
+
+    @property
+    def graph_url(self) -> str:
+        return f"{self.url}/v1.0"
+
+    def start(self, port: int = 0, certfile: str | None = None, keyfile: str | None = None) -> "GraphStandIn":
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(self))
+        self._server.daemon_threads = True
+        if certfile:
+            ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            ctx.load_cert_chain(certfile, keyfile)
+            self._server.socket = ctx.wrap_socket(self._server.socket, server_side=True)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    # -------- Comportamento --------
+    def _sleep(self) -> None:
+        delay = self.latency_ms + (self._rand.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _fault(self, write: bool) -> int | None:
+        r = self._rand.random()
+        if r < self.p429:
+            return 429
+        if write and r < self.p429 + self.p423:
+            return 423
+        if write and r < self.p429 + self.p423 + self.p412:
+            return 412
+        return None
+
+
+def _make_handler(state: GraphStandIn):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        # -------- Respostas --------
+        def _send(self, code: int, body: bytes = b"", ctype: str = "application/json", headers: dict | None = None):
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if body:
+                with state._lock:
+                    state.stats["bytes_out"] += len(body)
+                self.wfile.write(body)
+
+        def _json(self, code: int, obj, headers: dict | None = None):
+            self._send(code, json.dumps(obj).encode("utf-8"), headers=headers)
+
+        def _error(self, code: int, msg: str, headers: dict | None = None):
+            with state._lock:
+                key = str(code)
+                if key in state.stats:
+                    state.stats[key] += 1
+            self._json(code, {"error": {"code": str(code), "message": msg}}, headers=headers)
+
+        def _body(self) -> bytes:
+            n = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(n) if n else b""
+
+        def _begin(self, write: bool) -> bool:
+            with state._lock:
+                state.stats["requests"] += 1
+            state._sleep()
+            code = state._fault(write)
+            if code == 429:
+                self._error(429, "Too Many Requests", {"Retry-After": str(state.retry_after)})
+                return False
+            if code == 423:
+                self._error(423, "Locked")
+                return False
+            if code == 412:
+                self._error(412, "Precondition Failed")
+                return False
+            return True
+
+        @staticmethod
+        def _file_path(path: str, suffix: str = "/content") -> str | None:
+            """Caminho do arquivo, aceitando root:/{path}:{suffix} ou items/{id}{suffix}."""
+            prefix = f"/v1.0/drives/{DRIVE_ID}/root:/"
+            if path.startswith(prefix) and path.endswith(":" + suffix):
+                return unquote(path[len(prefix):-len(suffix) - 1])
+            prefix = f"/v1.0/drives/{DRIVE_ID}/items/"
+            if path.startswith(prefix) and path.endswith(suffix):
+                item_id = path[len(prefix):-len(suffix)]
+                with state._lock:
+                    for key, item in state._files.items():
+                        if item["id"] == item_id:
+                            return key
+                return ""    # id desconhecido -> 404
+            return None
+
+        def _stale(self, fpath: str) -> bool:
+            if_match = self.headers.get("If-Match")
+            with state._lock:
+                item = state._files.get(fpath.strip("/").lower())
+                return bool(if_match) and (item is None or state._etag(item) != if_match)
+
+        # -------- Verbos --------
+        def do_POST(self):
+            path = urlsplit(self.path).path
+            self._body()
+            if path.endswith("/oauth2/v2.0/token"):
+                if self._begin(write=False):
+                    self._json(200, {"token_type": "Bearer", "expires_in": 3600,
+                                     "access_token": f"standin-{uuid.uuid4().hex}"})
+                return
+            fpath = self._file_path(path, "/createUploadSession")
+            if fpath == "":
+                self._error(404, "itemNotFound")
+                return
+            if fpath is not None:
+                if not self._begin(write=True):
+                    return
+                if self._stale(fpath):
+                    self._error(412, "Precondition Failed")
+                    return
+                sid = uuid.uuid4().hex
+                with state._lock:
+                    state._sessions[sid] = {"path": fpath, "buf": bytearray(), "total": None}
+                self._json(200, {"uploadUrl": f"{state.url}/upload/{sid}"})
+                return
+            self._error(404, "not found")
+
+        def _session(self, path: str) -> tuple[str, dict | None]:
+            sid = path[len("/upload/"):]
+            return sid, state._sessions.get(sid)
+
+        def do_DELETE(self):
+            path = urlsplit(self.path).path
+            if path.startswith("/upload/"):
+                sid, _ = self._session(path)
+                with state._lock:
+                    state._sessions.pop(sid, None)
+                self._send(204)
+                return
+            self._error(404, "not found")
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if not self._begin(write=False):
+                return
+            if path.startswith("/upload/"):
+                _, sess = self._session(path)
+                if sess is None:
+                    self._error(404, "itemNotFound")
+                    return
+                self._json(200, {"nextExpectedRanges": [f"{len(sess['buf'])}-"]})
+                return
+            if path.startswith("/v1.0/sites/") and path.endswith("/drives"):
+                self._json(200, {"value": [{"id": DRIVE_ID, "name": state.library_name,
+                                            "driveType": "documentLibrary"}]})
+                return
+            if path.startswith("/v1.0/sites/") and ":/" in path:
+                self._json(200, {"id": SITE_ID})
+                return
+            if path.startswith("/download/"):
+                self._download(path[len("/download/"):])
+                return
+            meta_prefix = f"/v1.0/drives/{DRIVE_ID}/root:/"
+            if path.startswith(meta_prefix) and path.endswith(":"):
+                item = state._files.get(unquote(path[len(meta_prefix):-1]).strip("/").lower())
+                if item is None:
+                    self._error(404, "itemNotFound")
+                    return
+                self._json(200, state._meta(item))
+                return
+            items_prefix = f"/v1.0/drives/{DRIVE_ID}/items/"
+            if path.startswith(items_prefix) and "/" not in path[len(items_prefix):]:
+                item_id = path[len(items_prefix):]
+                with state._lock:
+                    item = next((i for i in state._files.values() if i["id"] == item_id), None)
+                if item is None:
+                    self._error(404, "itemNotFound")
+                    return
+                self._json(200, state._meta(item))
+                return
+            fpath = self._file_path(path)
+            if fpath is not None:
+                item = state._files.get(fpath.strip("/").lower())
+                if item is None:
+                    self._error(404, "itemNotFound")
+                    return
+                etag = state._etag(item)
+                if self.headers.get("If-None-Match") == etag:
+                    with state._lock:
+                        state.stats["304"] += 1
+                    self._send(304, headers={"ETag": etag})
+                    return
+                self._send(200, item["content"], ctype="application/octet-stream", headers={"ETag": etag})
+                return
+            self._error(404, "not found")
+
+        def _download(self, item_id: str):
+            with state._lock:
+                item = next((i for i in state._files.values() if i["id"] == item_id), None)
+            if item is None:
+                self._error(404, "itemNotFound")
+                return
+            content, etag = item["content"], state._etag(item)
+            rng = self.headers.get("Range", "")
+            if not rng.startswith("bytes="):
+                self._send(200, content, ctype="application/octet-stream", headers={"ETag": etag})
+                return
+            start, _, end = rng[len("bytes="):].partition("-")
+            start, end = int(start), min(int(end or len(content) - 1), len(content) - 1)
+            self._send(206, content[start:end + 1], ctype="application/octet-stream",
+                       headers={"ETag": etag, "Content-Range": f"bytes {start}-{end}/{len(content)}"})
+
+        def do_PUT(self):
+            path = urlsplit(self.path).path
+            body = self._body()
+            if path.startswith("/upload/"):
+                self._put_chunk(path, body)
+                return
+            if not self._begin(write=True):
+                return
+            fpath = self._file_path(path)
+            if not fpath:
+                self._error(404, "not found")
+                return
+            if self._stale(fpath):
+                self._error(412, "Precondition Failed")
+                return
+            meta = state.put_file(fpath, body)
+            self._json(200, meta)
+
+        def _put_chunk(self, path: str, body: bytes):
+            state._sleep()
+            _, sess = self._session(path)
+            if sess is None:
+                self._error(404, "itemNotFound")
+                return
+            # Content-Range: bytes {inicio}-{fim}/{total}
+            spec = self.headers.get("Content-Range", "").split(" ", 1)[-1]
+            rng, total = spec.split("/")
+            start = int(rng.split("-")[0])
+            if start != len(sess["buf"]):
+                self._error(416, "Requested Range Not Satisfiable")
+                return
+            sess["buf"].extend(body)
+            if len(sess["buf"]) < int(total):
+                self._json(202, {"nextExpectedRanges": [f"{len(sess['buf'])}-"]})
+                return
+            with state._lock:
+                state._sessions.pop(path[len("/upload/"):], None)
+            self._json(201, state.put_file(sess["path"], bytes(sess["buf"])))
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--p423", type=float, default=0.0)
+    ap.add_argument("--p429", type=float, default=0.0)
+    ap.add_argument("--p412", type=float, default=0.0)
+    ap.add_argument("--seed-file", action="append", default=[],
+                    help="caminho_no_graph=arquivo_local (pode repetir)")
+    args = ap.parse_args()
+
+    standin = GraphStandIn(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           p423=args.p423, p429=args.p429, p412=args.p412)
+    for spec in args.seed_file:
+        remote, local = spec.split("=", 1)
+        with open(local, "rb") as f:
+            standin.put_file(remote, f.read())
+    standin.start(port=args.port)
+    print(f"Graph stand-in em {standin.graph_url} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
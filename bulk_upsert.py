@@ -0,0 +1,89 @@
+# bulk_upsert.py
+"""
+Upsert em lote de linhas (por chave) sobre um DataFrame base, vetorizado.
+
+Mesma semântica da mescla original de update_sharepoint_file:
+  - IDs que não existem na base são acrescentados no fim (todas as linhas deles)
+  - IDs existentes: só a primeira linha da base com o ID é atualizada, com a
+    primeira linha do lote com o ID, e apenas nas colunas presentes nos dois
+  - com `columns_by_id`, cada ID atualiza só as colunas listadas para ele
+
+Em vez de varrer a base a cada ID, as posições são resolvidas uma vez por
+um índice chave -> posição e cada coluna é atribuída numa única operação.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _numeric(dtype) -> bool:
+    return isinstance(dtype, np.dtype) and dtype.kind in "iuf"
+
+
+def _temporal(atual, novo) -> bool:
+    """Dois datetime64 (ou dois timedelta64), mesmo que em resoluções diferentes."""
+    return (isinstance(atual, np.dtype) and isinstance(novo, np.dtype)
+            and atual.kind == novo.kind and atual.kind in "mM")
+
+
+def _assign(base: pd.DataFrame, col: str, rows: np.ndarray, values: np.ndarray) -> None:
+    """base[col] nas posições `rows` = values, alargando o dtype da coluna se não couber."""
+    atual, novo = base[col].dtype, values.dtype
+    if atual != novo and atual != object:
+        # como o .at fazia: int + float -> float; datas em ns x us continuam datas;
+        # o resto (texto em data etc.) -> object
+        if (_numeric(atual) and _numeric(novo)) or _temporal(atual, novo):
+            alvo = np.result_type(atual, novo)
+            if alvo != atual:
+                base[col] = base[col].astype(alvo)
+            values = values.astype(alvo)
+        else:
+            base[col] = base[col].astype(object)
+    base.iloc[rows, base.columns.get_loc(col)] = values
+
+
+def upsert(base: pd.DataFrame, updates: pd.DataFrame, key: str = "ID",
+           columns_by_id: dict | None = None,
+           extra_columns: tuple[str, ...] = ()) -> tuple[pd.DataFrame, list, list]:
+    """
+    Aplica `updates` sobre `base` e devolve (resultado, ids_novos, ids_atualizados).
+    columns_by_id: {id: colunas editadas}; None = todas as colunas compartilhadas.
+    extra_columns: colunas atualizadas junto com qualquer ID de columns_by_id
+    (ex.: Data/Responsável Atualização).
+    `base` não é alterado.
+    """
+    if base.empty:
+        return updates.copy(), updates[key].tolist(), []
+
+    base = base.copy()
+    # chave -> posição da primeira linha da base com essa chave
+    primeira = ~base[key].duplicated(keep="first").to_numpy()
+    pos_by_key = pd.Series(np.flatnonzero(primeira), index=base[key].to_numpy()[primeira])
+
+    existe = updates[key].isin(pos_by_key.index)
+    ids_novos = list(set(updates.loc[~existe, key]))
+
+    upd = updates[existe].drop_duplicates(key, keep="first").set_index(key)
+    ids_atualizados = list(upd.index)
+    compartilhadas = [c for c in updates.columns if c != key and c in base.columns]
+
+    if len(upd):
+        if columns_by_id is None:
+            linhas = pos_by_key[upd.index].to_numpy()
+            for col in compartilhadas:
+                _assign(base, col, linhas, upd[col].to_numpy())
+        else:
+            extras = set(extra_columns)
+            por_coluna: dict[str, list] = {}
+            for rid, cols in columns_by_id.items():
+                if rid in upd.index:
+                    for col in set(cols) | extras:
+                        por_coluna.setdefault(col, []).append(rid)
+            for col in compartilhadas:
+                ids = por_coluna.get(col)
+                if ids:
+                    _assign(base, col, pos_by_key[ids].to_numpy(), upd.loc[ids, col].to_numpy())
+
+    novos = updates[~existe]
+    if len(novos):
+        base = pd.concat([base, novos], ignore_index=True)
+    return base, ids_novos, ids_atualizados
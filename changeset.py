@@ -0,0 +1,129 @@
+# changeset.py
+"""
+Diff célula a célula entre duas versões de uma grade, em formato longo.
+
+Um changeset é um DataFrame com uma linha por célula alterada:
+
+    id | campo | valor_anterior | valor_depois | <colunas de contexto>
+
+com os valores normalizados como no log (nulo -> "", texto sem espaços nas
+pontas). A comparação é feita de uma vez sobre as duas grades alinhadas pelo
+ID — sem iterrows nem busca da linha original por ID — então o custo não
+depende de quantas linhas mudaram.
+
+O mesmo changeset serve para atualizar o DataFrame (edit_set) e para o log
+(records() no formato de alteracoes_detalhadas de update_sharepoint_file).
+"""
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["id", "campo", "valor_anterior", "valor_depois"]
+
+
+def normalize(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    """Texto comparável por célula: nulos viram "", o resto str() sem espaços nas pontas."""
+    out = df.reindex(columns=columns).astype(object)
+    out = out.where(out.notna(), "")
+    return out.astype(str).apply(lambda s: s.str.strip())
+
+
+def empty_rows(df: pd.DataFrame, columns: list[str]) -> pd.Index:
+    """Índice das linhas sem nenhum valor nas colunas (linha apagada no editor)."""
+    return df.index[normalize(df, columns).eq("").all(axis=1)]
+
+
+def _long(mask: np.ndarray, ids: pd.Index, columns: list[str], antes: np.ndarray, depois: np.ndarray,
+          contexto: dict[str, np.ndarray]) -> pd.DataFrame:
+    # posições (linha, coluna) alteradas, em ordem de linha e depois de coluna
+    linhas, cols = np.nonzero(mask)
+    out = pd.DataFrame({
+        "id": ids.to_numpy()[linhas].astype(str),
+        "campo": np.asarray(columns, dtype=object)[cols],
+        "valor_anterior": antes[linhas, cols],
+        "valor_depois": depois[linhas, cols],
+    })
+    for nome, valores in contexto.items():
+        out[nome] = valores[linhas]
+    return out
+
+
+def _contexto(norm: pd.DataFrame, context: dict[str, str] | None) -> dict[str, np.ndarray]:
+    return {nome: norm[col].to_numpy() if col in norm.columns else np.full(len(norm), "", dtype=object)
+            for nome, col in (context or {}).items()}
+
+
+def diff(before: pd.DataFrame, after: pd.DataFrame, columns: list[str],
+         context: dict[str, str] | None = None) -> pd.DataFrame:
+    """
+    Células alteradas nas linhas presentes nas duas grades (ambas indexadas
+    pelo ID; IDs repetidos contam pela primeira linha).
+    context: {nome no changeset: coluna de `after`} copiada para cada célula
+    (ex.: {"estudo": "Código do Estudo"}).
+    """
+    before = before[~before.index.duplicated()]
+    after = after[~after.index.duplicated()]
+    comuns = before.index.intersection(after.index)
+    colunas = list(dict.fromkeys(list(columns) + list((context or {}).values())))
+    antes = normalize(before.loc[comuns], colunas)
+    depois = normalize(after.loc[comuns], colunas)
+    a, d = antes[columns].to_numpy(), depois[columns].to_numpy()
+    return _long(a != d, comuns, columns, a, d, _contexto(depois, context))
+
+
+def created(after: pd.DataFrame, columns: list[str], context: dict[str, str] | None = None) -> pd.DataFrame:
+    """Linhas novas: uma entrada por célula preenchida, com valor_anterior ""."""
+    colunas = list(dict.fromkeys(list(columns) + list((context or {}).values())))
+    depois = normalize(after, colunas)
+    d = depois[columns].to_numpy()
+    return _long(d != "", after.index, columns, np.full(d.shape, "", dtype=object), d, _contexto(depois, context))
+
+
+def _from_editor(val, is_date: bool):
+    # o editor devolve JSON: datas como texto ISO
+    if is_date and isinstance(val, str) and val:
+        ts = pd.to_datetime(val, errors="coerce")
+        return None if pd.isna(ts) else ts.date()
+    return val
+
+
+def from_editor_state(state: dict, snapshot: pd.DataFrame, key: str = "ID",
+                      date_columns=()) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, list[str]]:
+    """
+    Linhas tocadas segundo o estado do st.data_editor (edited_rows,
+    added_rows, deleted_rows), sem comparar a grade inteira: o custo é
+    proporcional às células editadas. Posições referem-se a `snapshot`, o
+    DataFrame passado ao editor nesta execução.
+
+    Devolve (antes, depois, novas, removidos):
+      antes/depois: linhas editadas, indexadas pelo ID, antes e depois da edição
+      novas: linhas acrescentadas (colunas de `snapshot`; ID vazio, o chamador gera)
+      removidos: IDs das linhas apagadas
+    """
+    datas = set(date_columns)
+    apagadas = {int(p) for p in state.get("deleted_rows") or [] if int(p) < len(snapshot)}
+    edited = {int(p): c for p, c in (state.get("edited_rows") or {}).items()
+              if int(p) < len(snapshot) and int(p) not in apagadas}
+    pos = sorted(edited)
+    antes = snapshot.iloc[pos]
+    depois = antes.copy()
+    for i, p in enumerate(pos):
+        for col, val in edited[p].items():
+            if col in depois.columns and col != key:
+                depois.iat[i, depois.columns.get_loc(col)] = _from_editor(val, col in datas)
+    antes = antes.assign(**{key: antes[key].astype(str)}).set_index(key)
+    depois = depois.assign(**{key: depois[key].astype(str)}).set_index(key)
+
+    novas = pd.DataFrame([{c: _from_editor(v, c in datas) for c, v in (row or {}).items()}
+                          for row in state.get("added_rows") or []], columns=snapshot.columns)
+
+    removidos = snapshot[key].iloc[sorted(apagadas)].astype(str).tolist()
+    return antes, depois, novas, removidos
+
+
+def edit_set(cs: pd.DataFrame) -> dict[str, set[str]]:
+    """ID -> colunas alteradas."""
+    return {rid: set(campos) for rid, campos in cs.groupby("id", sort=False)["campo"]}
+
+
+def records(cs: pd.DataFrame) -> list[dict]:
+    return cs.to_dict("records")
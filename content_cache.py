@@ -0,0 +1,240 @@
+# content_cache.py
+"""
+Cache de conteúdo de arquivos do Graph, chaveado pelo item e validado por eTag/cTag.
+
+Duas camadas:
+  - memória: OrderedDict LRU limitado por bytes
+  - disco (opcional): um .bin + .json (tag) por item, limitado por bytes, LRU por mtime
+
+O SPConnector usa a tag guardada para mandar If-None-Match; num 304 o conteúdo
+vem daqui, sem baixar o arquivo de novo.
+
+No disco, cada gravação escreve num temporário próprio (mkstemp) e publica
+.bin + .json sob um lock por chave; leituras pegam o mesmo lock, então nunca
+veem o corpo de uma versão com a tag de outra.
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class ContentCache:
+    def __init__(self, disk_dir: str | None = None,
+                 disk_max_bytes: int = 512 * 1024 * 1024,
+                 mem_max_bytes: int = 128 * 1024 * 1024,
+                 mem_file_max_bytes: int = 32 * 1024 * 1024):
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.mem_max_bytes = mem_max_bytes
+        # put_file sem disco: arquivos até esse tamanho ficam no LRU de memória
+        self.mem_file_max_bytes = mem_file_max_bytes
+        self._mem: "OrderedDict[str, tuple[str, bytes]]" = OrderedDict()
+        self._mem_bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    # -------- API --------
+    def get(self, key: str) -> tuple[str, bytes] | None:
+        """Retorna (tag, conteúdo) ou None."""
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                self._mem.move_to_end(key)
+                return hit
+        hit = self._disk_get(key)
+        if hit is not None:
+            self._mem_put(key, *hit)
+        return hit
+
+    def open(self, key: str) -> tuple[str, io.IOBase] | None:
+        """
+        Como get(), mas devolve um arquivo: do disco o .bin é aberto direto
+        (sem carregar em memória); da memória vem um BytesIO sobre os mesmos bytes.
+        """
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                self._mem.move_to_end(key)
+                return hit[0], io.BytesIO(hit[1])
+        if not self.disk_dir:
+            return None
+        bin_path, meta_path = self._disk_paths(key)
+        try:
+            with self._key_lock(key):
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                if meta.get("key") != key:
+                    return None
+                fh = open(bin_path, "rb")
+            os.utime(bin_path)
+            return meta["tag"], fh
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def tag(self, key: str) -> str | None:
+        hit = self.get(key)
+        return hit[0] if hit else None
+
+    def put(self, key: str, tag: str, content: bytes) -> None:
+        if not tag:
+            return
+        self._mem_put(key, tag, content)
+        self._disk_put(key, tag, content)
+
+    def put_file(self, key: str, tag: str, fileobj) -> None:
+        """
+        Grava um arquivo já baixado (streaming). Com disco, só na camada de
+        disco; sem disco, no LRU de memória se couber em mem_file_max_bytes,
+        para que o próximo download ainda mande If-None-Match.
+        """
+        if not tag:
+            return
+        if not self.disk_dir:
+            pos = fileobj.tell()
+            size = fileobj.seek(0, os.SEEK_END)
+            if size <= min(self.mem_file_max_bytes, self.mem_max_bytes):
+                fileobj.seek(0)
+                self._mem_put(key, tag, fileobj.read())
+            fileobj.seek(pos)
+            return
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._mem_bytes -= len(old[1])
+        pos = fileobj.tell()
+        fileobj.seek(0)
+        try:
+            self._disk_write(key, tag, lambda f: shutil.copyfileobj(fileobj, f))
+        finally:
+            fileobj.seek(pos)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._mem_bytes -= len(old[1])
+        if self.disk_dir:
+            with self._key_lock(key):
+                for p in self._disk_paths(key):
+                    try:
+                        os.remove(p)
+                    except FileNotFoundError:
+                        pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            self._mem_bytes = 0
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith((".bin", ".json", ".tmp")):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, name))
+                    except FileNotFoundError:
+                        pass
+
+    # -------- Memória --------
+    def _mem_put(self, key: str, tag: str, content: bytes) -> None:
+        if len(content) > self.mem_max_bytes:
+            return
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._mem_bytes -= len(old[1])
+            self._mem[key] = (tag, content)
+            self._mem_bytes += len(content)
+            while self._mem_bytes > self.mem_max_bytes and self._mem:
+                _, (_, evicted) = self._mem.popitem(last=False)
+                self._mem_bytes -= len(evicted)
+
+    # -------- Disco --------
+    def _disk_paths(self, key: str) -> tuple[str, str]:
+        h = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return (os.path.join(self.disk_dir, f"{h}.bin"),
+                os.path.join(self.disk_dir, f"{h}.json"))
+
+    def _disk_get(self, key: str) -> tuple[str, bytes] | None:
+        if not self.disk_dir:
+            return None
+        bin_path, meta_path = self._disk_paths(key)
+        try:
+            with self._key_lock(key):
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                if meta.get("key") != key:
+                    return None
+                with open(bin_path, "rb") as f:
+                    content = f.read()
+            os.utime(bin_path)   # marca uso recente (LRU)
+            return meta["tag"], content
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _disk_put(self, key: str, tag: str, content: bytes) -> None:
+        if not self.disk_dir or len(content) > self.disk_max_bytes:
+            return
+        self._disk_write(key, tag, lambda f: f.write(content))
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _disk_write(self, key: str, tag: str, write) -> None:
+        """
+        write(f) grava o corpo num temporário único; .bin e .json só são
+        publicados (os.replace) juntos, sob o lock da chave.
+        """
+        bin_path, meta_path = self._disk_paths(key)
+        tmps = []
+        try:
+            fd, tmp_bin = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            tmps.append(tmp_bin)
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            if os.path.getsize(tmp_bin) > self.disk_max_bytes:
+                return
+            fd, tmp_meta = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            tmps.append(tmp_meta)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "tag": tag}, f)
+            with self._key_lock(key):
+                os.replace(tmp_bin, bin_path)
+                os.replace(tmp_meta, meta_path)
+        finally:
+            for p in tmps:
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+        self._disk_evict()
+
+    def _disk_evict(self) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".bin"):
+                continue
+            p = os.path.join(self.disk_dir, name)
+            try:
+                st_ = os.stat(p)
+            except FileNotFoundError:
+                continue
+            entries.append((st_.st_mtime, st_.st_size, p))
+            total += st_.st_size
+        entries.sort()
+        for _, size, p in entries:
+            if total <= self.disk_max_bytes:
+                break
+            for victim in (p, p[:-4] + ".json"):
+                try:
+                    os.remove(victim)
+                except FileNotFoundError:
+                    pass
+            total -= size
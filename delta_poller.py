@@ -0,0 +1,119 @@
+# delta_poller.py
+"""
+Detector de mudanças em background baseado no endpoint /root/delta do Graph.
+
+Uma única thread por processo (criada via st.cache_resource no admin.py)
+acompanha o deltaLink da biblioteca e, quando um dos arquivos observados muda,
+chama on_change(nome) para invalidar só o cache daquele arquivo.
+
+Os itens do delta são casados pelo driveItem id, resolvido no início para cada
+arquivo observado: no SharePoint/OneDrive for Business o delta não traz
+parentReference.path, então o caminho fica só como alternativa.
+"""
+import logging
+import threading
+from typing import Callable
+
+import requests
+
+from sp_connector import SPConnector
+
+logger = logging.getLogger(__name__)
+
+
+class DeltaPoller:
+    def __init__(self, sp: SPConnector, files: dict[str, str],
+                 on_change: Callable[[str], None], interval: float = 30.0):
+        """
+        files: {nome lógico: caminho no SharePoint}, ex. {"apontamentos": APONT_FILE}
+        on_change: chamado com o nome lógico de cada arquivo alterado
+        """
+        self.sp = sp
+        self.files = dict(files)
+        self.on_change = on_change
+        self.interval = interval
+        self._paths = {sp.normalize_path(p).strip("/").lower(): name for name, p in files.items()}
+        self._ids: dict[str, str] = {}        # driveItem id -> nome lógico
+        self._link: str | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # -------- Ciclo de vida --------
+    def start(self) -> "DeltaPoller":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sp-delta-poller", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # -------- Loop --------
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f"Delta poller: falha ao consultar mudanças: {e}")
+            self._stop.wait(self.interval)
+
+    def _resolve_ids(self) -> None:
+        """Resolve o driveItem id dos arquivos observados que ainda não têm id."""
+        conhecidos = set(self._ids.values())
+        for name, path in self.files.items():
+            if name in conhecidos:
+                continue
+            try:
+                item_id = self.sp._item_id(path)
+            except Exception as e:
+                logger.warning(f"Delta poller: falha ao resolver o id de '{name}': {e}")
+                continue
+            if item_id:
+                self._ids[item_id] = name
+
+    def poll(self) -> set[str]:
+        """Executa uma consulta ao delta e devolve os nomes lógicos alterados."""
+        if len(set(self._ids.values())) < len(self.files):
+            self._resolve_ids()
+        if self._link is None:
+            _, self._link = self.sp.delta()
+            return set()
+        try:
+            items, link = self.sp.delta(self._link)
+        except requests.HTTPError as e:
+            if getattr(e.response, "status_code", None) != 410:
+                raise
+            # token expirado: recomeça e invalida tudo (mudanças podem ter sido perdidas)
+            logger.info("Delta poller: token expirado, sincronizando novamente")
+            _, self._link = self.sp.delta()
+            changed = set(self._paths.values())
+            self._notify(changed)
+            return changed
+
+        changed = set()
+        for item in items:
+            name = self._ids.get(item.get("id"))
+            if name is None:
+                name = self._paths.get(self.sp.item_relative_path(item) or "")
+                if name is not None and item.get("id"):
+                    self._ids[item["id"]] = name
+            if name is not None:
+                changed.add(name)
+                if "deleted" in item:
+                    # arquivo substituído ganha id novo: resolve de novo no próximo ciclo
+                    self._ids.pop(item.get("id"), None)
+        self._link = link
+        self._notify(changed)
+        return changed
+
+    def _notify(self, changed: set[str]) -> None:
+        for name in changed:
+            try:
+                self.on_change(name)
+            except Exception as e:
+                logger.warning(f"Delta poller: falha ao invalidar '{name}': {e}")
@@ -0,0 +1,127 @@
+# excel_readers.py
+"""
+Leitores de .xlsx intercambiáveis, com a mesma semântica básica de
+pd.read_excel (primeira linha como cabeçalho; sheet_name str/list/None).
+
+Engines:
+  - "openpyxl"  : pd.read_excel padrão (modelo completo de células; mais lento)
+  - "streaming" : openpyxl read-only, itera as linhas direto para buffers por
+                  coluna e monta o DataFrame uma vez no fim
+  - "calamine"  : parser nativo (Rust) via pd.read_excel(engine="calamine");
+                  requer pandas >= 2.2 e o pacote python-calamine
+  - "auto"      : calamine se instalado, senão streaming
+
+O engine padrão vem da variável de ambiente EXCEL_READER_ENGINE (default
+"auto"). Parâmetros além de sheet_name fazem os engines rápidos delegarem ao
+pd.read_excel com openpyxl, que entende todos eles.
+"""
+import importlib.util
+import logging
+import os
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("auto", "openpyxl", "streaming", "calamine")
+
+
+def _has_calamine() -> bool:
+    return importlib.util.find_spec("python_calamine") is not None
+
+
+def resolve_engine(engine: str | None = None) -> str:
+    engine = (engine or os.environ.get("EXCEL_READER_ENGINE") or "auto").lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Engine de leitura desconhecido: {engine} (opções: {', '.join(ENGINES)})")
+    if engine == "calamine" and not _has_calamine():
+        logger.warning("python-calamine não instalado; usando o engine 'streaming'")
+        return "streaming"
+    if engine == "auto":
+        return "calamine" if _has_calamine() else "streaming"
+    return engine
+
+
+def read_excel(io, sheet_name=0, engine: str | None = None, **kw):
+    """Equivalente a pd.read_excel(io, sheet_name=..., **kw) usando o engine escolhido."""
+    engine = resolve_engine(engine)
+    if engine == "calamine":
+        return pd.read_excel(io, sheet_name=sheet_name, engine="calamine", **kw)
+    if engine == "openpyxl" or kw:
+        return pd.read_excel(io, sheet_name=sheet_name, engine="openpyxl", **kw)
+    return _read_streaming(io, sheet_name)
+
+
+# -------- Engine streaming --------
+def _read_streaming(io, sheet_name):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(io, read_only=True, data_only=True, keep_links=False)
+    try:
+        names = wb.sheetnames
+        if sheet_name is None:
+            wanted = names
+        elif isinstance(sheet_name, (list, tuple)):
+            wanted = [names[s] if isinstance(s, int) else s for s in sheet_name]
+        else:
+            wanted = [names[sheet_name] if isinstance(sheet_name, int) else sheet_name]
+        out = {}
+        for name in wanted:
+            if name not in names:
+                raise ValueError(f"Worksheet named '{name}' not found")
+            out[name] = _sheet_frame(wb[name])
+    finally:
+        wb.close()
+    if sheet_name is None or isinstance(sheet_name, (list, tuple)):
+        # pd.read_excel devolve as chaves como foram pedidas (inclusive índices)
+        keys = names if sheet_name is None else list(sheet_name)
+        return {k: out[w] for k, w in zip(keys, wanted)}
+    return out[wanted[0]]
+
+
+def _sheet_frame(ws) -> pd.DataFrame:
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+    header = list(header)
+    cols: list[list] = [[] for _ in header]
+    width, nrows = len(header), 0
+    for row in rows:
+        if not any(v is not None for v in row):
+            continue    # linhas em branco são descartadas, como no pd.read_excel
+        if len(row) > width:
+            # célula além do cabeçalho: nova coluna sem nome, preenchida p/ trás
+            for _ in range(len(row) - width):
+                header.append(None)
+                cols.append([None] * nrows)
+            width = len(row)
+        for i in range(width):
+            cols[i].append(row[i] if i < len(row) else None)
+        nrows += 1
+
+    # descarta colunas finais sem cabeçalho e sem valores
+    while width and header[width - 1] is None and not any(v is not None for v in cols[width - 1]):
+        width -= 1
+    names = _column_names(header[:width])
+    data = {n: pd.Series(c, dtype=None if c else object) for n, c in zip(names, cols[:width])}
+    return pd.DataFrame(data, columns=names)
+
+
+def _column_names(header: list) -> list:
+    """Mesmas regras de nome do pandas: 'Unnamed: i' e duplicadas com sufixo '.1', '.2'."""
+    out, seen = [], {}
+    for i, h in enumerate(header):
+        name = f"Unnamed: {i}" if h is None or (isinstance(h, str) and not h.strip()) else h
+        if name in seen:
+            seen[name] += 1
+            candidate = f"{name}.{seen[name]}"
+            while candidate in seen:
+                seen[name] += 1
+                candidate = f"{name}.{seen[name]}"
+            seen[candidate] = 0
+            name = candidate
+        else:
+            seen[name] = 0
+        out.append(name)
+    return out
@@ -0,0 +1,120 @@
+# excel_writers.py
+"""
+Gravação de .xlsx com várias abas a partir de DataFrames (par de excel_readers).
+
+Engines:
+  - "openpyxl"   : pd.ExcelWriter padrão (todas as células viram objetos antes
+                   de serializar; pico de memória proporcional ao arquivo)
+  - "streaming"  : openpyxl write-only, linha a linha (memória constante)
+  - "xlsxwriter" : XlsxWriter com constant_memory (linhas vão para arquivos
+                   temporários conforme são escritas; mais rápido que openpyxl)
+  - "auto"       : xlsxwriter se instalado, senão streaming
+
+O engine padrão vem da variável de ambiente EXCEL_WRITER_ENGINE (default
+"auto"). Todos gravam cabeçalho na primeira linha e sem índice, como
+df.to_excel(..., index=False).
+"""
+import importlib.util
+import io
+import logging
+import math
+import os
+from datetime import date, datetime
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("auto", "openpyxl", "streaming", "xlsxwriter")
+DATE_FORMAT = "yyyy-mm-dd hh:mm:ss"
+
+
+def _has_xlsxwriter() -> bool:
+    return importlib.util.find_spec("xlsxwriter") is not None
+
+
+def resolve_engine(engine: str | None = None) -> str:
+    engine = (engine or os.environ.get("EXCEL_WRITER_ENGINE") or "auto").lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Engine de gravação desconhecido: {engine} (opções: {', '.join(ENGINES)})")
+    if engine == "xlsxwriter" and not _has_xlsxwriter():
+        logger.warning("XlsxWriter não instalado; usando o engine 'streaming'")
+        return "streaming"
+    if engine == "auto":
+        return "xlsxwriter" if _has_xlsxwriter() else "streaming"
+    return engine
+
+
+def write_excel(sheets: dict[str, pd.DataFrame], engine: str | None = None) -> bytes:
+    """Monta o .xlsx com uma aba por item de `sheets` (na ordem) e devolve os bytes."""
+    engine = resolve_engine(engine)
+    out = io.BytesIO()
+    if engine == "openpyxl":
+        with pd.ExcelWriter(out, engine="openpyxl") as w:
+            for name, df in sheets.items():
+                df.to_excel(w, sheet_name=name, index=False)
+    elif engine == "xlsxwriter":
+        _write_xlsxwriter(sheets, out)
+    else:
+        _write_streaming(sheets, out)
+    return out.getvalue()
+
+
+# -------- Conversão de valores --------
+def _rows(df: pd.DataFrame):
+    """Linhas como listas de valores nativos (NaN/NaT -> None, Timestamp -> datetime,
+    date continua date para virar célula de data e não texto)."""
+    for row in df.itertuples(index=False, name=None):
+        yield [_cell(v) for v in row]
+
+
+def _cell(v):
+    if v is None or v is pd.NaT:
+        return None
+    if isinstance(v, float):
+        return None if math.isnan(v) or math.isinf(v) else v
+    if isinstance(v, pd.Timestamp):
+        return v.tz_localize(None).to_pydatetime() if v.tzinfo else v.to_pydatetime()
+    if isinstance(v, datetime) and v.tzinfo:
+        return v.replace(tzinfo=None)
+    if hasattr(v, "item"):      # escalares numpy
+        v = v.item()
+        return _cell(v) if isinstance(v, float) else v
+    if isinstance(v, (str, int, date)) or v is True or v is False:
+        return v
+    return None if pd.isna(v) else str(v)
+
+
+# -------- Engines --------
+def _write_streaming(sheets: dict[str, pd.DataFrame], out) -> None:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    wb = Workbook(write_only=True)
+    bold = Font(bold=True)
+    for name, df in sheets.items():
+        ws = wb.create_sheet(name)
+        header = []
+        for c in df.columns:
+            cell = WriteOnlyCell(ws, value=str(c))
+            cell.font = bold
+            header.append(cell)
+        ws.append(header)
+        for row in _rows(df):
+            ws.append(row)
+    wb.save(out)
+
+
+def _write_xlsxwriter(sheets: dict[str, pd.DataFrame], out) -> None:
+    import xlsxwriter
+
+    wb = xlsxwriter.Workbook(out, {"constant_memory": True, "default_date_format": DATE_FORMAT})
+    bold = wb.add_format({"bold": True})
+    for name, df in sheets.items():
+        ws = wb.add_worksheet(name)
+        # constant_memory exige gravar em ordem de linha
+        ws.write_row(0, 0, [str(c) for c in df.columns], bold)
+        for r, row in enumerate(_rows(df), start=1):
+            ws.write_row(r, 0, row)
+    wb.close()
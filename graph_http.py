@@ -0,0 +1,90 @@
+# graph_http.py
+"""
+Camada HTTP compartilhada para as chamadas ao Microsoft Graph.
+
+Um único pool de conexões (HTTPAdapter/urllib3) é compartilhado por todo o
+processo, então as conexões TCP/TLS com graph.microsoft.com ficam abertas
+(keep-alive) e são reaproveitadas entre chamadas e entre sessões do Streamlit.
+
+Cada thread recebe o seu próprio requests.Session (o Session guarda cookies e
+outros estados mutáveis), mas todos montam o MESMO adapter, que é thread-safe.
+
+Tamanhos do pool configuráveis via variáveis de ambiente:
+  - GRAPH_POOL_CONNECTIONS: nº de hosts distintos mantidos no pool (default 4)
+  - GRAPH_POOL_MAXSIZE: conexões simultâneas por host (default 16)
+"""
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_CONNECTIONS = int(os.getenv("GRAPH_POOL_CONNECTIONS", "4"))
+DEFAULT_POOL_MAXSIZE = int(os.getenv("GRAPH_POOL_MAXSIZE", "16"))
+
+_lock = threading.Lock()
+_local = threading.local()
+_adapter = None
+_generation = 0
+
+
+def _build_adapter(pool_connections: int, pool_maxsize: int) -> HTTPAdapter:
+    # max_retries=0: retentativas são decididas por quem chama (status code)
+    return HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=0,
+        pool_block=False,
+    )
+
+
+def configure(pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+              pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> None:
+    """(Re)cria o pool compartilhado com os tamanhos informados."""
+    global _adapter, _generation
+    with _lock:
+        old = _adapter
+        _adapter = _build_adapter(pool_connections, pool_maxsize)
+        _generation += 1
+    if old is not None:
+        old.close()
+
+
+def _shared_adapter() -> HTTPAdapter:
+    global _adapter
+    if _adapter is None:
+        with _lock:
+            if _adapter is None:
+                _adapter = _build_adapter(DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE)
+    return _adapter
+
+
+def new_session(adapter: HTTPAdapter | None = None) -> requests.Session:
+    """Cria um Session que usa o adapter informado (ou o pool compartilhado)."""
+    adapter = adapter or _shared_adapter()
+    s = requests.Session()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update({"Connection": "keep-alive"})
+    return s
+
+
+def session() -> requests.Session:
+    """Session da thread atual, ligado ao pool compartilhado do processo."""
+    s = getattr(_local, "session", None)
+    if s is None or getattr(_local, "generation", -1) != _generation:
+        s = new_session()
+        _local.session = s
+        _local.generation = _generation
+    return s
+
+
+def close() -> None:
+    """Fecha todas as conexões do pool compartilhado."""
+    global _adapter, _generation
+    with _lock:
+        old = _adapter
+        _adapter = None
+        _generation += 1
+    if old is not None:
+        old.close()
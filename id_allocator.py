@@ -0,0 +1,172 @@
+# id_allocator.py
+"""
+Alocador de IDs de apontamento: 3 dígitos + 2 letras maiúsculas, em
+qualquer ordem (ex.: "4K7Q1").
+
+O espaço inteiro — 10 posições possíveis das letras x 10^3 x 26^2 =
+6.760.000 IDs — é numerado e mapeado num bitset (~845 KB), um bit por ID.
+Marcar IDs existentes é vetorizado (bytes dos IDs + tabelas de consulta,
+sem .str do pandas) e uma versão do arquivo já marcada é pulada; alocar
+sorteia posições livres
+consultando o bitset, então o custo por ID não cresce com a quantidade de
+IDs já usados nem exige reconstruir um set a cada submissão.
+
+IDs nunca são devolvidos: um ID alocado (ou visto no arquivo) continua
+marcado mesmo que a linha seja excluída, para não reaparecer no log com
+outro significado. IDs fora do formato (legados) são ignorados.
+"""
+import random
+import threading
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# posições das 2 letras entre os 5 caracteres
+_PADROES = list(combinations(range(5), 2))
+_DIGITOS = [[i for i in range(5) if i not in par] for par in _PADROES]
+_PADRAO_IDX = np.full(32, -1, dtype=np.int64)
+for _i, (_a, _b) in enumerate(_PADROES):
+    _PADRAO_IDX[(1 << (4 - _a)) | (1 << (4 - _b))] = _i
+
+SPACE = len(_PADROES) * 1000 * 676
+_PESOS_POS = np.array([16, 8, 4, 2, 1], dtype=np.int64)
+_PESOS_DIG = np.array([100, 10, 1], dtype=np.int64)
+_PESOS_LET = np.array([26, 1], dtype=np.int64)
+# byte -> valor do dígito / índice da letra (minúscula conta como maiúscula); -1 = não é
+_DIGITO = np.full(256, -1, dtype=np.int8)
+_DIGITO[48:58] = np.arange(10)
+_LETRA = np.full(256, -1, dtype=np.int8)
+_LETRA[65:91] = _LETRA[97:123] = np.arange(26)
+_TENTATIVAS = 8     # sorteios antes de varrer o bitset atrás de um byte livre
+_MAX_VERSOES = 64   # versões já marcadas lembradas (só evita remarcar; esquecer é seguro)
+
+
+def _caracteres(ids) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Os 5 caracteres de cada ID como bytes (N x 5; fora do ASCII vira 255) e a
+    máscara dos que têm exatamente 5. Tudo em numpy sobre um array de texto
+    de largura fixa; só IDs mais longos (candidatos a ter espaços em volta)
+    passam por str.strip().
+    """
+    arr = np.array(ids.tolist() if hasattr(ids, "tolist") else list(ids), dtype=str)
+    if not arr.size:
+        return np.zeros((0, 5), dtype=np.uint8), np.zeros(0, dtype=bool)
+    largura = arr.dtype.itemsize // 4
+    if largura < 5:
+        return np.zeros((arr.size, 5), dtype=np.uint8), np.zeros(arr.size, dtype=bool)
+    # texto de largura fixa completa com NUL: 5 caracteres = 5 primeiros não nulos e o resto nulo
+    cod = arr.view(np.uint32).reshape(arr.size, largura)
+    longos = np.flatnonzero((cod[:, 5:] != 0).any(axis=1))
+    if longos.size:
+        cod = cod.copy()
+        cod[longos] = np.array([arr[i].strip() for i in longos], dtype=f"U{largura}") \
+            .view(np.uint32).reshape(-1, largura)
+    ok = (cod[:, :5] != 0).all(axis=1) & (cod[:, 5:] == 0).all(axis=1)
+    return np.minimum(cod[:, :5], 255).astype(np.uint8), ok
+
+
+def encode_many(ids) -> np.ndarray:
+    """Número de cada ID no espaço (int64); -1 para IDs fora do formato."""
+    car, ok = _caracteres(ids)
+    out = np.full(len(ok), -1, dtype=np.int64)
+    if not ok.any():
+        return out
+    dig = _DIGITO[car]
+    let = _LETRA[car]
+    e_let = let >= 0
+    valido = ok & ((dig >= 0).sum(axis=1) == 3) & (e_let.sum(axis=1) == 2)
+
+    padrao = np.where(valido, _PADRAO_IDX[e_let.astype(np.int64) @ _PESOS_POS], -1)
+    # por padrão de posições das letras: dígitos e letras saem de colunas fixas
+    for p, ((a, b), digitos) in enumerate(zip(_PADROES, _DIGITOS)):
+        linhas = np.flatnonzero(padrao == p)
+        if not linhas.size:
+            continue
+        d = dig[linhas][:, digitos].astype(np.int64) @ _PESOS_DIG
+        l = let[linhas][:, [a, b]].astype(np.int64) @ _PESOS_LET
+        out[linhas] = (p * 1000 + d) * 676 + l
+    return out
+
+
+def encode(rid: str) -> int | None:
+    n = int(encode_many([rid])[0])
+    return None if n < 0 else n
+
+
+def decode(n: int) -> str:
+    resto, l = divmod(n, 676)
+    p, d = divmod(resto, 1000)
+    letras = iter((chr(65 + l // 26), chr(65 + l % 26)))
+    digitos = iter(f"{d:03d}")
+    pos = _PADROES[p]
+    return "".join(next(letras) if i in pos else next(digitos) for i in range(5))
+
+
+class IdAllocator:
+    def __init__(self, seed=None):
+        self._bits = np.zeros((SPACE + 7) // 8, dtype=np.uint8)
+        # bits além do fim do espaço ficam marcados para nunca serem sorteados
+        for n in range(SPACE, self._bits.size * 8):
+            self._bits[n >> 3] |= 1 << (n & 7)
+        self._rnd = random.Random(seed)
+        self._versoes: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _used(self, n: int) -> bool:
+        return bool(self._bits[n >> 3] >> (n & 7) & 1)
+
+    def _set(self, n: int) -> None:
+        self._bits[n >> 3] |= 1 << (n & 7)
+
+    def mark(self, ids, versao: str | None = None) -> None:
+        """
+        Marca como usados os IDs existentes (ex.: coluna ID do arquivo).
+        versao: identifica a origem (ex.: eTag do arquivo); uma versão já
+        marcada não é marcada de novo, então recarregar a mesma versão não
+        custa nada.
+        """
+        if versao is not None:
+            with self._lock:
+                if versao in self._versoes:
+                    return
+        n = encode_many(ids)
+        n = n[n >= 0]
+        with self._lock:
+            if n.size:
+                np.bitwise_or.at(self._bits, n >> 3, (1 << (n & 7)).astype(np.uint8))
+            if versao is not None:
+                if len(self._versoes) >= _MAX_VERSOES:
+                    self._versoes.clear()
+                self._versoes.add(versao)
+
+    def is_used(self, rid: str) -> bool:
+        n = encode(rid)
+        return n is not None and self._used(n)
+
+    def _livre(self) -> int:
+        for _ in range(_TENTATIVAS):
+            n = self._rnd.randrange(SPACE)
+            if not self._used(n):
+                return n
+        # espaço quase cheio: primeiro byte com bit livre a partir de um ponto sorteado
+        livres = np.flatnonzero(self._bits != 0xFF)
+        if livres.size == 0:
+            raise RuntimeError("Espaço de IDs esgotado")
+        b = int(livres[np.searchsorted(livres, self._rnd.randrange(self._bits.size)) % livres.size])
+        byte = int(self._bits[b])
+        bit = next(i for i in range(8) if not byte >> i & 1)
+        return b * 8 + bit
+
+    def reserve(self, count: int) -> list[str]:
+        """Reserva `count` IDs livres de uma vez (ex.: linhas novas de uma submissão)."""
+        with self._lock:
+            out = []
+            for _ in range(count):
+                n = self._livre()
+                self._set(n)
+                out.append(decode(n))
+            return out
+
+    def allocate(self) -> str:
+        return self.reserve(1)[0]
@@ -0,0 +1,153 @@
+# log_archive.py
+"""
+Arquivamento mensal da aba 'log' (quando o log continua no Excel).
+
+A aba viva guarda só a janela recente (ex.: 90 dias). Entradas mais antigas
+vão para workbooks mensais na biblioteca:
+
+    <pasta>/log_<AAAA-MM>.xlsx      (aba 'log', mesmas colunas)
+
+O rollover é idempotente: linhas já presentes no arquivo do mês não são
+duplicadas, então repetir o ciclo após um 412 não gera cópias.
+
+query() consulta a aba viva e os arquivos juntos, por ID e/ou intervalo de
+datas, lendo só os meses que o intervalo cobre.
+"""
+import logging
+import re
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import excel_readers
+import excel_writers
+from sp_connector import SPConnector
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SHEET = "log"
+_MONTH_RE = re.compile(r"^log_(\d{4}-\d{2})\.xlsx$")
+
+
+class LogArchive:
+    def __init__(self, sp: SPConnector, folder: str, window_days: int,
+                 columns: list[str], date_column: str = "Data", writer_engine: str | None = None):
+        self.sp = sp
+        self.folder = folder.rstrip("/")
+        self.window_days = window_days
+        self.columns = list(columns)
+        self.date_column = date_column
+        self.writer_engine = writer_engine
+
+    def archive_path(self, month: str) -> str:
+        return f"{self.folder}/log_{month}.xlsx"
+
+    def _dates(self, df: pd.DataFrame) -> pd.Series:
+        return pd.to_datetime(df[self.date_column], errors="coerce")
+
+    # -------- Rollover --------
+    def cutoff(self, now: datetime | None = None) -> pd.Timestamp:
+        """Início do mês que contém (agora - janela): o arquivamento é por mês inteiro."""
+        limite = (now or datetime.now()) - timedelta(days=self.window_days)
+        return pd.Timestamp(limite.year, limite.month, 1)
+
+    def needs_rollover(self, log_df: pd.DataFrame) -> bool:
+        if log_df is None or log_df.empty or self.date_column not in log_df.columns:
+            return False
+        return bool((self._dates(log_df) < self.cutoff()).any())
+
+    def rollover(self, log_df: pd.DataFrame) -> tuple[pd.DataFrame, int]:
+        """
+        Move para os arquivos mensais as entradas anteriores ao corte.
+        Devolve (aba viva restante, quantidade arquivada). Entradas sem data
+        válida ficam na aba viva.
+        """
+        if not self.needs_rollover(log_df):
+            return log_df, 0
+        datas = self._dates(log_df)
+        antigas = datas < self.cutoff()
+        old = log_df[antigas]
+        meses = datas[antigas].dt.strftime("%Y-%m")
+        for month, part in old.groupby(meses, sort=True):
+            self._append_month(month, part)
+        return log_df[~antigas].reset_index(drop=True), int(antigas.sum())
+
+    def _append_month(self, month: str, part: pd.DataFrame) -> None:
+        path = self.archive_path(month)
+
+        def _save():
+            try:
+                fh, etag = self.sp.download_stream(path, with_etag=True)
+            except FileNotFoundError:
+                existing, etag = pd.DataFrame(columns=self.columns), None
+            else:
+                with fh:
+                    existing = excel_readers.read_excel(fh, sheet_name=ARCHIVE_SHEET, engine=self.sp.excel_engine)
+            novas = part.reindex(columns=self.columns)
+            if not existing.empty:
+                # idempotente: só o que ainda não está no arquivo do mês
+                chave = lambda df: df.reindex(columns=self.columns).astype(str).agg("\x1f".join, axis=1)
+                novas = novas[~chave(novas).isin(set(chave(existing)))]
+                if novas.empty:
+                    return
+            merged = pd.concat([existing, novas], ignore_index=True)
+            content = excel_writers.write_excel({ARCHIVE_SHEET: merged}, engine=self.writer_engine)
+            # arquivo novo: falha com 409 se outro processo criou antes -> RetryPolicy repete
+            self.sp.upload(path, content, overwrite=etag is not None, if_match=etag)
+
+        self.sp.run_with_retry(_save)
+        logger.info(f"Log: {len(part)} entradas arquivadas em {path}")
+
+    # -------- Consulta --------
+    def months(self) -> list[str]:
+        return sorted(m.group(1) for i in self.sp.list_children(self.folder)
+                      if (m := _MONTH_RE.match(i.get("name", ""))))
+
+    def query(self, live_df: pd.DataFrame | None = None, ids=None,
+              start: datetime | None = None, end: datetime | None = None) -> pd.DataFrame:
+        """
+        Entradas da aba viva + arquivos que casam com `ids` (um ID ou lista) e
+        com o intervalo [start, end]. Só os arquivos dos meses do intervalo
+        são baixados.
+        """
+        inicio, fim = _bounds(start, end)
+        meses = self.months()
+        if inicio is not None:
+            meses = [m for m in meses if m >= inicio.strftime("%Y-%m")]
+        if fim is not None:
+            meses = [m for m in meses if m <= fim.strftime("%Y-%m")]
+
+        frames = []
+        for month in meses:
+            with self.sp.download_stream(self.archive_path(month)) as fh:
+                frames.append(excel_readers.read_excel(fh, sheet_name=ARCHIVE_SHEET, engine=self.sp.excel_engine))
+        if live_df is not None and not live_df.empty:
+            frames.append(live_df)
+        if not frames:
+            return pd.DataFrame(columns=self.columns)
+        df = pd.concat([f.reindex(columns=self.columns) for f in frames], ignore_index=True)
+        return filter_log(df, ids, start, end, self.date_column)
+
+
+def _bounds(start, end) -> tuple[pd.Timestamp | None, pd.Timestamp | None]:
+    inicio = pd.Timestamp(start) if start is not None else None
+    fim = pd.Timestamp(end) if end is not None else None
+    if fim is not None and not isinstance(end, datetime):
+        fim += pd.Timedelta(days=1) - pd.Timedelta(1, "ns")    # data pura: o dia inteiro
+    return inicio, fim
+
+
+def filter_log(df: pd.DataFrame, ids=None, start=None, end=None, date_column: str = "Data") -> pd.DataFrame:
+    """Entradas de `df` com ID em `ids` (um ID ou lista) e data em [start, end], em ordem de data."""
+    if isinstance(ids, str):
+        ids = [ids]
+    inicio, fim = _bounds(start, end)
+    mask = pd.Series(True, index=df.index)
+    if ids is not None:
+        mask &= df["ID"].astype(str).isin({str(i) for i in ids})
+    datas = pd.to_datetime(df[date_column], errors="coerce")
+    if inicio is not None:
+        mask &= datas >= inicio
+    if fim is not None:
+        mask &= datas <= fim
+    return df[mask].sort_values(date_column, kind="stable").reset_index(drop=True)
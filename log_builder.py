@@ -0,0 +1,59 @@
+# log_builder.py
+"""
+Acumulador de entradas do log de auditoria.
+
+As entradas vão para buffers por coluna (uma lista por coluna) e o DataFrame
+é montado uma vez só no fim, então registrar N alterações custa O(N) — sem
+um pd.concat (cópia do log inteiro) por entrada.
+
+    log = LogBuilder(LOG_COLUMNS)
+    log.add({"ID": "123AB", "Campo": "Status", ...})            # uma entrada
+    log.add_columns({"ID": ids, "Operação": "EDIÇÃO"}, len(ids))  # várias, por coluna
+    log.frame()     # DataFrame com as colunas na ordem declarada
+    log.records()   # lista de dicts (journal, API de workbook)
+"""
+import pandas as pd
+
+
+class LogBuilder:
+    def __init__(self, columns: list[str], default=""):
+        self.columns = list(columns)
+        self.default = default
+        self._buf: dict[str, list] = {c: [] for c in self.columns}
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def add(self, entry: dict) -> None:
+        """Uma entrada; colunas ausentes recebem o valor padrão."""
+        for c in self.columns:
+            self._buf[c].append(entry.get(c, self.default))
+        self._n += 1
+
+    def add_columns(self, values: dict, n: int) -> None:
+        """
+        `n` entradas de uma vez: cada valor é uma sequência de tamanho n
+        (lista, Series, array) ou um escalar repetido em todas.
+        """
+        if n <= 0:
+            return
+        for c in self.columns:
+            v = values.get(c, self.default)
+            if getattr(v, "ndim", 0) > 0:        # Series, Index, array
+                v = v.tolist()
+            elif isinstance(v, (list, tuple)):
+                v = list(v)
+            else:
+                self._buf[c].extend([v] * n)
+                continue
+            if len(v) != n:
+                raise ValueError(f"Coluna '{c}' com {len(v)} valores; esperado {n}")
+            self._buf[c].extend(v)
+        self._n += n
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self._buf, columns=self.columns)
+
+    def records(self) -> list[dict]:
+        return [dict(zip(self.columns, row)) for row in zip(*(self._buf[c] for c in self.columns))]
@@ -0,0 +1,197 @@
+# ranged_zip.py
+"""
+Leitura parcial de .xlsx (ZIP) via HTTP Range.
+
+Um .xlsx é um ZIP: o diretório central fica no fim do arquivo e aponta o
+deslocamento de cada parte. Com isso dá para baixar só o fim do arquivo, achar
+as partes das abas pedidas (+ workbook, rels, sharedStrings e styles) e buscar
+apenas os trechos delas, em vez do workbook inteiro (ex.: ler 'apontamentos'
+sem trazer a aba 'log').
+
+O resultado é remontado num .xlsx mínimo em memória que o pandas/openpyxl
+abrem normalmente, contendo só as abas solicitadas.
+"""
+import io
+import re
+import struct
+import zipfile
+import zlib
+from typing import Callable
+from xml.etree import ElementTree as ET
+
+EOCD_SIG = b"PK\x05\x06"
+ZIP64_LOCATOR_SIG = b"PK\x06\x07"
+CENTRAL_SIG = b"PK\x01\x02"
+LOCAL_SIG = b"PK\x03\x04"
+
+# Fim do arquivo buscado na primeira requisição (EOCD + comentário máx. + diretório central típico)
+TAIL_BYTES = 64 * 1024
+# Trechos separados por menos que isso são buscados numa única requisição
+MERGE_GAP = 16 * 1024
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# Partes sempre necessárias para abrir o workbook
+BASE_PARTS = ("[Content_Types].xml", "_rels/.rels", "xl/workbook.xml", "xl/_rels/workbook.xml.rels")
+SHARED_PARTS = ("xl/sharedStrings.xml", "xl/styles.xml")
+
+
+class RangedZipError(Exception):
+    """O arquivo não pode ser lido por partes (ex.: ZIP64); use o download completo."""
+
+
+class RangedZip:
+    def __init__(self, fetch: Callable[[int, int], bytes], size: int):
+        """
+        fetch(inicio, fim) -> bytes do intervalo fechado [inicio, fim]
+        size: tamanho total do arquivo em bytes
+        """
+        self.fetch = fetch
+        self.size = size
+        self.bytes_fetched = 0
+        self._entries: dict[str, tuple[int, int, int, int]] = {}   # nome -> (método, comp, offset, fim)
+        self._tail = b""
+        self._tail_start = 0
+        self._read_directory()
+
+    # -------- Diretório central --------
+    def _get(self, start: int, end: int) -> bytes:
+        data = self.fetch(start, end)
+        self.bytes_fetched += len(data)
+        return data
+
+    def _read_directory(self) -> None:
+        self._tail_start = max(self.size - TAIL_BYTES, 0)
+        self._tail = self._get(self._tail_start, self.size - 1)
+        pos = self._tail.rfind(EOCD_SIG)
+        if pos < 0:
+            raise RangedZipError("fim do diretório central não encontrado")
+        if self._tail.rfind(ZIP64_LOCATOR_SIG, 0, pos) >= 0:
+            raise RangedZipError("ZIP64 não suportado na leitura parcial")
+        _, _, _, _, count, cd_size, cd_offset, _ = struct.unpack("<4s4H2LH", self._tail[pos:pos + 22])
+
+        if cd_offset >= self._tail_start:
+            cd = self._tail[cd_offset - self._tail_start:cd_offset - self._tail_start + cd_size]
+        else:
+            cd = self._get(cd_offset, cd_offset + cd_size - 1)
+
+        offsets, i = [], 0
+        for _ in range(count):
+            if cd[i:i + 4] != CENTRAL_SIG:
+                raise RangedZipError("diretório central inválido")
+            (method, comp_size, name_len, extra_len, comment_len, local_offset) = (
+                struct.unpack("<H", cd[i + 10:i + 12])[0],
+                struct.unpack("<L", cd[i + 20:i + 24])[0],
+                *struct.unpack("<3H", cd[i + 28:i + 34]),
+                struct.unpack("<L", cd[i + 42:i + 46])[0],
+            )
+            name = cd[i + 46:i + 46 + name_len].decode("utf-8")
+            offsets.append((local_offset, name, method, comp_size))
+            i += 46 + name_len + extra_len + comment_len
+
+        # cada parte vai do seu cabeçalho local até o início da próxima (ou do diretório central)
+        offsets.sort()
+        for n, (local_offset, name, method, comp_size) in enumerate(offsets):
+            end = offsets[n + 1][0] if n + 1 < len(offsets) else cd_offset
+            self._entries[name] = (method, comp_size, local_offset, end - 1)
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._entries)
+
+    # -------- Partes --------
+    def read(self, names: list[str]) -> dict[str, bytes]:
+        """Conteúdo descomprimido das partes pedidas (as inexistentes são ignoradas)."""
+        wanted = sorted((self._entries[n][2], self._entries[n][3], n) for n in set(names) if n in self._entries)
+        spans: list[list] = []
+        for start, end, name in wanted:
+            if spans and start - spans[-1][1] <= MERGE_GAP:
+                spans[-1][1] = max(spans[-1][1], end)
+                spans[-1][2].append(name)
+            else:
+                spans.append([start, end, [name]])
+
+        out = {}
+        for start, end, members in spans:
+            if start >= self._tail_start:
+                blob = self._tail[start - self._tail_start:end - self._tail_start + 1]
+            else:
+                blob = self._get(start, end)
+            for name in members:
+                out[name] = self._extract(name, blob, start)
+        return out
+
+    def _extract(self, name: str, blob: bytes, blob_start: int) -> bytes:
+        method, comp_size, local_offset, _ = self._entries[name]
+        i = local_offset - blob_start
+        if blob[i:i + 4] != LOCAL_SIG:
+            raise RangedZipError(f"cabeçalho local inválido em {name}")
+        name_len, extra_len = struct.unpack("<2H", blob[i + 26:i + 30])
+        data_start = i + 30 + name_len + extra_len
+        raw = blob[data_start:data_start + comp_size]
+        if method == zipfile.ZIP_STORED:
+            return raw
+        if method == zipfile.ZIP_DEFLATED:
+            return zlib.decompress(raw, -15)
+        raise RangedZipError(f"compressão {method} não suportada em {name}")
+
+
+def _sheet_targets(workbook_xml: bytes, rels_xml: bytes) -> dict[str, str]:
+    """Nome da aba -> caminho da parte (ex.: 'log' -> 'xl/worksheets/sheet2.xml')."""
+    rels = {}
+    for rel in ET.fromstring(rels_xml).iter(f"{{{NS_PKG_REL}}}Relationship"):
+        target = rel.get("Target", "")
+        target = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+        rels[rel.get("Id")] = target
+    out = {}
+    for sheet in ET.fromstring(workbook_xml).iter(f"{{{NS_MAIN}}}sheet"):
+        rid = sheet.get(f"{{{NS_REL}}}id")
+        if rid in rels:
+            out[sheet.get("name")] = rels[rid]
+    return out
+
+
+def _strip_workbook(workbook_xml: bytes, keep: set[str]) -> bytes:
+    """
+    Remove do workbook.xml as abas não trazidas e os blocos que apontariam
+    para elas (nomes definidos, caches de tabela dinâmica).
+    """
+    text = workbook_xml.decode("utf-8")
+
+    def _sheet(m):
+        name = re.search(r'\bname="([^"]*)"', m.group(0))
+        return m.group(0) if name and _unescape(name.group(1)) in keep else ""
+
+    text = re.sub(r"<(?:\w+:)?sheet\b[^>]*/>", _sheet, text)
+    text = re.sub(r"<((?:\w+:)?definedNames)\b.*?</\1>", "", text, flags=re.S)
+    text = re.sub(r"<((?:\w+:)?pivotCaches)\b.*?</\1>", "", text, flags=re.S)
+    return text.encode("utf-8")
+
+
+def _unescape(s: str) -> str:
+    return (s.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"')
+             .replace("&apos;", "'").replace("&amp;", "&"))
+
+
+def extract_sheets(rz: RangedZip, sheets: list[str]) -> io.BytesIO:
+    """
+    Monta um .xlsx mínimo só com as abas pedidas (as que não existirem são
+    ignoradas; sheet_names do resultado diz o que veio).
+    """
+    base = rz.read(list(BASE_PARTS))
+    if "xl/workbook.xml" not in base or "xl/_rels/workbook.xml.rels" not in base:
+        raise RangedZipError("arquivo não parece ser um .xlsx")
+    targets = _sheet_targets(base["xl/workbook.xml"], base["xl/_rels/workbook.xml.rels"])
+    keep = {s for s in sheets if s in targets}
+    parts = rz.read([targets[s] for s in keep] + list(SHARED_PARTS))
+    base["xl/workbook.xml"] = _strip_workbook(base["xl/workbook.xml"], keep)
+
+    out = io.BytesIO()
+    # sem recompressão: o buffer é só para o leitor local
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as z:
+        for name, data in {**base, **parts}.items():
+            z.writestr(name, data)
+    out.seek(0)
+    return out
@@ -0,0 +1,126 @@
+# schemas.py
+"""
+Registro de schemas das planilhas: dtypes aplicados uma vez, na carga.
+
+  - categorias: colunas de domínio pequeno viram `category` (filtros por
+    igualdade comparam códigos inteiros). O domínio declarado vem primeiro
+    nas categorias; valores fora dele presentes no arquivo são acrescentados,
+    nunca descartados. Domínio None = categorias só com os valores observados.
+  - texto: colunas de texto longo viram string Arrow (sem um objeto Python
+    por célula); requer pyarrow, sem ele ficam como estão.
+  - datas: convertidas para datetime64 (aceita dd/mm/aaaa em texto).
+
+Os domínios fixos aqui são os mesmos oferecidos nos selectbox do Painel ADM.
+"""
+import importlib.util
+
+import pandas as pd
+
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+class Schema:
+    def __init__(self, categorias: dict[str, list | None] | None = None,
+                 texto: tuple[str, ...] = (), datas: tuple[str, ...] = (),
+                 formato_data: str = "%d/%m/%Y"):
+        self.categorias = categorias or {}
+        self.texto = tuple(texto)
+        self.datas = tuple(datas)
+        self.formato_data = formato_data
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Devolve uma cópia de `df` com os dtypes declarados (colunas ausentes são ignoradas)."""
+        if df is None or df.empty:
+            return df
+        df = df.copy()
+        for col, dominio in self.categorias.items():
+            if col in df.columns:
+                df[col] = _categorical(df[col], dominio)
+        if _HAS_PYARROW:
+            for col in self.texto:
+                if col in df.columns:
+                    df[col] = _arrow_string(df[col])
+        for col in self.datas:
+            if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = _datetime(df[col], self.formato_data)
+        return df
+
+
+def _categorical(s: pd.Series, dominio: list | None) -> pd.Series:
+    # só tira espaços de texto; números etc. ficam como vieram do arquivo
+    valores = s.map(lambda v: (v.strip() or None) if isinstance(v, str) else v)
+    declarados = list(dominio or [])
+    conhecidos = set(declarados)
+    extras = sorted((v for v in pd.unique(valores.dropna()) if v not in conhecidos), key=str)
+    return pd.Series(pd.Categorical(valores, categories=declarados + extras), index=s.index, name=s.name)
+
+
+def _arrow_string(s: pd.Series) -> pd.Series:
+    return s.where(s.isna(), s.astype(str)).astype(pd.StringDtype("pyarrow"))
+
+
+def _datetime(s: pd.Series, formato: str) -> pd.Series:
+    # células já datadas pelo Excel + texto no formato brasileiro
+    convertidas = pd.to_datetime(s.where(s.map(lambda v: not isinstance(v, str))), errors="coerce")
+    texto = s.where(s.map(lambda v: isinstance(v, str)))
+    if texto.notna().any():
+        convertidas = convertidas.fillna(pd.to_datetime(texto, format=formato, errors="coerce"))
+    return convertidas
+
+
+def as_object(df: pd.DataFrame) -> pd.DataFrame:
+    """Cópia com colunas category/string de volta para object (ex.: antes do st.data_editor)."""
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, (pd.CategoricalDtype, pd.StringDtype)):
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+    return df
+
+
+# --------------------------------------------------------------------
+# Apontamentos
+# --------------------------------------------------------------------
+STATUS = ["REALIZADO DURANTE A CONDUÇÃO", "REALIZADO", "VERIFICANDO", "PENDENTE", "NÃO APLICÁVEL"]
+ORIGEM = [
+    "Documentação Clínica", "Excelência Operacional", "Operações Clínicas",
+    "Patrocinador / Monitor", "Garantia Da Qualidade",
+]
+PARTICIPANTE = ["N/A", "Outros"] + [f"PP{i:02d}" for i in range(1, 1000)]
+PERIODO = ["N/a", "Pós"] + [f"{i}° Período" for i in range(1, 11)]
+CRITICIDADE = ["Baixo", "Médio", "Alto"]
+
+APONTAMENTOS_DATAS = (
+    "Data do Apontamento", "Prazo Para Resolução", "Data de Verificação",
+    "Data Resolução", "Data Atualização", "Disponibilizado para Verificação",
+    "Data Início Verificação",
+)
+
+APONTAMENTOS = Schema(
+    categorias={
+        "Status": STATUS,
+        "Origem Do Apontamento": ORIGEM,
+        "Participante": PARTICIPANTE,
+        "Período": PERIODO,
+        "Grau De Criticidade Do Apontamento": CRITICIDADE,
+        # domínio aberto: categorias = valores do arquivo
+        "Código do Estudo": None,
+        "Plantão": None,
+        "Responsável Pela Correção": None,
+    },
+    texto=("Apontamento", "Justificativa", "Documentos"),
+    datas=APONTAMENTOS_DATAS,
+)
+
+# --------------------------------------------------------------------
+# Colaboradores (a aba é editada linha a linha no app: só colunas cujos
+# valores gravados ficam dentro do domínio)
+# --------------------------------------------------------------------
+COLABORADORES = Schema(
+    categorias={"Ativos": ["Sim", "Não"]},
+    texto=("Nome Completo do Profissional",),
+)
+
+REGISTRY = {
+    "apontamentos": APONTAMENTOS,
+    "colaboradores": COLABORADORES,
+}
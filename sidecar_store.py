@@ -0,0 +1,121 @@
+# sidecar_store.py
+"""
+Snapshot colunar (Parquet) das abas já parseadas, chaveado pelo eTag do .xlsx.
+
+O .xlsx no SharePoint continua sendo a fonte da verdade; o sidecar é só um
+cache local em disco. Para uma versão (arquivo, eTag) já vista, as abas são
+lidas do Parquet em milissegundos em vez de reparsear o Excel — inclusive
+depois de reiniciar o processo.
+
+Layout:
+    <dir>/<sha1(arquivo)>/<sha1(eTag)>/manifest.json
+    <dir>/<sha1(arquivo)>/<sha1(eTag)>/<n>.parquet      (uma por aba)
+
+Requer pyarrow; sem ele (ou com abas que o Arrow não representa, como colunas
+com tipos misturados) o sidecar simplesmente não é usado para aquela aba.
+"""
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import threading
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _sha1(s: str) -> str:
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()
+
+
+class SidecarStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.enabled = importlib.util.find_spec("pyarrow") is not None
+        if not self.enabled:
+            logger.warning("pyarrow não instalado; snapshot Parquet desativado")
+        self._lock = threading.Lock()
+
+    def _dir(self, key: str, etag: str) -> str:
+        return os.path.join(self.root, _sha1(key), _sha1(etag))
+
+    def _manifest(self, d: str) -> dict:
+        try:
+            with open(os.path.join(d, "manifest.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"sheets": {}, "missing": [], "complete": False}
+
+    # -------- API --------
+    def load(self, key: str, etag: str, sheets: list[str] | None) -> tuple[dict[str, pd.DataFrame], set[str], bool]:
+        """
+        Abas disponíveis no sidecar para essa versão.
+        Devolve (abas carregadas, abas sabidamente inexistentes, workbook completo?).
+        Com sheets=None carrega todas, mas só se o sidecar tiver o workbook completo.
+        """
+        if not self.enabled or not etag:
+            return {}, set(), False
+        d = self._dir(key, etag)
+        manifest = self._manifest(d)
+        files = manifest.get("sheets", {})
+        complete = bool(manifest.get("complete"))
+        if sheets is None and not complete:
+            return {}, set(), False
+        out = {}
+        for name in (files if sheets is None else sheets):
+            if name not in files:
+                continue
+            try:
+                out[name] = pd.read_parquet(os.path.join(d, files[name]))
+            except Exception as e:
+                logger.warning(f"Sidecar ilegível ({name}): {e}")
+                return {}, set(), False
+        missing = set(manifest.get("missing", []))
+        if complete:
+            missing |= {s for s in (sheets or []) if s not in files}
+        return out, missing, complete and sheets is None
+
+    def save(self, key: str, etag: str, frames: dict[str, pd.DataFrame],
+             missing: set[str] = frozenset(), complete: bool = False) -> None:
+        """Grava as abas da versão (acrescentando às já gravadas) e apaga versões antigas."""
+        if not self.enabled or not etag:
+            return
+        d = self._dir(key, etag)
+        with self._lock:
+            try:
+                os.makedirs(d, exist_ok=True)
+                manifest = self._manifest(d)
+                files = manifest.setdefault("sheets", {})
+                for name, df in frames.items():
+                    fname = files.get(name) or f"{len(files)}.parquet"
+                    tmp = os.path.join(d, fname + ".tmp")
+                    try:
+                        df.to_parquet(tmp, index=False)
+                    except Exception as e:
+                        # ex.: coluna com int e str misturados; fica só no Excel
+                        logger.info(f"Aba '{name}' sem sidecar: {e}")
+                        if os.path.exists(tmp):
+                            os.remove(tmp)
+                        continue
+                    os.replace(tmp, os.path.join(d, fname))
+                    files[name] = fname
+                if complete and all(name in files for name in frames):
+                    manifest["complete"] = True
+                manifest["missing"] = sorted(set(manifest.get("missing", [])) | set(missing))
+                tmp = os.path.join(d, "manifest.json.tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f)
+                os.replace(tmp, os.path.join(d, "manifest.json"))
+                self._prune(key, keep=d)
+            except OSError as e:
+                logger.warning(f"Não foi possível gravar o sidecar em {d}: {e}")
+
+    def _prune(self, key: str, keep: str) -> None:
+        parent = os.path.dirname(keep)
+        for name in os.listdir(parent):
+            path = os.path.join(parent, name)
+            if path != keep and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
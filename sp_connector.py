@@ -1,9 +1,111 @@
 # sp_connector.py
-import io, time, requests, msal, pandas as pd
-from urllib.parse import quote
+import io, os, json, time, random, tempfile, threading, requests, pandas as pd
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote, unquote
+
+import excel_readers
+import excel_writers
+import graph_http
+from content_cache import ContentCache
+from ranged_zip import RangedZip, RangedZipError, extract_sheets
+from token_provider import AppTokenProvider
 
 GRAPH = "https://graph.microsoft.com/v1.0"
 
+class RetryPolicy:
+    """
+    Backoff exponencial com jitter ("full jitter"), respeitando Retry-After e
+    com prazo total. Classifica pelo status HTTP:
+      - REQUEST_STATUSES: transitórios, repetidos na própria requisição
+      - CONFLICT_STATUSES: conflito de versão, repetidos no ciclo inteiro
+        (baixar -> mesclar -> subir) via SPConnector.run_with_retry
+    """
+    REQUEST_STATUSES = frozenset({423, 429, 500, 502, 503, 504})
+    CONFLICT_STATUSES = frozenset({409, 412})
+
+    def __init__(self, base: float = 1.0, cap: float = 30.0,
+                 deadline: float = 120.0, max_attempts: int = 8):
+        self.base = base
+        self.cap = cap
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        if retry_after is not None:
+            return max(retry_after, 0.0)
+        return random.uniform(0, min(self.cap, self.base * (2 ** attempt)))
+
+    @staticmethod
+    def retry_after(response) -> float | None:
+        """Segundos do header Retry-After (número ou data HTTP)."""
+        value = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+
+    @staticmethod
+    def status_of(exc: Exception) -> int | None:
+        return getattr(getattr(exc, "response", None), "status_code", None)
+
+    def is_retryable(self, exc: Exception, conflicts: bool = True) -> bool:
+        if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+            return True
+        code = self.status_of(exc)
+        if code in self.REQUEST_STATUSES:
+            return True
+        return conflicts and code in self.CONFLICT_STATUSES
+
+
+class _IdStore:
+    """
+    IDs do Graph (site, drive, driveItem por caminho) em memória e, se houver
+    caminho, persistidos num JSON para sobreviver a reinícios do processo.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._ids: dict[str, str] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._ids = dict(json.load(f))
+            except (OSError, ValueError):
+                self._ids = {}
+
+    def get(self, key: str) -> str | None:
+        return self._ids.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            if self._ids.get(key) == value:
+                return
+            self._ids[key] = value
+            self._flush()
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            if self._ids.pop(key, None) is not None:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._ids, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
 class SPConnector:
     """
     Conecta no SharePoint/OneDrive via Microsoft Graph (app-only).
@@ -17,8 +119,25 @@ class SPConnector:
         (aceita tb server-relative /sites/<site>/<lib>/... que será normalizado)
     """
 
+    # Limite do upload simples (PUT único) e tamanho das partes da upload session.
+    # As partes precisam ser múltiplas de 320 KiB.
+    SMALL_UPLOAD_LIMIT = 4 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE = 10 * 320 * 1024
+    UPLOAD_MAX_RESUMES = 5
+    # download_stream: até esse tamanho o arquivo fica em memória, acima vai p/ disco
+    SPOOL_MAX_MEMORY = 32 * 1024 * 1024
+    STREAM_CHUNK_SIZE = 1024 * 1024
+    # Abaixo disso a leitura por Range (várias requisições) não compensa
+    RANGED_MIN_SIZE = 1024 * 1024
+
     def __init__(self, tenant_id, client_id, client_secret,
-                 hostname=None, site_path=None, library_name=None, user_upn=None):
+                 hostname=None, site_path=None, library_name=None, user_upn=None,
+                 session: requests.Session | None = None,
+                 cache_dir: str | None = None, cache_max_bytes: int = 512 * 1024 * 1024,
+                 retry_policy: RetryPolicy | None = None,
+                 token_cache_path: str | None = None,
+                 graph_url: str = GRAPH, token_provider=None,
+                 id_cache_path: str | None = None, excel_engine: str | None = None):
         self.tenant_id = tenant_id
         self.client_id = client_id
         self.client_secret = client_secret
@@ -28,31 +147,96 @@ class SPConnector:
         self.library_name = library_name or ""
         self.user_upn = user_upn or ""          # se presente, opera em OneDrive
 
-        self._app = msal.ConfidentialClientApplication(
-            client_id=self.client_id,
-            authority=f"https://login.microsoftonline.com/{self.tenant_id}",
-            client_credential=self.client_secret,
+        # Base do Graph (troca p/ o stand-in local em benchmarks)
+        self.graph_url = graph_url.rstrip("/")
+
+        # Token app-only: single-flight + renovação em background + cache MSAL em disco
+        self._tokens = token_provider or AppTokenProvider(
+            self.tenant_id, self.client_id, self.client_secret,
+            cache_path=token_cache_path,
         )
-        self._tok = None
-        self._exp = 0
+        self._app = getattr(self._tokens, "app", None)
         self._site_id_cache = None
         self._drive_id_cache = None
+        # site/drive/driveItem ids persistidos (default: dentro de cache_dir)
+        if id_cache_path is None and cache_dir:
+            id_cache_path = os.path.join(cache_dir, "graph_ids.json")
+        self._ids = _IdStore(id_cache_path)
+        # engine de leitura de .xlsx (ver excel_readers; None = EXCEL_READER_ENGINE/auto)
+        self.excel_engine = excel_engine
+        # Session fixo (ex.: benchmarks); se None usa o pool compartilhado do processo
+        self._session = session
+        # Cache de conteúdo validado por eTag (memória + disco opcional)
+        self._content_cache = ContentCache(disk_dir=cache_dir, disk_max_bytes=cache_max_bytes)
+        self.retry_policy = retry_policy or RetryPolicy()
 
     # -------- Auth --------
     def _token(self):
-        now = time.time()
-        if self._tok and now < self._exp:
-            return self._tok
-        res = self._app.acquire_token_for_client(scopes=["https://graph.microsoft.com/.default"])
-        if "access_token" not in res:
-            raise RuntimeError(res.get("error_description") or res)
-        self._tok = res["access_token"]
-        self._exp = now + int(res.get("expires_in", 3600)) - 60
-        return self._tok
+        return self._tokens.get()
 
     def _headers(self):
         return {"Authorization": f"Bearer {self._token()}"}
 
+    # -------- HTTP --------
+    def _http(self) -> requests.Session:
+        return self._session or graph_http.session()
+
+    def _request(self, method: str, url: str, retry: bool = True, **kw) -> requests.Response:
+        """
+        Requisição com retentativa para status transitórios (423/429/5xx) e
+        falhas de conexão, conforme self.retry_policy. Devolve a última resposta
+        (o chamador decide sobre raise_for_status). retry=False para POSTs não
+        idempotentes (ex.: rows/add): uma falha ambígua não pode ser repetida às cegas.
+        """
+        if not retry:
+            return self._http().request(method, url, **kw)
+        policy = self.retry_policy
+        limit = time.monotonic() + policy.deadline
+        attempt = 0
+        while True:
+            try:
+                r = self._http().request(method, url, **kw)
+            except (requests.ConnectionError, requests.Timeout):
+                r = None
+                if attempt + 1 >= policy.max_attempts:
+                    raise
+                delay = policy.backoff(attempt)
+            else:
+                if r.status_code not in policy.REQUEST_STATUSES or attempt + 1 >= policy.max_attempts:
+                    return r
+                delay = policy.backoff(attempt, policy.retry_after(r))
+            if time.monotonic() + delay > limit:
+                if r is None:
+                    raise requests.ConnectionError(f"Prazo esgotado para {method} {url}")
+                return r
+            if r is not None:
+                r.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def run_with_retry(self, fn, on_retry=None):
+        """
+        Executa fn() (ex.: ciclo baixar -> mesclar -> subir) repetindo em 409/412,
+        423/429/5xx e falhas de conexão, com backoff + jitter e prazo total.
+        on_retry(exc, delay) é chamado antes de cada espera (ex.: aviso na UI).
+        """
+        policy = self.retry_policy
+        limit = time.monotonic() + policy.deadline
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                if not policy.is_retryable(e) or attempt + 1 >= policy.max_attempts:
+                    raise
+                delay = policy.backoff(attempt, policy.retry_after(getattr(e, "response", None)))
+                if time.monotonic() + delay > limit:
+                    raise
+                if on_retry is not None:
+                    on_retry(e, delay)
+                time.sleep(delay)
+                attempt += 1
+
     # -------- Modo --------
     @property
     def is_onedrive(self) -> bool:
@@ -64,10 +248,15 @@ class SPConnector:
             return None
         if self._site_id_cache:
             return self._site_id_cache
-        url = f"{GRAPH}/sites/{self.hostname}:/{self.site_path}"
-        r = requests.get(url, headers=self._headers(), timeout=30)
+        key = f"site:{self.hostname.lower()}/{self.site_path.strip('/').lower()}"
+        self._site_id_cache = self._ids.get(key)
+        if self._site_id_cache:
+            return self._site_id_cache
+        url = f"{self.graph_url}/sites/{self.hostname}:/{self.site_path}"
+        r = self._request("GET", url, headers=self._headers(), timeout=30)
         r.raise_for_status()
         self._site_id_cache = r.json()["id"]
+        self._ids.set(key, self._site_id_cache)
         return self._site_id_cache
 
     def _drive_id(self):
@@ -75,17 +264,23 @@ class SPConnector:
             return None
         if self._drive_id_cache:
             return self._drive_id_cache
-        url = f"{GRAPH}/sites/{self._site_id()}/drives"
-        r = requests.get(url, headers=self._headers(), timeout=30)
+        key = f"drive:{self.hostname.lower()}/{self.site_path.strip('/').lower()}/{self.library_name.lower()}"
+        self._drive_id_cache = self._ids.get(key)
+        if self._drive_id_cache:
+            return self._drive_id_cache
+        url = f"{self.graph_url}/sites/{self._site_id()}/drives"
+        r = self._request("GET", url, headers=self._headers(), timeout=30)
         r.raise_for_status()
         drives = r.json().get("value", [])
         for d in drives:
             if d.get("name", "").lower() == self.library_name.lower():
                 self._drive_id_cache = d["id"]
+                self._ids.set(key, self._drive_id_cache)
                 return self._drive_id_cache
         for d in drives:
             if d.get("driveType") == "documentLibrary":
                 self._drive_id_cache = d["id"]
+                self._ids.set(key, self._drive_id_cache)
                 return self._drive_id_cache
         raise RuntimeError(f"Biblioteca '{self.library_name}' não encontrada em {self.site_path}")
 
@@ -123,37 +318,462 @@ class SPConnector:
             return path
 
     # -------- Download / Upload --------
-    def download(self, path: str) -> bytes:
-        rel = quote(self.normalize_path(path), safe="/")
+    def _drive_url(self) -> str:
         if self.is_onedrive:
-            url = f"{GRAPH}/users/{self.user_upn}/drive/root:/{rel}:/content"
-        else:
-            url = f"{GRAPH}/drives/{self._drive_id()}/root:/{rel}:/content"
-        r = requests.get(url, headers=self._headers(), timeout=180)
+            return f"{self.graph_url}/users/{self.user_upn}/drive"
+        return f"{self.graph_url}/drives/{self._drive_id()}"
+
+    def _path_url(self, path: str) -> str:
+        rel = quote(self.normalize_path(path), safe="/")
+        return f"{self._drive_url()}/root:/{rel}:"
+
+    def _item_key(self, path: str) -> str:
+        return f"item:{self._cache_key(path)}"
+
+    def _item_id(self, path: str) -> str | None:
+        """driveItem id do caminho (cache/disco; senão resolve uma vez pelo caminho)."""
+        key = self._item_key(path)
+        item_id = self._ids.get(key)
+        if item_id:
+            return item_id
+        r = self._request("GET", f"{self._path_url(path)}?$select=id", headers=self._headers(), timeout=30)
         if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        item_id = r.json()["id"]
+        self._ids.set(key, item_id)
+        return item_id
+
+    def _remember_item(self, path: str, item: dict) -> None:
+        if item.get("id"):
+            self._ids.set(self._item_key(path), item["id"])
+
+    def _item_url(self, path: str) -> str:
+        """/items/{id} quando o id é conhecido; senão endereça pelo caminho."""
+        item_id = self._item_id(path)
+        if item_id:
+            return f"{self._drive_url()}/items/{item_id}"
+        return self._path_url(path)
+
+    def _content_url(self, path: str) -> str:
+        return f"{self._item_url(path)}/content"
+
+    def _item_request(self, method: str, path: str, suffix: str, **kw) -> requests.Response:
+        """
+        Requisição em {item}/{suffix}. Se o id guardado não existe mais (404),
+        esquece o id, resolve de novo pelo caminho e repete uma vez.
+        """
+        url = f"{self._item_url(path)}/{suffix}" if suffix else self._item_url(path)
+        r = self._request(method, url, **kw)
+        if r.status_code == 404 and "/items/" in url:
+            r.close()
+            self._ids.discard(self._item_key(path))
+            url = f"{self._item_url(path)}/{suffix}" if suffix else self._item_url(path)
+            r = self._request(method, url, **kw)
+        return r
+
+    def _cache_key(self, path: str) -> str:
+        drive = f"user:{self.user_upn.lower()}" if self.is_onedrive else self._drive_id()
+        return f"{drive}:{self.normalize_path(path).strip('/').lower()}"
+
+    def download(self, path: str, use_cache: bool = True, with_etag: bool = False):
+        """
+        Baixa o arquivo. Com use_cache, manda If-None-Match com a última
+        eTag conhecida e devolve o conteúdo do cache quando o Graph responde 304.
+        Com with_etag devolve (bytes, eTag) para uso em upload(..., if_match=eTag).
+        """
+        headers = self._headers()
+        key = self._cache_key(path)
+        cached = self._content_cache.get(key) if use_cache else None
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        r = self._item_request("GET", path, "content", headers=headers, timeout=180)
+        if r.status_code == 304 and cached:
+            return (cached[1], cached[0]) if with_etag else cached[1]
+        if r.status_code == 404:
+            self._content_cache.invalidate(key)
             raise FileNotFoundError(path)
         r.raise_for_status()
-        return r.content
+        etag = r.headers.get("ETag", "")
+        if use_cache:
+            self._content_cache.put(key, etag, r.content)
+        return (r.content, etag) if with_etag else r.content
 
-    def upload_small(self, path: str, content: bytes, overwrite: bool = True):
-        rel = quote(self.normalize_path(path), safe="/")
+    def download_stream(self, path: str, use_cache: bool = True, with_etag: bool = False):
+        """
+        Baixa o arquivo em partes (iter_content) para um SpooledTemporaryFile e
+        devolve o arquivo posicionado no início, sem montar um único bytes.
+        Com cache em disco, um 304 devolve o próprio arquivo do cache aberto.
+        Com with_etag devolve (arquivo, eTag).
+        O chamador deve fechar o arquivo (use com `with`).
+        """
+        headers = self._headers()
+        key = self._cache_key(path)
+        cached = self._content_cache.open(key) if use_cache else None
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        r = self._item_request("GET", path, "content", headers=headers, timeout=180, stream=True)
+        with r:
+            if r.status_code == 304 and cached:
+                return (cached[1], cached[0]) if with_etag else cached[1]
+            if cached:
+                cached[1].close()
+            if r.status_code == 404:
+                self._content_cache.invalidate(key)
+                raise FileNotFoundError(path)
+            r.raise_for_status()
+            etag = r.headers.get("ETag", "")
+            spool = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_MAX_MEMORY)
+            try:
+                for chunk in r.iter_content(chunk_size=self.STREAM_CHUNK_SIZE):
+                    spool.write(chunk)
+                spool.seek(0)
+                if use_cache:
+                    self._content_cache.put_file(key, etag, spool)
+            except Exception:
+                spool.close()
+                raise
+            return (spool, etag) if with_etag else spool
+
+    def item_meta(self, path: str) -> dict:
+        """Metadados do item (id, eTag, size, downloadUrl) sem baixar o conteúdo."""
+        r = self._item_request("GET", path, "", headers=self._headers(), timeout=30,
+                               params={"$select": "id,eTag,size,@microsoft.graph.downloadUrl"})
+        if r.status_code == 404:
+            self._content_cache.invalidate(self._cache_key(path))
+            raise FileNotFoundError(path)
+        r.raise_for_status()
+        meta = r.json()
+        self._remember_item(path, meta)
+        return meta
+
+    def download_sheets(self, path: str, sheets: list[str], with_etag: bool = False,
+                        meta: dict | None = None):
+        """
+        Traz só as abas pedidas de um .xlsx usando HTTP Range sobre o ZIP
+        (diretório central + partes das abas, sharedStrings e styles) e devolve
+        um .xlsx mínimo em memória com essas abas. Abas inexistentes são
+        ignoradas. Se o arquivo inteiro já está no cache com o mesmo eTag, ou é
+        pequeno, ou não pode ser lido por partes, cai no download_stream.
+        Com with_etag devolve (arquivo, eTag) — o eTag é o do item inteiro.
+        meta: resultado recente de item_meta, para não consultar de novo.
+        """
+        meta = meta or self.item_meta(path)
+        etag, size = meta.get("eTag", ""), int(meta.get("size") or 0)
+        url = meta.get("@microsoft.graph.downloadUrl")
+
+        cached_tag = self._content_cache.tag(self._cache_key(path))
+        if not url or size < self.RANGED_MIN_SIZE or (cached_tag and etag_key(cached_tag) == etag_key(etag)):
+            return self.download_stream(path, with_etag=with_etag)
+
+        def fetch(start: int, end: int) -> bytes:
+            # downloadUrl é pré-autenticado: sem Authorization
+            resp = self._request("GET", url, headers={"Range": f"bytes={start}-{end}"}, timeout=180)
+            if resp.status_code != 206:
+                resp.raise_for_status()
+                raise RangedZipError(f"servidor ignorou o Range (HTTP {resp.status_code})")
+            return resp.content
+
+        try:
+            fh = extract_sheets(RangedZip(fetch, size), sheets)
+        except RangedZipError:
+            return self.download_stream(path, with_etag=with_etag)
+        return (fh, etag) if with_etag else fh
+
+    def _conditional_headers(self, if_match: str | None) -> dict:
+        headers = self._headers()
+        if if_match:
+            headers["If-Match"] = if_match
+        return headers
+
+    def _raise_for_upload(self, r: requests.Response, path: str):
+        if r.status_code == 412:
+            # alguém salvou depois do nosso download: a cópia em cache está velha
+            self._content_cache.invalidate(self._cache_key(path))
+        r.raise_for_status()
+
+    def upload_small(self, path: str, content: bytes, overwrite: bool = True,
+                     if_match: str | None = None):
         params = {"@microsoft.graph.conflictBehavior": "replace" if overwrite else "fail"}
-        if self.is_onedrive:
-            url = f"{GRAPH}/users/{self.user_upn}/drive/root:/{rel}:/content"
-        else:
-            url = f"{GRAPH}/drives/{self._drive_id()}/root:/{rel}:/content"
-        r = requests.put(url, headers=self._headers(), params=params, data=content, timeout=300)
+        r = self._item_request("PUT", path, "content", headers=self._conditional_headers(if_match),
+                               params=params, data=content, timeout=300)
+        self._raise_for_upload(r, path)
+        self._content_cache.invalidate(self._cache_key(path))
+        item = r.json()
+        self._remember_item(path, item)
+        return item
+
+    def upload(self, path: str, content: bytes, overwrite: bool = True,
+               if_match: str | None = None):
+        """
+        Upload simples até SMALL_UPLOAD_LIMIT; acima disso usa upload session.
+        Com if_match (eTag do download), o Graph recusa com 412 se o arquivo
+        mudou nesse meio tempo, em vez de sobrescrever a versão de outra pessoa.
+        """
+        if len(content) <= self.SMALL_UPLOAD_LIMIT:
+            return self.upload_small(path, content, overwrite=overwrite, if_match=if_match)
+        return self.upload_large(path, content, overwrite=overwrite, if_match=if_match)
+
+    def upload_large(self, path: str, content: bytes, overwrite: bool = True,
+                     if_match: str | None = None):
+        """
+        Upload em partes via createUploadSession. Se a conexão cair no meio,
+        consulta a sessão (nextExpectedRanges) e continua do último byte aceito.
+        """
+        body = {"item": {"@microsoft.graph.conflictBehavior": "replace" if overwrite else "fail"}}
+        r = self._item_request("POST", path, "createUploadSession",
+                               headers=self._conditional_headers(if_match), json=body, timeout=30)
+        self._raise_for_upload(r, path)
+        upload_url = r.json()["uploadUrl"]
+
+        total = len(content)
+        offset = 0
+        failures = 0
+        try:
+            while True:
+                end = min(offset + self.UPLOAD_CHUNK_SIZE, total) - 1
+                try:
+                    # uploadUrl já é pré-autenticada: não mandar Authorization
+                    r = self._http().put(
+                        upload_url,
+                        headers={"Content-Length": str(end - offset + 1),
+                                 "Content-Range": f"bytes {offset}-{end}/{total}"},
+                        data=content[offset:end + 1],
+                        timeout=120,
+                    )
+                except (requests.ConnectionError, requests.Timeout):
+                    r = None
+                if r is not None and r.status_code in (200, 201):
+                    self._content_cache.invalidate(self._cache_key(path))
+                    item = r.json()
+                    self._remember_item(path, item)
+                    return item
+                if r is not None and r.status_code == 202:
+                    offset = self._next_expected_offset(r.json(), end + 1)
+                    failures = 0
+                    continue
+                if r is not None and r.status_code < 500 and r.status_code not in (408, 416, 429):
+                    r.raise_for_status()
+                failures += 1
+                if failures > self.UPLOAD_MAX_RESUMES:
+                    if r is not None:
+                        r.raise_for_status()
+                    raise requests.ConnectionError(f"Upload de '{path}' interrompido em {offset}/{total} bytes")
+                time.sleep(self.retry_policy.backoff(failures, self.retry_policy.retry_after(r)))
+                offset = self._upload_session_offset(upload_url, offset)
+        except Exception:
+            try:
+                self._http().delete(upload_url, timeout=10)
+            except requests.RequestException:
+                pass
+            raise
+
+    def _upload_session_offset(self, upload_url: str, fallback: int) -> int:
+        """Pergunta à sessão qual o próximo byte esperado."""
+        try:
+            r = self._http().get(upload_url, timeout=30)
+        except (requests.ConnectionError, requests.Timeout):
+            return fallback
+        if r.status_code != 200:
+            r.raise_for_status()
+        return self._next_expected_offset(r.json(), fallback)
+
+    @staticmethod
+    def _next_expected_offset(status: dict, fallback: int) -> int:
+        ranges = status.get("nextExpectedRanges") or []
+        if not ranges:
+            return fallback
+        return int(str(ranges[0]).split("-")[0])
+
+    # -------- Workbook (Excel API) --------
+    def list_children(self, folder: str) -> list[dict]:
+        """Itens de uma pasta (todas as páginas); pasta inexistente -> []."""
+        r = self._item_request("GET", folder, "children", headers=self._headers(), timeout=60,
+                               params={"$select": "id,name,eTag,size,folder,file", "$top": 999})
+        if r.status_code == 404:
+            return []
         r.raise_for_status()
-        return r.json()
+        data = r.json()
+        items = data.get("value", [])
+        while data.get("@odata.nextLink"):
+            r = self._request("GET", data["@odata.nextLink"], headers=self._headers(), timeout=60)
+            r.raise_for_status()
+            data = r.json()
+            items.extend(data.get("value", []))
+        return items
+
+    def workbook(self, path: str, persist: bool = True) -> "WorkbookSession":
+        """Sessão da API de workbook do Excel (use com `with`)."""
+        return WorkbookSession(self, path, persist=persist)
+
+    # -------- Delta --------
+    def delta(self, link: str | None = None) -> tuple[list[dict], str]:
+        """
+        Consulta /root/delta da biblioteca. Sem link, começa do estado atual
+        (token=latest) e não lista nada. Devolve (itens alterados, deltaLink).
+        Se o token expirou o Graph responde 410 (HTTPError) e é preciso recomeçar.
+        """
+        url = link or f"{self._drive_url()}/root/delta?token=latest"
+        items = []
+        while True:
+            r = self._request("GET", url, headers=self._headers(), timeout=60)
+            r.raise_for_status()
+            data = r.json()
+            items.extend(data.get("value", []))
+            if "@odata.nextLink" in data:
+                url = data["@odata.nextLink"]
+                continue
+            return items, data["@odata.deltaLink"]
+
+    def item_relative_path(self, item: dict) -> str | None:
+        """Caminho (relativo à raiz, minúsculo) de um driveItem retornado pelo delta."""
+        parent = (item.get("parentReference") or {}).get("path")
+        if parent is None or "name" not in item:
+            return None
+        parent = unquote(parent.split("root:", 1)[-1]).strip("/")
+        return f"{parent}/{item['name']}".strip("/").lower()
 
     # -------- Conveniências DataFrame --------
     def read_excel(self, path: str, **kw) -> pd.DataFrame:
-        return pd.read_excel(io.BytesIO(self.download(path)), **kw)
+        with self.download_stream(path) as fh:
+            return excel_readers.read_excel(fh, engine=self.excel_engine, **kw)
 
     def read_csv(self, path: str, **kw) -> pd.DataFrame:
         return pd.read_csv(io.BytesIO(self.download(path)), **kw)
 
-    def write_excel(self, df: pd.DataFrame, path: str, overwrite: bool = True):
-        bio = io.BytesIO()
-        df.to_excel(bio, index=False)
-        return self.upload_small(path, bio.getvalue(), overwrite=overwrite)
+    def write_excel(self, df: pd.DataFrame, path: str, overwrite: bool = True,
+                    sheet_name: str = "Sheet1", engine: str | None = None):
+        content = excel_writers.write_excel({sheet_name: df}, engine=engine)
+        return self.upload(path, content, overwrite=overwrite)
+
+
+def etag_key(tag: str | None) -> str:
+    """
+    Forma canônica de um eTag/cTag do Graph para comparar versões: o header
+    ETag do download e o eTag de item_meta não vêm necessariamente iguais
+    byte a byte (aspas, W/, prefixo "c:" do cTag, caixa do GUID).
+    """
+    tag = (tag or "").strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    if tag.startswith("c:"):
+        tag = tag[2:]
+    return tag.lower()
+
+
+def column_letter(idx: int) -> str:
+    """Índice 0-based -> letra da coluna do Excel (0 -> A, 26 -> AA)."""
+    out = ""
+    idx += 1
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        out = chr(65 + rem) + out
+    return out
+
+
+class WorkbookSession:
+    """
+    Edição pontual de um .xlsx via /workbook (sem baixar e regravar o arquivo):
+      - add_table_rows: acrescenta linhas no fim de uma tabela (ex.: log)
+      - patch_range: grava valores num intervalo (ex.: células de um apontamento)
+    Todas as chamadas levam o mesmo workbook-session-id; com persist=True as
+    alterações são gravadas no arquivo ao fechar a sessão.
+    """
+
+    def __init__(self, sp: SPConnector, path: str, persist: bool = True):
+        self.sp = sp
+        self.path = path
+        self.persist = persist
+        self.session_id: str | None = None
+        self._base: str | None = None
+
+    def __enter__(self) -> "WorkbookSession":
+        r = self.sp._item_request("POST", self.path, "workbook/createSession",
+                                  headers=self.sp._headers(), json={"persistChanges": self.persist}, timeout=60)
+        r.raise_for_status()
+        self._base = f"{self.sp._item_url(self.path)}/workbook"
+        self.session_id = r.json()["id"]
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.sp._request("POST", f"{self._base}/closeSession", headers=self._headers(), timeout=30)
+        except requests.RequestException:
+            pass
+        # o conteúdo mudou: a cópia em cache (eTag antiga) não serve mais
+        self.sp._content_cache.invalidate(self.sp._cache_key(self.path))
+        return False
+
+    def _headers(self) -> dict:
+        headers = self.sp._headers()
+        if self.session_id:
+            headers["workbook-session-id"] = self.session_id
+        return headers
+
+    def _call(self, method: str, url: str, retry: bool = True, **kw) -> dict:
+        r = self.sp._request(method, f"{self._base}/{url}", retry=retry,
+                             headers=self._headers(), timeout=120, **kw)
+        r.raise_for_status()
+        return r.json() if r.content else {}
+
+    @staticmethod
+    def _sheet(name: str) -> str:
+        return quote(name.replace("'", "''"), safe="")
+
+    # -------- Leitura --------
+    def used_range(self, sheet: str, values: bool = False) -> dict:
+        """address/rowCount/columnCount do intervalo usado (com values se pedido)."""
+        select = "address,rowCount,columnCount" + (",values" if values else "")
+        return self._call("GET", f"worksheets('{self._sheet(sheet)}')/usedRange(valuesOnly=true)?$select={select}")
+
+    def range_values(self, sheet: str, address: str) -> list[list]:
+        data = self._call("GET", f"worksheets('{self._sheet(sheet)}')/range(address='{address}')?$select=values")
+        return data.get("values", [])
+
+    def worksheets(self) -> list[str]:
+        return [w["name"] for w in self._call("GET", "worksheets?$select=name").get("value", [])]
+
+    def tables(self) -> list[dict]:
+        return self._call("GET", "tables?$select=name,id").get("value", [])
+
+    def table_header(self, table: str) -> list[str]:
+        data = self._call("GET", f"tables('{table}')/headerRowRange?$select=values")
+        values = data.get("values") or [[]]
+        return [str(v) for v in values[0]]
+
+    # -------- Escrita --------
+    def ensure_table(self, sheet: str, name: str) -> str:
+        """Garante uma tabela com esse nome sobre o intervalo usado da aba (cabeçalho na linha 1)."""
+        for t in self.tables():
+            if t.get("name", "").lower() == name.lower():
+                return t["name"]
+        used = self.used_range(sheet)
+        address = used["address"].split("!", 1)[-1]
+        t = self._call("POST", f"worksheets('{self._sheet(sheet)}')/tables/add", retry=False,
+                       json={"address": address, "hasHeaders": True})
+        self._call("PATCH", f"tables('{t['id']}')", json={"name": name})
+        return name
+
+    def add_table_rows(self, table: str, rows: list[list]) -> None:
+        """Acrescenta linhas à tabela. Não é idempotente, então não é repetida em falha."""
+        if rows:
+            self._call("POST", f"tables('{table}')/rows/add", retry=False,
+                       json={"index": None, "values": rows})
+
+    def table_tail(self, table: str, n: int) -> list[list]:
+        """Últimas n linhas de dados da tabela (para conferir um rows/add de resultado incerto)."""
+        data = self._call("GET", f"tables('{table}')/range?$select=address,rowCount")
+        if n <= 0 or data.get("rowCount", 0) <= 1:
+            return []
+        sheet, address = data["address"].rsplit("!", 1)
+        inicio, fim = address.split(":")
+        col_ini, col_fim = inicio.rstrip("0123456789"), fim.rstrip("0123456789")
+        primeira = int(inicio[len(col_ini):]) + 1          # pula o cabeçalho
+        ultima = int(fim[len(col_fim):])
+        desde = max(primeira, ultima - n + 1)
+        return self.range_values(sheet.strip("'").replace("''", "'"), f"{col_ini}{desde}:{col_fim}{ultima}")
+
+    def patch_range(self, sheet: str, address: str, values: list[list]) -> None:
+        self._call("PATCH", f"worksheets('{self._sheet(sheet)}')/range(address='{address}')",
+                   json={"values": values})
@@ -0,0 +1,121 @@
+# token_provider.py
+"""
+Provedor de token app-only (client credentials) compartilhado entre sessões.
+
+- single-flight: quando o token vence, só UMA thread chama o MSAL; as demais
+  esperam o resultado dela em vez de pedir outro token em paralelo
+- renovação proativa: uma thread em background renova antes do vencimento,
+  então em regime normal nenhuma requisição espera pela aquisição do token
+- cache MSAL serializável persistido em disco (opcional), para que um processo
+  reiniciado reaproveite o token ainda válido
+"""
+import logging
+import os
+import threading
+import time
+
+import msal
+
+logger = logging.getLogger(__name__)
+
+GRAPH_SCOPE = ["https://graph.microsoft.com/.default"]
+
+
+class AppTokenProvider:
+    # O MSAL ignora tokens do cache que vencem em menos de 5 min; renovando
+    # com 4 min de folga a chamada sempre vai ao servidor e pega um token novo.
+    REFRESH_MARGIN = 240
+    # Margem mínima para considerar o token atual utilizável
+    EXPIRY_SKEW = 60
+
+    def __init__(self, tenant_id: str, client_id: str, client_secret: str,
+                 cache_path: str | None = None, scopes: list[str] | None = None):
+        self.scopes = scopes or GRAPH_SCOPE
+        self.cache_path = cache_path
+        self._cache = msal.SerializableTokenCache()
+        self._load_cache()
+        self.app = msal.ConfidentialClientApplication(
+            client_id=client_id,
+            authority=f"https://login.microsoftonline.com/{tenant_id}",
+            client_credential=client_secret,
+            token_cache=self._cache,
+        )
+        self._tok: str | None = None
+        self._exp = 0.0
+        self._lock = threading.Lock()
+        self._renewer: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    # -------- API --------
+    def get(self) -> str:
+        """Token válido; só bloqueia se não houver nenhum utilizável (partida a frio)."""
+        tok, exp = self._tok, self._exp
+        if tok and time.time() < exp - self.EXPIRY_SKEW:
+            return tok
+        with self._lock:
+            # outra thread pode ter renovado enquanto esperávamos o lock
+            if self._tok and time.time() < self._exp - self.EXPIRY_SKEW:
+                return self._tok
+            self._acquire()
+        self._ensure_renewer()
+        return self._tok
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # -------- Internos --------
+    def _acquire(self) -> None:
+        res = self.app.acquire_token_for_client(scopes=self.scopes)
+        if "access_token" not in res:
+            raise RuntimeError(res.get("error_description") or res)
+        now = time.time()
+        self._tok = res["access_token"]
+        self._exp = now + int(res.get("expires_in", 3600))
+        self._save_cache()
+
+    def _ensure_renewer(self) -> None:
+        if self._renewer is not None and self._renewer.is_alive():
+            return
+        with self._lock:
+            if self._renewer is not None and self._renewer.is_alive():
+                return
+            self._renewer = threading.Thread(target=self._renew_loop, name="sp-token-renewer", daemon=True)
+            self._renewer.start()
+
+    def _renew_loop(self) -> None:
+        while not self._stop.is_set():
+            wait = max(self._exp - self.REFRESH_MARGIN - time.time(), 0)
+            if self._stop.wait(wait):
+                return
+            try:
+                with self._lock:
+                    if self._exp - time.time() <= self.REFRESH_MARGIN:
+                        self._acquire()
+            except Exception as e:
+                logger.warning(f"Falha ao renovar token app-only em background: {e}")
+                self._stop.wait(30)
+
+    def _load_cache(self) -> None:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                self._cache.deserialize(f.read())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache de token ignorado ({self.cache_path}): {e}")
+
+    def _save_cache(self) -> None:
+        if not self.cache_path or not self._cache.has_state_changed:
+            return
+        tmp = self.cache_path + ".tmp"
+        try:
+            d = os.path.dirname(self.cache_path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self._cache.serialize())
+            os.replace(tmp, self.cache_path)
+            self._cache.has_state_changed = False
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o cache de token ({self.cache_path}): {e}")
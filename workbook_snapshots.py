@@ -0,0 +1,139 @@
+# workbook_snapshots.py
+"""
+Snapshots de workbooks já lidos, chaveados por (arquivo, eTag normalizado).
+
+Cada versão de um arquivo é baixada e convertida em DataFrames uma única vez;
+leituras e helpers de gravação pedem as abas aqui e recebem cópias. Antes de
+servir, uma consulta leve de metadados confirma o eTag atual: se o arquivo
+mudou, a versão nova é lida e a antiga descartada.
+
+Com `sheets`, só as abas pedidas são trazidas (HTTP Range, ver ranged_zip);
+abas pedidas depois para a mesma versão completam o mesmo snapshot.
+
+Com sidecar_dir, as abas parseadas também vão para um snapshot Parquet em
+disco (ver sidecar_store) e uma versão já vista é carregada de lá, sem
+baixar nem parsear o Excel, mesmo após reiniciar o processo.
+"""
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import excel_readers
+from sidecar_store import SidecarStore
+from sp_connector import SPConnector, etag_key
+
+
+class WorkbookSnapshot:
+    def __init__(self, path: str, etag: str):
+        self.path = path
+        self.etag = etag
+        self.sheets: dict[str, pd.DataFrame] = {}
+        self.missing: set[str] = set()      # abas pedidas que não existem nessa versão
+        self.complete = False               # todas as abas do arquivo já foram lidas
+        self.lock = threading.Lock()
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return list(self.sheets)
+
+    def has(self, name: str) -> bool:
+        return name in self.sheets
+
+    def sheet(self, name: str) -> pd.DataFrame:
+        """Cópia da aba (quem chama pode alterar à vontade)."""
+        return self.sheets[name].copy()
+
+
+class WorkbookSnapshots:
+    def __init__(self, sp: SPConnector, max_entries: int = 8, sidecar_dir: str | None = None):
+        self.sp = sp
+        self.max_entries = max_entries
+        self.sidecar = SidecarStore(sidecar_dir) if sidecar_dir else None
+        self._entries: OrderedDict[tuple[str, str], WorkbookSnapshot] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, sheets: list[str] | None = None) -> WorkbookSnapshot:
+        """
+        Snapshot da versão atual de `path` contendo ao menos `sheets` (as que
+        existirem). Sem `sheets`, lê o workbook inteiro.
+        """
+        meta = self.sp.item_meta(path)
+        snap = self._entry(path, meta.get("eTag", ""))
+        with snap.lock:
+            if sheets is None:
+                if not snap.complete and not self._from_sidecar(snap, None):
+                    return self._load_full(snap)
+                return snap
+            wanted = [s for s in dict.fromkeys(sheets) if s not in snap.sheets and s not in snap.missing]
+            if wanted and not snap.complete:
+                self._from_sidecar(snap, wanted)
+                wanted = [s for s in wanted if s not in snap.sheets and s not in snap.missing]
+            if not wanted or snap.complete:
+                return snap
+            fh, etag = self.sp.download_sheets(path, wanted, with_etag=True, meta=meta)
+            with fh:
+                loaded = excel_readers.read_excel(fh, sheet_name=None, engine=self.sp.excel_engine)
+        if etag_key(etag) != etag_key(snap.etag):
+            # mudou entre a consulta e o download: guarda na versão que veio
+            snap = self._entry(path, etag)
+        missing = {s for s in wanted if s not in loaded}
+        with snap.lock:
+            snap.sheets.update(loaded)
+            snap.missing.update(missing)
+        if self.sidecar:
+            self.sidecar.save(self.sp._cache_key(path), etag_key(snap.etag), loaded, missing)
+        return snap
+
+    def invalidate(self, path: str | None = None) -> None:
+        """Descarta os snapshots de `path` (ou todos)."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            key = self.sp._cache_key(path)
+            for k in [k for k in self._entries if k[0] == key]:
+                del self._entries[k]
+
+    # -------- Internos --------
+    def _entry(self, path: str, etag: str) -> WorkbookSnapshot:
+        # snap.etag guarda o valor original (vai em If-Match); a chave, o normalizado
+        key, versao = self.sp._cache_key(path), etag_key(etag)
+        with self._lock:
+            snap = self._entries.get((key, versao))
+            if snap is not None:
+                self._entries.move_to_end((key, versao))
+                return snap
+            # versões antigas do mesmo arquivo não serão mais servidas
+            for k in [k for k in self._entries if k[0] == key]:
+                del self._entries[k]
+            snap = self._entries[(key, versao)] = WorkbookSnapshot(path, etag)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return snap
+
+    def _from_sidecar(self, snap: WorkbookSnapshot, sheets: list[str] | None) -> bool:
+        """Completa o snapshot com as abas do Parquet; True se trouxe tudo o que foi pedido."""
+        if not self.sidecar:
+            return False
+        frames, missing, complete = self.sidecar.load(self.sp._cache_key(snap.path), etag_key(snap.etag), sheets)
+        snap.sheets.update(frames)
+        snap.missing.update(missing)
+        if sheets is None:
+            snap.complete = complete
+            return complete
+        return all(s in snap.sheets or s in snap.missing for s in sheets)
+
+    def _load_full(self, snap: WorkbookSnapshot) -> WorkbookSnapshot:
+        fh, etag = self.sp.download_stream(snap.path, with_etag=True)
+        with fh:
+            sheets = excel_readers.read_excel(fh, sheet_name=None, engine=self.sp.excel_engine)
+        if etag_key(etag) != etag_key(snap.etag):
+            # versão mais nova que a consultada: guarda como tal
+            snap = self._entry(snap.path, etag)
+        snap.sheets = sheets
+        snap.missing = set()
+        snap.complete = True
+        if self.sidecar:
+            self.sidecar.save(self.sp._cache_key(snap.path), etag_key(snap.etag), sheets, complete=True)
+        return snap
@@ -0,0 +1,114 @@
+# write_behind.py
+"""
+Fila de gravação write-behind: várias submissões, uma gravação.
+
+Uma única thread por processo (criada via st.cache_resource no admin.py)
+recebe os pedidos de gravação das sessões. Ao chegar o primeiro pedido ela
+espera a janela de coalescência (ex.: 2 s), junta tudo o que entrou nesse
+meio tempo e chama flush(pedidos) uma vez — no admin, um único download,
+uma mescla e um upload para o lote inteiro.
+
+- Ordem: os pedidos vão para flush na ordem de chegada e os lotes são
+  gravados um de cada vez, então as edições de um mesmo usuário são
+  aplicadas na ordem em que ele submeteu.
+- Resultado: submit() devolve um Pedido com um Future; a sessão pode
+  esperar (future.result) ou consultar pedido.status nas execuções seguintes.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+PENDENTE, GRAVANDO, GRAVADO, ERRO = "pendente", "gravando", "gravado", "erro"
+
+
+class Pedido:
+    def __init__(self, usuario: str, payload):
+        self.usuario = usuario
+        self.payload = payload
+        self.future: Future = Future()
+        self.status = PENDENTE
+        self.criado = time.time()
+
+
+class WriteBehindQueue:
+    def __init__(self, flush: Callable[[list], list], window: float = 2.0, max_batch: int = 50):
+        """
+        flush: recebe os payloads do lote (em ordem de chegada) e devolve um
+        resultado por payload; se levantar exceção, todo o lote falha com ela.
+        Roda na thread da fila, fora do contexto do Streamlit: recursos
+        cacheados (st.cache_resource) devem vir resolvidos na criação.
+        """
+        self.flush = flush
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: queue.Queue[Pedido] = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    # -------- Ciclo de vida --------
+    def start(self) -> "WriteBehindQueue":
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="sp-write-behind", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    # -------- API --------
+    def submit(self, usuario: str, payload) -> Pedido:
+        pedido = Pedido(usuario, payload)
+        self._queue.put(pedido)
+        self.start()
+        return pedido
+
+    # -------- Loop --------
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                primeiro = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            # janela de coalescência contada a partir do primeiro pedido do lote
+            lote = [primeiro]
+            limite = time.monotonic() + self.window
+            while len(lote) < self.max_batch:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._queue.get(timeout=restante))
+                except queue.Empty:
+                    break
+            self._flush(lote)
+
+    def _flush(self, lote: list[Pedido]) -> None:
+        for p in lote:
+            p.status = GRAVANDO
+        try:
+            resultados = self.flush([p.payload for p in lote])
+        except Exception as e:
+            logger.warning(f"Write-behind: falha ao gravar lote de {len(lote)} pedido(s): {e}")
+            for p in lote:
+                p.status = ERRO
+                p.future.set_exception(e)
+            return
+        logger.info(f"Write-behind: {len(lote)} pedido(s) gravado(s) de uma vez")
+        for p, r in zip(lote, resultados):
+            p.status = GRAVADO
+            p.future.set_result(r)